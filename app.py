@@ -12,6 +12,7 @@ def main():
     # app.py
     # -*- coding: utf-8 -*-
     import os  # ★ 추가
+    import json
     # ★ watchdog/inotify 한도 초과 방지: 스트림릿 파일감시 비활성화
     os.environ["STREAMLIT_SERVER_FILE_WATCHER_TYPE"] = "none"
     os.environ["WATCHDOG_DISABLE_FILE_SYSTEM_EVENTS"] = "true"
@@ -21,12 +22,29 @@ def main():
     from requests.adapters import HTTPAdapter, Retry
     import plotly.graph_objs as go
     from plotly.subplots import make_subplots
-    import ta
     from datetime import datetime, timedelta
     from pytz import timezone
     import numpy as np
     import pandas as pd  # ✅ main() 내부로 이동
     from typing import Optional, Set
+    from backtest_engine import signal_mask, frame_arrays, resimulate, strategy_masks, vote_masks, compare_strategies
+    from strategy_registry import REGISTRY
+    from time_grid import TimeGrid
+    from candles import Candles
+    from sweep_engine import run_sweep_parallel, run_sweep_halving, run_sweep_markets, LEADERBOARD_KEYS
+    from walk_forward import run_walk_forward, walk_forward_summary
+    import upbit_data as ud
+    from result_store import get_store
+    from preset_runner import load_presets, run_presets
+    from signal_index import signal_positions
+    from trade_engine import simulate_trades, trade_summary, DEFAULT_RULES, EXIT_REASONS
+    from entry_gate import apply_gate, GATE_RULES
+    from time_cube import TimeCube, WEEKDAYS, calendar_cells, calendar_filter
+    from volume_rank import RollingRank, VOL_FILTER, filter_signals
+    from bootstrap_stats import bootstrap_rows, CI_COLS
+    from equity_curve import equity_from_frame
+    from param_search import ParamSearch, SPACE as PARAM_SPACE, active_params, pareto_table
+    from scan_jobs import submit_job, job_spec, job_status, job_results, list_jobs, cancel_job
 
     # ✅ 통계/조합 탐색 UI 자동 확장 유지 콜백
     def _keep_sweep_open():
@@ -223,6 +241,7 @@ def main():
     c4, c5, c6 = st.columns(3)
     with c4:
         lookahead = st.slider("측정 캔들 수 (기준 이후 N봉)", 1, 60, 10)
+        fill_empty = st.checkbox("빈 봉 채우기 (체결 없는 봉 → 직전 종가, N봉 = 고정 시간)", value=False, key="fill_gaps")
     with c5:
         threshold_pct = st.slider("성공/실패 기준 값(%)", 0.1, 5.0, 1.0, step=0.1)
         winrate_thr   = st.slider("승률 기준(%)", 10, 100, 70, step=1)
@@ -320,6 +339,52 @@ def main():
     # ✅ 볼린저 옵션 미체크 시 안내 문구
     if sec_cond == "BB 기반 첫 양봉 50% 진입" and bb_cond == "없음":
         st.info("ℹ️ 볼린저 밴드를 활성화해야 이 조건이 정상 작동합니다.")
+
+    # ✅ 진입 제한 규칙 (공유 메모: 2연속 손실 시 다음 신호 스킵, 같은 시간대 중복 진입 금지)
+    entry_gate_rules = None
+    if st.checkbox("🚦 진입 제한 규칙 (연속 손실 스킵 · 같은 시간대 1회 · 동시 보유/일일 한도)", value=False,
+                   key="gate_on"):
+        g1, g2, g3, g4, g5 = st.columns(5)
+        with g1:
+            gate_streak = st.number_input("연속 손실(회, 0=없음)", 0, 10, int(GATE_RULES["loss_streak"]), key="gate_streak")
+        with g2:
+            gate_skip = st.number_input("스킵 신호 수", 0, 20, int(GATE_RULES["skip_n"]), key="gate_skip")
+        with g3:
+            gate_hour = st.checkbox("같은 시간대 1회", value=bool(GATE_RULES["hour_lockout"]), key="gate_hour")
+        with g4:
+            gate_open = st.number_input("동시 보유(0=무제한)", 0, 50, int(GATE_RULES["max_concurrent"]), key="gate_open")
+        with g5:
+            gate_cap = st.number_input("일일 진입(0=무제한)", 0, 100, int(GATE_RULES["daily_cap"]), key="gate_cap")
+        entry_gate_rules = dict(loss_streak=int(gate_streak), skip_n=int(gate_skip), hour_lockout=bool(gate_hour),
+                                max_concurrent=int(gate_open), daily_cap=int(gate_cap))
+
+    # ✅ 요일 × 시간대 필터 (공유 메모: 월~목 22~01시 반등 성공률 ↑) — 신호 단계에서 제외
+    calendar_main = None
+    if st.checkbox("🗓️ 요일 × 시간대 필터", value=False, key="cal_on"):
+        cal_src = st.radio("마스크", ["직접 선택", "큐브 기준 (저장된 마스크)"], horizontal=True, key="cal_src")
+        if cal_src == "직접 선택" or "calendar_cube_mask" not in st.session_state:
+            if cal_src != "직접 선택":
+                st.info("저장된 큐브 마스크가 없습니다. 아래 '시간대 × 요일 성과 큐브'에서 저장하세요.")
+            k1, k2 = st.columns(2)
+            with k1:
+                cal_wd = st.multiselect("요일", list(range(7)), default=[0, 1, 2, 3],
+                                        format_func=lambda i: WEEKDAYS[i], key="cal_wd")
+            with k2:
+                cal_hr = st.multiselect("시간대(시)", list(range(24)), default=[22, 23, 0, 1], key="cal_hr")
+            calendar_main = calendar_cells(cal_wd, cal_hr).astype(int).tolist()
+        else:
+            calendar_main = st.session_state["calendar_cube_mask"]
+            st.caption(f"큐브 마스크: {int(np.asarray(calendar_main).sum())}/168칸 허용")
+
+    # ✅ 거래량 상위 필터 (공유 메모: 거래량 상위 30%) — 최근 N봉 중 거래량 백분위
+    vol_filter_main = None
+    if st.checkbox("📊 거래량 상위 필터 (최근 N봉 중 백분위)", value=False, key="vol_on"):
+        vf1, vf2 = st.columns(2)
+        with vf1:
+            vf_top = st.slider("거래량 상위(%)", 5, 100, int(VOL_FILTER["top_pct"]), step=5, key="vf_top")
+        with vf2:
+            vf_win = st.number_input("기준 봉 수(N)", 10, 5000, int(VOL_FILTER["window"]), step=10, key="vf_win")
+        vol_filter_main = {"window": int(vf_win), "top_pct": float(vf_top)}
     
     # ✅ 매물대 조건 UI (CSV 저장/불러오기 + GitHub 커밋)
     import os, base64, requests
@@ -583,163 +648,33 @@ def main():
         return df_all[(df_all["time"] >= start_cutoff) & (df_all["time"] <= end_dt)].reset_index(drop=True)
     
     def add_indicators(df, bb_window, bb_dev, cci_window, cci_signal=9):
-        out = df.copy()
-        out["RSI13"] = ta.momentum.RSIIndicator(close=out["close"], window=13).rsi()
-        bb = ta.volatility.BollingerBands(close=out["close"], window=bb_window, window_dev=bb_dev)
-        out["BB_up"]  = bb.bollinger_hband().fillna(method="bfill").fillna(method="ffill")
-        out["BB_low"] = bb.bollinger_lband().fillna(method="bfill").fillna(method="ffill")
-        out["BB_mid"] = bb.bollinger_mavg().fillna(method="bfill").fillna(method="ffill")
-        cci = ta.trend.CCIIndicator(high=out["high"], low=out["low"], close=out["close"], window=int(cci_window), constant=0.015)
-        out["CCI"] = cci.cci()
-        # CCI 신호선(단순 이동평균)
-        try:
-            n = max(int(cci_signal), 1)
-        except Exception:
-            n = 9
-        out["CCI_sig"] = out["CCI"].rolling(n, min_periods=1).mean()
-        return out
+        # ✅ upbit_data.add_indicators 공용 (얕은 복사 — 원본 OHLCV 버퍼 공유, Candles도 허용)
+        return ud.add_indicators(df, bb_window, bb_dev, cci_window, cci_signal)
     
     def simulate(df, rsi_mode, rsi_low, rsi_high, lookahead, threshold_pct, bb_cond, dedup_mode,
                  minutes_per_bar, market_code, bb_window, bb_dev, sec_cond="없음",
                  hit_basis="종가 기준", miss_policy="(고정) 성공·실패·중립", bottom_mode=False,
                  supply_levels: Optional[Set[float]] = None,
                  manual_supply_levels: Optional[list] = None,
-                 cci_mode: str = "없음", cci_over: float = 100.0, cci_under: float = -100.0, cci_signal_n: int = 9):
-        """UI/UX 유지. 기존 로직 + 바닥탐지 + 매물대 + CCI 1차 조건."""
+                 cci_mode: str = "없음", cci_over: float = 100.0, cci_under: float = -100.0, cci_signal_n: int = 9,
+                 sig_idx=None):
+        """UI/UX 유지. 기존 로직 + 바닥탐지 + 매물대 + CCI 1차 조건. sig_idx: 1차 신호 위치(신호 인덱스 조회 결과)"""
         res = []
         n = len(df)
         thr = float(threshold_pct)
     
         # --- 1) 1차 조건 인덱스 (RSI/BB/CCI/바닥탐지) ---
-        if bottom_mode:
-            base_sig_idx = df.index[
-                (df["RSI13"] <= float(rsi_low)) &
-                (df["close"] <= df["BB_low"]) &
-                (df["CCI"] <= -100)
-            ].tolist()
+        # ✅ primary_strategy 기반 1차 매매기법 조건 (UI 약어 9종과 1:1 매핑) — backtest_engine.signal_mask 공용
+        strategy = st.session_state.get("primary_strategy", "없음")
+        if sig_idx is not None:
+            base_sig_idx = df.index[np.asarray(sig_idx, dtype=np.int64)].tolist()
         else:
-            # ✅ primary_strategy 기반 1차 매매기법 조건 (UI 약어 9종과 1:1 매핑)
-            strategy = st.session_state.get("primary_strategy", "없음")
-            base_sig_idx = []
-
-            if strategy == "TGV":
-                # 거래량 급등 + 전고 돌파 + RSI>55
-                vol_mean = df["volume"].rolling(20, min_periods=1).mean()
-                base_sig_idx = df.index[
-                    (df["volume"] > vol_mean * 2.0) &
-                    (df["close"] > df["high"].shift(1)) &
-                    (df["RSI13"] > 55)
-                ].tolist()
-
-            elif strategy == "RVB":
-                # 과매도 반전형: RSI<=rsi_low, CCI<=-100, 양봉
-                base_sig_idx = df.index[
-                    (df["RSI13"] <= float(rsi_low)) &
-                    (df["CCI"] <= -100) &
-                    (df["close"] > df["open"])
-                ].tolist()
-
-            elif strategy == "PR":
-                # 급락 후 반등: 직전-전전 종가 급락 + RSI 낮음 + 현재 양봉
-                drop = (df["close"].shift(1) / df["close"].shift(2) - 1.0)
-                base_sig_idx = df.index[
-                    (drop <= -0.015) &
-                    (df["RSI13"] <= 30) &
-                    (df["close"] > df["open"])
-                ].tolist()
-
-            elif strategy == "LCT":
-                # 장기 과매도 복귀: CCI -100 부근 상향 + RSI>50
-                base_sig_idx = df.index[
-                    (df["CCI"] > -100) &
-                    (df["CCI"] > df["CCI"].shift(1)) &
-                    (df["RSI13"] > 50)
-                ].tolist()
-
-            elif strategy == "4D_Sync":
-                # 멀티TF 대용: BB 중앙선 위 + RSI>55 (동조 상승 대체)
-                base_sig_idx = df.index[
-                    (df["close"] >= df["BB_mid"]) &
-                    (df["RSI13"] >= 55)
-                ].tolist()
-
-            elif strategy == "240m_Sync":
-                # 4시간 과매도 반전형 대용: CCI<-200 → 상승 전환
-                base_sig_idx = df.index[
-                    (df["CCI"].shift(1) <= -200) &
-                    (df["CCI"] > df["CCI"].shift(1))
-                ].tolist()
-
-            elif strategy == "Composite_Confirm":
-                # 다중 확인 대용: BB중앙 위 + RSI>60 + 최근 고점 갱신
-                base_sig_idx = df.index[
-                    (df["close"] >= df["BB_mid"]) &
-                    (df["RSI13"] >= 60) &
-                    (df["close"] > df["high"].rolling(3).max().shift(1))
-                ].tolist()
-
-            elif strategy == "Divergence_RVB":
-                # RSI 상승 / 가격 저점 갱신(다이버전스)
-                base_sig_idx = df.index[
-                    (df["RSI13"] > df["RSI13"].shift(1)) &
-                    (df["close"] <= df["close"].shift(1) * 0.999)
-                ].tolist()
-
-            elif strategy == "Market_Divergence":
-                # 시장 괴리 대용: BB 하단 근처에서 RSI 반등 시작
-                base_sig_idx = df.index[
-                    (df["close"] >= df["BB_low"]) &
-                    (df["RSI13"] > df["RSI13"].shift(1)) &
-                    (df["RSI13"] >= 45)
-                ].tolist()
-
-            else:
-                # (전략 없음) — 기존 RSI/BB/CCI 조합 그대로 사용
-                if rsi_mode == "없음":
-                    rsi_idx = []
-                elif rsi_mode == "현재(과매도/과매수 중 하나)":
-                    rsi_idx = sorted(set(df.index[df["RSI13"] <= float(rsi_low)].tolist()) |
-                                     set(df.index[df["RSI13"] >= float(rsi_high)].tolist()))
-                elif rsi_mode == "과매도 기준":
-                    rsi_idx = df.index[df["RSI13"] <= float(rsi_low)].tolist()
-                else:
-                    rsi_idx = df.index[df["RSI13"] >= float(rsi_high)].tolist()
-
-                def bb_ok(i):
-                    c = float(df.at[i, "close"])
-                    o = float(df.at[i, "open"])
-                    l = float(df.at[i, "low"])
-                    up, lo, mid = df.at[i, "BB_up"], df.at[i, "BB_low"], df.at[i, "BB_mid"]
-                    if bb_cond == "상한선":
-                        return pd.notna(up) and (c > float(up))
-                    if bb_cond == "하한선":
-                        if pd.isna(lo): return False
-                        rv = float(lo)
-                        return ((o < rv) or (l <= rv)) and (c >= rv)
-                    if bb_cond == "중앙선":
-                        if pd.isna(mid): return False
-                        return c >= float(mid)
-                    return False
-
-                bb_idx = [i for i in df.index if bb_cond != "없음" and bb_ok(i)]
-
-                if cci_mode == "없음":
-                    cci_idx = []
-                elif cci_mode == "과매수":
-                    cci_idx = df.index[df["CCI"] >= float(cci_over)].tolist()
-                elif cci_mode == "과매도":
-                    cci_idx = df.index[df["CCI"] <= float(cci_under)].tolist()
-                else:
-                    cci_idx = []
-
-                idx_sets = []
-                if rsi_mode != "없음": idx_sets.append(set(rsi_idx))
-                if bb_cond  != "없음": idx_sets.append(set(bb_idx))
-                if cci_mode != "없음": idx_sets.append(set(cci_idx))
-                if idx_sets:
-                    base_sig_idx = sorted(set.intersection(*idx_sets)) if len(idx_sets) > 1 else sorted(idx_sets[0])
-                else:
-                    base_sig_idx = list(range(n)) if sec_cond != "없음" else []
+            base_mask = signal_mask(
+                df, strategy=strategy, rsi_mode=rsi_mode, rsi_low=rsi_low, rsi_high=rsi_high,
+                bb_cond=bb_cond, cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under,
+                bottom_mode=bottom_mode, sec_cond=sec_cond
+            )
+            base_sig_idx = df.index[base_mask].tolist()
 
         # --- 2) 보조/공통 함수 ---
         def is_bull(idx):
@@ -978,9 +913,10 @@ def main():
     
         # --- 4) 메인 루프 (중복 포함/제거 분기) ---
         if dedup_mode.startswith("중복 제거"):
+            sig_set = set(base_sig_idx)
             i = 0
             while i < n:
-                if i not in base_sig_idx:
+                if i not in sig_set:
                     i += 1
                     continue
                 row, lock_end = process_one(i)
@@ -1031,31 +967,6 @@ def main():
     
         return below and above and is_bull and bb_above
     
-    def chunked_periods(start_dt, end_dt, days_per_chunk=7):
-        cur = start_dt
-        delta = timedelta(days=days_per_chunk)
-        while cur < end_dt:
-            nxt = min(cur + delta, end_dt)
-            yield cur, nxt
-            cur = nxt
-    
-    @st.cache_data(show_spinner=False, ttl=3600)
-    def fetch_window_cached(symbol, interval_key, start_dt, end_dt, minutes_per_bar):
-        df = fetch_upbit_paged(symbol, interval_key, start_dt, end_dt, minutes_per_bar, warmup_bars=0)
-        return df
-    
-    def _safe_sleep(sec: float):
-        try:
-            time.sleep(sec)
-        except Exception:
-            pass
-    
-    def _load_ckpt(key: str):
-        return st.session_state.get(key)
-    
-    def _save_ckpt(key: str, value):
-        st.session_state[key] = value
-    
     def run_combination_scan_chunked(
         symbol: str,
         interval_key: str,
@@ -1068,89 +979,22 @@ def main():
         on_progress=None,
         simulate_kwargs: Optional[dict] = None,
     ):
-        simulate_kwargs = simulate_kwargs or {}
-        t0 = time.time()
-        chunks = list(chunked_periods(start_dt, end_dt, days_per_chunk))
-        total = len(chunks)
-    
-        ckpt = _load_ckpt(checkpoint_key) or {"idx": 0, "parts": []}
-        part_dir = os.path.join(os.path.dirname(__file__), "data_cache", "scan_parts")
-        os.makedirs(part_dir, exist_ok=True)
-    
-        for i, (s, e) in enumerate(chunks):
-            if i < ckpt["idx"]:
-                if on_progress: on_progress((i+1)/total)
-                continue
-    
-            df_chunk = fetch_window_cached(symbol, interval_key, s, e, minutes_per_bar)
-            if df_chunk is None or df_chunk.empty:
-                ckpt["idx"] = i + 1
-                _save_ckpt(checkpoint_key, ckpt)
-                if on_progress: on_progress((i+1)/total)
-                continue
-    
-            df_chunk = add_indicators(df_chunk, bb_window, bb_dev, cci_window, cci_signal)
-    
-            res_chunk = simulate(
-                df_chunk,
-                simulate_kwargs.get("rsi_mode", "없음"),
-                simulate_kwargs.get("rsi_low", 30),
-                simulate_kwargs.get("rsi_high", 70),
-                simulate_kwargs.get("lookahead", 10),
-                simulate_kwargs.get("threshold_pct", 1.0),
-                simulate_kwargs.get("bb_cond", "없음"),
-                simulate_kwargs.get("dup_mode", "중복 제거 (연속 동일 결과 1개)"),
-                minutes_per_bar,
-                symbol,
-                bb_window,
-                bb_dev,
-                sec_cond=simulate_kwargs.get("sec_cond", "없음"),
-                hit_basis="종가 기준",
-                miss_policy="(고정) 성공·실패·중립",
-                bottom_mode=simulate_kwargs.get("bottom_mode", False),
-                supply_levels=None,
-                manual_supply_levels=simulate_kwargs.get("manual_supply_levels", None),
-                cci_mode=simulate_kwargs.get("cci_mode", "없음"),
-                cci_over=simulate_kwargs.get("cci_over", 100.0),
-                cci_under=simulate_kwargs.get("cci_under", -100.0),
-                cci_signal_n=simulate_kwargs.get("cci_signal", 9),
-            )
-    
-            part_path = os.path.join(
-                part_dir,
-                f"{symbol}_{interval_key.replace('/','-')}_{s:%Y%m%d%H%M}_{e:%Y%m%d%H%M}.parquet"
-            )
-            (res_chunk if res_chunk is not None else pd.DataFrame()).to_parquet(part_path, index=False)
-            ckpt["parts"].append(part_path)
-    
-            ckpt["idx"] = i + 1
-            _save_ckpt(checkpoint_key, ckpt)
-    
-            if on_progress: on_progress((i+1)/total)
-            _safe_sleep(0.2)
-            if max_minutes is not None and (time.time() - t0) / 60.0 > max_minutes:
-                break
-    
-        parts = ckpt.get("parts", [])
-        if not parts:
-            return pd.DataFrame(), ckpt
-    
-        dfs = []
-        for p in parts:
-            try:
-                dfp = pd.read_parquet(p)
-                if dfp is not None and not dfp.empty:
-                    dfs.append(dfp)
-            except Exception:
-                pass
-        if not dfs:
-            return pd.DataFrame(), ckpt
-    
-        merged = pd.concat(dfs, ignore_index=True)
-        if "anchor_i" in merged.columns:
-            merged = merged.drop_duplicates(subset=["anchor_i"], keep="first").reset_index(drop=True)
-    
-        return merged, ckpt
+        """
+        긴 기간 스캔을 백그라운드 작업으로 제출(또는 기존 작업에 연결)하고 즉시 반환.
+        반환: (지금까지 병합된 결과, 작업 상태 dict) — 체크포인트는 data_cache/scan_jobs에 저장
+        """
+        job_id = submit_job({
+            "symbol": symbol, "interval_key": interval_key, "minutes_per_bar": int(minutes_per_bar),
+            "start": start_dt, "end": end_dt, "days_per_chunk": int(days_per_chunk),
+            "bb_window": int(bb_window), "bb_dev": float(bb_dev), "cci_window": int(cci_window),
+            "cci_signal": int(cci_signal), "simulate_kwargs": dict(simulate_kwargs or {}),
+        })
+        st.session_state[checkpoint_key] = job_id
+        state = job_status(job_id) or {}
+        state["job_id"] = job_id
+        if on_progress and state.get("total"):
+            on_progress(state.get("idx", 0) / max(state["total"], 1))
+        return job_results(job_id), state
     
     # -----------------------------
     # 실행
@@ -1172,9 +1016,21 @@ def main():
         if df_raw.empty:
             st.error("데이터가 없습니다.")
             st.stop()
+        # ✅ 체결 없는 봉(업비트 생략) 확인 → 선택 시 고정 간격 격자로 채움
+        raw_grid = TimeGrid(df_raw["time"], minutes_per_bar)
+        gaps_filled = bool(fill_empty and raw_grid.n_missing)
+        if raw_grid.n_missing:
+            if fill_empty:
+                df_raw = raw_grid.reindex(df_raw, ffill=True)
+            st.caption(f"ℹ️ 빈 봉 {raw_grid.n_missing:,}개 ({raw_grid.n_missing / len(raw_grid) * 100:.1f}%) — "
+                       + ("직전 종가로 채움" if fill_empty else "생략 상태 (N봉 ≠ 고정 시간)"))
     
         df_ind = add_indicators(df_raw, bb_window, bb_dev, cci_window, cci_signal)
-        df = df_ind[(df_ind["time"] >= start_dt) & (df_ind["time"] <= end_dt)].reset_index(drop=True)
+        # 기간 필터: 정렬된 시각 → 위치 구간 뷰 (불리언 인덱싱 복사 없음)
+        _t = df_ind["time"].to_numpy()
+        _lo = int(_t.searchsorted(np.datetime64(pd.Timestamp(start_dt)), "left"))
+        _hi = int(_t.searchsorted(np.datetime64(pd.Timestamp(end_dt)), "right"))
+        df = df_ind.iloc[_lo:_hi].set_axis(pd.RangeIndex(_hi - _lo), axis=0, copy=False)
     
         # ✅ 매물대 자동 신호 실시간 감지 + 카카오톡 알림
         if sec_cond == "매물대 자동 (하단→상단 재진입 + BB하단 위 양봉)":
@@ -1218,23 +1074,79 @@ def main():
             st.session_state.opt_view = not st.session_state.get("opt_view", False)
             st.rerun()
     
+        # ✅ 1차 신호: 캐시 전체 구간 신호 인덱스를 증분 갱신 후 기간만 잘라서 사용 (실패 시 직접 계산)
+        #    빈 봉을 채운 프레임은 인덱스(원본 캐시 캔들 기준)와 지표/봉 위치가 다름 → 화면 프레임에서 직접 계산
+        main_sig_idx = None
+        if not gaps_filled:
+            try:
+                main_sig_idx = signal_positions(
+                    market_code, interval_key, df,
+                    indicator=dict(bb_window=bb_window, bb_dev=bb_dev, cci_window=cci_window, cci_signal=cci_signal),
+                    params=dict(strategy=st.session_state.get("primary_strategy", "없음"), rsi_mode=rsi_mode,
+                                rsi_low=rsi_low, rsi_high=rsi_high, bb_cond=bb_cond, cci_mode=cci_mode,
+                                cci_over=cci_over, cci_under=cci_under, bottom_mode=bottom_mode, sec_cond=sec_cond),
+                )
+            except Exception:
+                main_sig_idx = None
+        if main_sig_idx is None and (gaps_filled or calendar_main is not None or vol_filter_main):
+            main_sig_idx = np.flatnonzero(signal_mask(
+                df, strategy=st.session_state.get("primary_strategy", "없음"), rsi_mode=rsi_mode,
+                rsi_low=rsi_low, rsi_high=rsi_high, bb_cond=bb_cond, cci_mode=cci_mode, cci_over=cci_over,
+                cci_under=cci_under, bottom_mode=bottom_mode, sec_cond=sec_cond))
+        if calendar_main is not None:
+            main_sig_idx = main_sig_idx[calendar_filter(df["time"].values[main_sig_idx], calendar_main)]
+        if vol_filter_main:
+            # 백분위는 워밍업 구간 포함 전체 캔들 기준 (기간 첫 봉부터 N봉 창 확보)
+            vf_off = int((df_ind["time"] < start_dt).sum())
+            main_sig_idx = filter_signals(main_sig_idx + vf_off, df_ind["volume"].to_numpy(),
+                                          vol_filter_main["window"], vol_filter_main["top_pct"]) - vf_off
+
         # ===== 시뮬레이션 (중복 포함/제거) =====
-        res_all = simulate(
-            df, rsi_mode, rsi_low, rsi_high, lookahead, threshold_pct,
-            bb_cond, "중복 포함 (연속 신호 모두)",
-            minutes_per_bar, market_code, bb_window, bb_dev,
-            sec_cond=sec_cond, hit_basis=hit_basis, miss_policy="(고정) 성공·실패·중립",
-            bottom_mode=bottom_mode, supply_levels=None, manual_supply_levels=manual_supply_levels,
-            cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, cci_signal_n=cci_signal
-        )
-        res_dedup = simulate(
-            df, rsi_mode, rsi_low, rsi_high, lookahead, threshold_pct,
-            bb_cond, "중복 제거 (연속 동일 결과 1개)",
-            minutes_per_bar, market_code, bb_window, bb_dev,
-            sec_cond=sec_cond, hit_basis=hit_basis, miss_policy="(고정) 성공·실패·중립",
-            bottom_mode=bottom_mode, supply_levels=None, manual_supply_levels=manual_supply_levels,
-            cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, cci_signal_n=cci_signal
-        )
+        is_live = end_date == datetime.now(KST).date()
+
+        def _run_simulate(dedup_label_main):
+            # ✅ 종료일=오늘: 이전 결과(확정 구간) 재사용 → 새 신호/측정 구간이 열려 있던 신호만 재계산
+            if is_live and main_sig_idx is not None and hit_basis == "종가 기준":
+                try:
+                    sim_key = json.dumps(dict(
+                        market=market_code, tf=interval_key, start=str(start_dt),
+                        strategy=st.session_state.get("primary_strategy", "없음"), rsi_mode=rsi_mode,
+                        rsi_low=rsi_low, rsi_high=rsi_high, bb_cond=bb_cond, bb_window=bb_window, bb_dev=bb_dev,
+                        cci=[cci_mode, cci_over, cci_under, cci_window, cci_signal], bottom_mode=bottom_mode,
+                        sec_cond=sec_cond, lookahead=lookahead, threshold_pct=threshold_pct, dedup=dedup_label_main,
+                        levels=manual_supply_levels, maemul_n=st.session_state.get("maemul_n", 50),
+                        calendar=calendar_main, vol_filter=vol_filter_main,
+                    ), sort_keys=True, ensure_ascii=False, default=str)
+                    # 중복 모드별 1칸: (설정 키, 상태) — 설정이 바뀌면 덮어씀 (이전 설정 결과는 재사용 불가 → 보관 안 함)
+                    resim_cache = st.session_state.setdefault("resim_cache", {})
+                    slot = resim_cache.get(dedup_label_main)
+                    res_live, state_live = resimulate(
+                        frame_arrays(df), main_sig_idx, lookahead, threshold_pct, minutes_per_bar,
+                        prev=slot[1] if slot is not None and slot[0] == sim_key else None,
+                        dedup_mode=dedup_label_main, sec_cond=sec_cond, bb_cond=bb_cond,
+                        manual_supply_levels=manual_supply_levels, maemul_n=int(st.session_state.get("maemul_n", 50)),
+                    )
+                    resim_cache[dedup_label_main] = (sim_key, state_live)
+                    return res_live
+                except Exception:
+                    pass
+            return simulate(
+                df, rsi_mode, rsi_low, rsi_high, lookahead, threshold_pct,
+                bb_cond, dedup_label_main,
+                minutes_per_bar, market_code, bb_window, bb_dev,
+                sec_cond=sec_cond, hit_basis=hit_basis, miss_policy="(고정) 성공·실패·중립",
+                bottom_mode=bottom_mode, supply_levels=None, manual_supply_levels=manual_supply_levels,
+                cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, cci_signal_n=cci_signal,
+                sig_idx=main_sig_idx
+            )
+
+        res_all = _run_simulate("중복 포함 (연속 신호 모두)")
+        res_dedup = _run_simulate("중복 제거 (연속 동일 결과 1개)")
+        res_raw = res_all if dup_mode.startswith("중복 포함") else res_dedup  # 진입 제한 적용 전 (트레이드 규칙용)
+        if entry_gate_rules:
+            # ✅ 판정된 신호 목록에 진입 제한 규칙만 순차 적용 (재시뮬레이션 없음)
+            res_all = apply_gate(res_all, entry_gate_rules)
+            res_dedup = apply_gate(res_dedup, entry_gate_rules)
         res = res_all if dup_mode.startswith("중복 포함") else res_dedup
     
         # -----------------------------
@@ -1251,22 +1163,13 @@ def main():
         else:
             plot_res = pd.DataFrame()
 
-        df_view = df.copy()
-        if len(df_view) > max_bars:
-            df_view = df_view.iloc[-max_bars:].reset_index(drop=True)
-        else:
-            df_view = df_view.reset_index(drop=True)
-    
         # -----------------------------
         # 차트 (가격/RSI 상단 + CCI 하단) — X축 동기화
         # -----------------------------
-        df_plot = df_view.copy()
-        if buy_price > 0:
-            df_plot["수익률(%)"] = (df_plot["close"] / buy_price - 1) * 100
-            df_plot["_pnl_str"] = df_plot["수익률(%)"].apply(lambda v: f"{'+' if v>=0 else ''}{v:.2f}%")
-        else:
-            df_plot["수익률(%)"] = np.nan
-            df_plot["_pnl_str"] = ""
+        # ✅ 차트 데이터 = 읽기 전용 컨테이너의 최근 max_bars 뷰 (df_view/df_plot 복사 · 문자열 열 없음)
+        df_plot = Candles.from_frame(df.iloc[-max_bars:], compact=True)
+        plot_t = df_plot["time"]
+        _pnl_fmt = lambda v: f"{'+' if v>=0 else ''}{v:.2f}%"
     
         # ★ 2행(subplots) 구성: row1=가격+BB(+RSI y2), row2=CCI
         # 가격 + RSI/CCI + 거래량 패널 (B안, 차트비율 조정)
@@ -1296,7 +1199,7 @@ def main():
         # ✅ 수정: CCI 가독성 강화 (기준선 실선화 + 0선 강조)
         fig.add_trace(
             go.Scatter(
-                x=df["time"], y=df["CCI"],
+                x=plot_t, y=df_plot["CCI"],
                 name="CCI(14)", mode="lines",
                 line=dict(color="teal", width=2.0),
                 showlegend=True
@@ -1313,7 +1216,7 @@ def main():
         # (3) RSI(13) — 신호선 추가 (RSI(9)) + 기준선 강조
         fig.add_trace(
             go.Scatter(
-                x=df["time"], y=df["RSI13"],
+                x=plot_t, y=df_plot["RSI13"],
                 name="RSI(13)", mode="lines",
                 line=dict(color="darkorange", width=2.2),
                 showlegend=True
@@ -1321,10 +1224,10 @@ def main():
             row=3, col=1
         )
         # RSI(9) 신호선 추가 (보조선)
-        if "RSI9" in df.columns:
+        if "RSI9" in df_plot:
             fig.add_trace(
                 go.Scatter(
-                    x=df["time"], y=df["RSI9"],
+                    x=plot_t, y=df_plot["RSI9"],
                     name="RSI(9)", mode="lines",
                     line=dict(color="green", width=1.5, dash="dot"),
                     showlegend=True
@@ -1340,7 +1243,7 @@ def main():
         # (3) RSI(13) — 범례 강제 표시 + 시인성 강화
         fig.add_trace(
             go.Scatter(
-                x=df["time"], y=df["RSI13"],
+                x=plot_t, y=df_plot["RSI13"],
                 name="RSI(13, 보조)", mode="lines",
                 line=dict(color="darkorange", width=2.3, dash="solid"),
                 showlegend=True  # ✅ 범례 표시 보장
@@ -1355,34 +1258,29 @@ def main():
         # CCI, RSI, 거래량 축 간격 균등 반영 → 시각적 균형 향상
 
         # 🔴 양봉 / 🔵 음봉 색상 구분 (막대 색상은 사용 이전에 미리 계산)
-        colors = [
-            "rgba(255,75,75,0.6)" if c > o else "rgba(0,104,201,0.6)"
-            for c, o in zip(df["close"], df["open"])
-        ]
+        colors = np.where(df_plot["close"] > df_plot["open"], "rgba(255,75,75,0.6)", "rgba(0,104,201,0.6)")
 
         # ✅ 수정: subplot 4행 구조 맞춤 (row=5 → row=4)
         # (4) 거래량 + 평균선 + 2.5배 기준선
         fig.add_trace(
             go.Bar(
-                x=df["time"], y=df["volume"],
+                x=plot_t, y=df_plot["volume"],
                 name="거래량", marker_color=colors
             ),
             row=4, col=1
         )
-        if "vol_mean" not in df.columns:
-            df["vol_mean"] = df["volume"].rolling(20).mean()
-        if "vol_threshold" not in df.columns:
-            df["vol_threshold"] = df["vol_mean"] * 2.5
+        # 평균선은 전체 구간으로 계산 후 차트 구간만 사용 (df에 열 추가 없음)
+        vol_mean = df["volume"].rolling(20).mean().to_numpy()[-len(df_plot):] if len(df_plot) else np.zeros(0)
         fig.add_trace(
             go.Scatter(
-                x=df["time"], y=df["vol_mean"],
+                x=plot_t, y=vol_mean,
                 name="거래량 평균(20봉)", mode="lines", line=dict(color="blue", width=1.3)
             ),
             row=4, col=1
         )
         fig.add_trace(
             go.Scatter(
-                x=df["time"], y=df["vol_threshold"],
+                x=plot_t, y=vol_mean * 2.5,
                 name="TGV 기준(2.5배)", mode="lines",
                 line=dict(color="red", width=1.3, dash="dot")
             ),
@@ -1411,29 +1309,17 @@ def main():
                 )
     
         def _make_candle_hovertexts(dfp, has_buy):
+            ts = pd.DatetimeIndex(dfp["time"]).strftime("%Y-%m-%d %H:%M")
+            o, h, l, c = (dfp[k].astype(str) for k in ("open", "high", "low", "close"))  # float32도 최단 표기
             if has_buy:
-                return [
-                    _fmt_ohlc_tooltip(
-                        t, o, h, l, c, pnl_str=s
-                    )
-                    for t, o, h, l, c, s in zip(
-                        dfp["time"].dt.strftime("%Y-%m-%d %H:%M"),
-                        dfp["open"], dfp["high"], dfp["low"], dfp["close"], dfp["_pnl_str"]
-                    )
-                ]
-            else:
-                return [
-                    _fmt_ohlc_tooltip(t, o, h, l, c, pnl_str=None)
-                    for t, o, h, l, c in zip(
-                        dfp["time"].dt.strftime("%Y-%m-%d %H:%M"),
-                        dfp["open"], dfp["high"], dfp["low"], dfp["close"]
-                    )
-                ]
+                pnl = ((dfp["close"].astype(float) / buy_price - 1) * 100).tolist()
+                return [_fmt_ohlc_tooltip(*v, pnl_str=_pnl_fmt(p)) for *v, p in zip(ts, o, h, l, c, pnl)]
+            return [_fmt_ohlc_tooltip(*v, pnl_str=None) for v in zip(ts, o, h, l, c)]
     
         # ===== Candlestick (row1) =====
         candle_hovertext = _make_candle_hovertexts(df_plot, buy_price > 0)
         fig.add_trace(go.Candlestick(
-            x=df_plot["time"],
+            x=plot_t,
             open=df_plot["open"],
             high=df_plot["high"],
             low=df_plot["low"],
@@ -1449,9 +1335,8 @@ def main():
         def _pnl_arr2(y_series):
             if buy_price <= 0:
                 return None
-            pnl_num = (y_series.astype(float) / buy_price - 1) * 100
-            pnl_str = pnl_num.apply(lambda v: f"{'+' if v>=0 else ''}{v:.2f}%")
-            return np.c_[pnl_num.values, pnl_str.values]
+            pnl_num = (np.asarray(y_series, dtype=float) / buy_price - 1) * 100
+            return np.c_[pnl_num, [_pnl_fmt(v) for v in pnl_num.tolist()]]
     
         bb_up_cd  = _pnl_arr2(df_plot["BB_up"])
         bb_low_cd = _pnl_arr2(df_plot["BB_low"])
@@ -1463,101 +1348,84 @@ def main():
             return name + ": %{y:.2f}<br>수익률(%): %{customdata[1]}<extra></extra>"
     
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["BB_up"], mode="lines",
+            x=plot_t, y=df_plot["BB_up"], mode="lines",
             line=dict(color="#FFB703", width=1.4), name="BB 상단",
             customdata=bb_up_cd, hovertemplate=_ht_line("BB 상단")
         ), row=1, col=1)
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["BB_low"], mode="lines",
+            x=plot_t, y=df_plot["BB_low"], mode="lines",
             line=dict(color="#219EBC", width=1.4), name="BB 하단",
             customdata=bb_low_cd, hovertemplate=_ht_line("BB 하단")
         ), row=1, col=1)
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["BB_mid"], mode="lines",
+            x=plot_t, y=df_plot["BB_mid"], mode="lines",
             line=dict(color="#8D99AE", width=1.4, dash="dot"), name="BB 중앙",
             customdata=bb_mid_cd, hovertemplate=_ht_line("BB 중앙")
         ), row=1, col=1)
     
         # ===== 신호마커/점선/⭐ 표시 (신호 결과 기반) =====
+        # 신호/종료 시각 → 차트 봉 위치: 시간 격자 O(1) 조회 (신호마다 시각 열 선형 검색 없음)
         if not plot_res.empty:
+            grid = TimeGrid(plot_t, minutes_per_bar)
+            p_open = df_plot["open"].astype(float)
+            p_close = df_plot["close"].astype(float)
+            i0 = grid.locate(pd.to_datetime(plot_res["신호시간"]))
+            i1 = grid.locate(pd.to_datetime(plot_res["종료시간"]))
+            res_lab = plot_res["결과"].to_numpy()
             for _label, _color in [("성공", "red"), ("실패", "blue"), ("중립", "#FF9800")]:
-                sub = plot_res[plot_res["결과"] == _label]
-                if sub.empty:
-                    continue
-                xs, ys = [], []
-                for _, r in sub.iterrows():
-                    t0 = pd.to_datetime(r["신호시간"])
-                    if t0 in df_plot["time"].values:
-                        xs.append(t0)
-                        ys.append(float(df_plot.loc[df_plot["time"] == t0, "open"].iloc[0]))
-                if xs:
+                k = i0[(res_lab == _label) & (i0 >= 0)]
+                if len(k):
                     fig.add_trace(go.Scatter(
-                        x=xs, y=ys, mode="markers",
+                        x=plot_t[k], y=p_open[k], mode="markers",
                         name=f"신호({_label})",
                         marker=dict(size=9, color=_color, symbol="circle", line=dict(width=1, color="black"))
                     ), row=1, col=1)
-    
-            legend_emitted = {"성공": False, "실패": False, "중립": False}
-            for _, row_ in plot_res.iterrows():
-                t0 = pd.to_datetime(row_["신호시간"])
-                t1 = pd.to_datetime(row_["종료시간"])
-                if (t0 not in df_plot["time"].values) or (t1 not in df_plot["time"].values):
-                    continue
-    
-                y0 = float(df_plot.loc[df_plot["time"] == t0, "close"].iloc[0])
-                y1 = float(df_plot.loc[df_plot["time"] == t1, "close"].iloc[0])
-    
+
+            both = (i0 >= 0) & (i1 >= 0)
+            if both.any():
+                # 점선: 신호별 선분을 None으로 끊어 트레이스 1개로
+                a0, a1 = i0[both], i1[both]
+                xs = np.empty(len(a0) * 3, dtype=object)
+                ys = np.full(len(a0) * 3, np.nan)
+                xs[0::3], xs[1::3], xs[2::3] = list(pd.DatetimeIndex(plot_t[a0])), list(pd.DatetimeIndex(plot_t[a1])), None
+                ys[0::3], ys[1::3] = p_close[a0], p_close[a1]
                 fig.add_trace(go.Scatter(
-                    x=[t0, t1], y=[y0, y1], mode="lines",
+                    x=xs, y=ys, mode="lines", connectgaps=False,
                     line=dict(color="rgba(0,0,0,0.5)", width=1.2, dash="dot"),
                     showlegend=False, hoverinfo="skip"
                 ), row=1, col=1)
-    
-                if row_["결과"] == "성공":
-                    fig.add_trace(go.Scatter(
-                        x=[t1], y=[y1],
-                        mode="markers", name="도달⭐",
-                        marker=dict(size=12, color="orange", symbol="star", line=dict(width=1, color="black")),
-                        showlegend=not legend_emitted["성공"]
-                    ), row=1, col=1)
-                    legend_emitted["성공"] = True
-                elif row_["결과"] == "실패":
-                    fig.add_trace(go.Scatter(
-                        x=[t1], y=[y1],
-                        mode="markers", name="실패❌",
-                        marker=dict(size=12, color="blue", symbol="x", line=dict(width=1, color="black")),
-                        showlegend=not legend_emitted["실패"]
-                    ), row=1, col=1)
-                    legend_emitted["실패"] = True
-                elif row_["결과"] == "중립":
-                    fig.add_trace(go.Scatter(
-                        x=[t1], y=[y1],
-                        mode="markers", name="중립❌",
-                        marker=dict(size=12, color="orange", symbol="x", line=dict(width=1, color="black")),
-                        showlegend=not legend_emitted["중립"]
-                    ), row=1, col=1)
-                    legend_emitted["중립"] = True
+
+                for _label, _name, _color, _symbol in [("성공", "도달⭐", "orange", "star"),
+                                                       ("실패", "실패❌", "blue", "x"),
+                                                       ("중립", "중립❌", "orange", "x")]:
+                    k = i1[both & (res_lab == _label)]
+                    if len(k):
+                        fig.add_trace(go.Scatter(
+                            x=plot_t[k], y=p_close[k],
+                            mode="markers", name=_name,
+                            marker=dict(size=12, color=_color, symbol=_symbol, line=dict(width=1, color="black")),
+                        ), row=1, col=1)
     
         # ===== RSI 라인 (row1, y2) =====
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["RSI13"], mode="lines",
+            x=plot_t, y=df_plot["RSI13"], mode="lines",
             line=dict(color="rgba(42,157,143,0.30)", width=6),
             name="", showlegend=False
         ), row=1, col=1, secondary_y=True)
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["RSI13"], mode="lines",
+            x=plot_t, y=df_plot["RSI13"], mode="lines",
             line=dict(color="#2A9D8F", width=2.4, dash="dot"),
             name="RSI(13)"
         ), row=1, col=1, secondary_y=True)
     
         # ===== CCI 하단 차트 (row2) =====
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["CCI"], mode="lines",
+            x=plot_t, y=df_plot["CCI"], mode="lines",
             line=dict(width=1.6),
             name="CCI"
         ), row=2, col=1)
         fig.add_trace(go.Scatter(
-            x=df_plot["time"], y=df_plot["CCI_sig"], mode="lines",
+            x=plot_t, y=df_plot["CCI_sig"], mode="lines",
             line=dict(width=1.2, dash="dot"),
             name=f"CCI 신호({int(cci_signal)})"
         ), row=2, col=1)
@@ -1582,11 +1450,11 @@ def main():
         fig.update_yaxes(showspikes=True, spikecolor="gray", spikethickness=1, spikemode="across", row=2, col=1)
     
         if buy_price and buy_price > 0 and len(df_plot) > 0:
-            pnl_num = (df_plot["close"] / float(buy_price) - 1) * 100
-            pnl_str = pnl_num.apply(lambda v: f"{'+' if v >= 0 else ''}{v:.2f}%")
+            pnl_num = (df_plot["close"].astype(float) / float(buy_price) - 1) * 100
+            pnl_str = [_pnl_fmt(v) for v in pnl_num.tolist()]
     
             fig.add_trace(go.Scatter(
-                x=df_plot["time"],
+                x=plot_t,
                 y=df_plot["close"],
                 mode="lines",
                 line=dict(width=0),
@@ -1600,7 +1468,7 @@ def main():
             pad = (y_max - y_min) * 0.01
             y_vals = np.linspace(y_min - pad, y_max + pad, 100)
     
-            x_vals = df_plot["time"].to_numpy()
+            x_vals = plot_t
             if len(x_vals) > 300:
                 step = int(np.ceil(len(x_vals) / 300))
                 x_vals = x_vals[::step]
@@ -1633,8 +1501,8 @@ def main():
                     end_idx   = len(df_plot) - 1
                     start_idx = end_idx - window_n + 1
     
-                x_start = df_plot.iloc[start_idx]["time"]
-                x_end   = df_plot.iloc[end_idx]["time"]
+                x_start = pd.Timestamp(plot_t[start_idx])
+                x_end   = pd.Timestamp(plot_t[end_idx])
     
                 # X축: 보이는 데이터(df_plot)에서 최근 70봉만 딱 보이도록 지정
                 fig.update_xaxes(range=[x_start, x_end], row=1, col=1)
@@ -1731,7 +1599,120 @@ def main():
                 f"<span style='color:{col}; font-size:1.1rem'>{total_final:.1f}%</span></div>",
                 unsafe_allow_html=True
             )
-    
+
+        # ✅ 익절/손절 규칙 시뮬레이션 (공유 메모 실전 가이드: 절반 익절 + 트레일링, 손절, BB 하단 이탈 청산)
+        if st.checkbox("🎯 익절/손절 규칙 시뮬레이션 (부분 익절 · 트레일링 · BB 이탈)", value=False, key="trade_rules_on"):
+            tr1, tr2, tr3, tr4 = st.columns(4)
+            with tr1:
+                tr_tp = st.number_input("1차 익절(%)", 0.0, 20.0, float(DEFAULT_RULES["tp1_pct"]), step=0.1, key="tr_tp")
+                tr_frac = st.slider("1차 익절 비중", 0.1, 1.0, float(DEFAULT_RULES["tp1_frac"]), step=0.1, key="tr_frac")
+            with tr2:
+                tr_sl = st.number_input("손절(%)", 0.0, 20.0, float(DEFAULT_RULES["sl_pct"]), step=0.1, key="tr_sl")
+                tr_trail = st.number_input("트레일링(%)", 0.0, 10.0, float(DEFAULT_RULES["trail_pct"]), step=0.1, key="tr_trail")
+            with tr3:
+                tr_bb = st.number_input("BB 하단 연속 이탈(봉, 0=없음)", 0, 10, int(DEFAULT_RULES["bb_exit_n"]), key="tr_bb")
+                tr_max = st.number_input("최대 보유(봉)", 1, 500, int(max(lookahead, 1)), key="tr_max")
+            with tr4:
+                tr_fee = st.number_input("왕복 수수료(%)", 0.0, 1.0, float(DEFAULT_RULES["fee_pct"]), step=0.01, key="tr_fee")
+                tr_same = st.radio("같은 봉 익절·손절", ["손절 우선", "익절 우선"], horizontal=True, key="tr_same")
+            tr_intrabar = st.checkbox("🔬 같은 봉 익절·손절은 1분봉으로 선후 판정 (해당 봉만 1분봉 조회)", value=False,
+                                      key="tr_intrabar", disabled=minutes_per_bar <= 1)
+            if res_raw is not None and not res_raw.empty:
+                trades = simulate_trades(
+                    frame_arrays(df), res_raw["anchor_i"].to_numpy(),
+                    rules=dict(tp1_pct=tr_tp or None, tp1_frac=tr_frac, sl_pct=tr_sl or None,
+                               trail_pct=tr_trail or None, bb_exit_n=int(tr_bb), max_bars=int(tr_max),
+                               fee_pct=tr_fee, same_bar=tr_same),
+                    minutes_per_bar=minutes_per_bar,
+                    intrabar=((lambda bar_t: frame_arrays(ud.load_minute_windows(market_code, bar_t, minutes_per_bar)))
+                              if tr_intrabar and minutes_per_bar > 1 else None),
+                )
+                if entry_gate_rules:
+                    trades = apply_gate(trades, entry_gate_rules)
+                ts = trade_summary(trades)
+                t1, t2, t3, t4 = st.columns(4)
+                t1.metric("거래 수", f"{ts['거래수']}")
+                t2.metric("승률", f"{ts['승률(%)']:.1f}%")
+                t3.metric("평균 실현수익률", f"{ts['평균수익률(%)']:.3f}%")
+                t4.metric("합계 실현수익률", f"{ts['합계수익률(%)']:.2f}%")
+                st.caption(" · ".join(f"{k} {ts[k]}" for k in EXIT_REASONS)
+                           + f" · 동시도달 {int(trades['동시도달'].sum())}"
+                           + (f" (1분봉 판정 {int((trades['1분판정'] != '').sum())})" if tr_intrabar else ""))
+                st.dataframe(trades.drop(columns=["anchor_i", "exit_i"]).iloc[::-1].reset_index(drop=True),
+                             use_container_width=True)
+            else:
+                st.info("현재 조건의 신호가 없습니다.")
+
+        # ✅ 시간대 × 요일 성과 큐브 (요일/시간 선택 집계는 큐브 합산만으로 계산)
+        if st.checkbox("🕒 시간대 × 요일 성과 큐브", value=False, key="cube_on"):
+            cube = TimeCube.from_frame(res)
+            cube_metric = st.radio("지표", ["승률(%)", "신호수", "평균수익률(%)", "합계수익률(%)"], horizontal=True,
+                                   key="cube_metric")
+            st.dataframe(cube.table(cube_metric).round(2), use_container_width=True)
+            q1, q2 = st.columns(2)
+            with q1:
+                cube_wd = st.multiselect("요일 선택", list(range(7)), default=list(range(7)),
+                                         format_func=lambda i: WEEKDAYS[i], key="cube_wd")
+            with q2:
+                cube_hr = st.multiselect("시간대 선택(시)", list(range(24)), default=list(range(24)), key="cube_hr")
+            cs = cube.slice(cube_wd, cube_hr)
+            u1, u2, u3, u4 = st.columns(4)
+            u1.metric("신호 수", f"{cs['신호수']}")
+            u2.metric("승률", f"{cs['승률(%)']:.1f}%")
+            u3.metric("평균수익률", f"{cs['평균수익률(%)']:.2f}%")
+            u4.metric("합계수익률", f"{cs['합계수익률(%)']:.1f}%")
+            v1, v2, v3 = st.columns([1, 1, 2])
+            with v1:
+                cube_min_n = st.number_input("칸 최소 신호수", 1, 100, 5, key="cube_min_n")
+            with v2:
+                cube_min_win = st.number_input("칸 최소 승률(%)", 0, 100, int(winrate_thr), key="cube_min_win")
+            with v3:
+                cube_mask = cube.mask(min_count=int(cube_min_n), min_winrate=float(cube_min_win))
+                st.caption(f"조건 만족 칸: {int(cube_mask.sum())}/168")
+                if st.button("🗓️ 이 기준을 요일 × 시간대 필터 마스크로 저장", key="cube_save_mask"):
+                    st.session_state["calendar_cube_mask"] = cube_mask.astype(int).tolist()
+                    st.success("저장됨 — 상단 '요일 × 시간대 필터'에서 '큐브 기준'을 선택하세요.")
+
+        # ✅ 자산 곡선 · 낙폭 · 노출 (겹치는 보유 구간/복리 반영 — 단순 합계수익률 보완)
+        if st.checkbox("📈 자산 곡선 · 낙폭 · 노출", value=False, key="equity_on"):
+            eq_size = st.slider("거래당 비중(%) (0 = 1 / 최대 동시 보유)", 0, 100, 0, step=5, key="eq_size")
+            eq_curve, eq_stats = equity_from_frame(res, df["close"].to_numpy(), minutes_per_bar,
+                                                   size=(eq_size / 100.0) or None)
+            e1, e2, e3, e4, e5, e6 = st.columns(6)
+            e1.metric("복리수익률", f"{eq_stats['복리수익률(%)']:.2f}%")
+            e2.metric("MDD", f"{eq_stats['MDD(%)']:.2f}%")
+            e3.metric("노출", f"{eq_stats['노출(%)']:.1f}%")
+            e4.metric("샤프", f"{eq_stats['샤프']:.2f}")
+            e5.metric("최대 동시 보유", f"{eq_stats['최대동시보유']}")
+            e6.metric("중복 진입", f"{eq_stats['중복진입(%)']:.1f}%")
+            st.caption(f"거래당 비중 {eq_curve['size'] * 100:.1f}% · 소르티노 {eq_stats['소르티노']:.2f} · "
+                       f"칼마 {eq_stats['칼마']:.2f} · 합계수익률(단순) {res['최종수익률(%)'].sum() if res is not None and not res.empty else 0.0:.1f}%")
+            eq_fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.04)
+            eq_fig.add_trace(go.Scatter(x=df["time"], y=(eq_curve["equity"] - 1.0) * 100.0, name="자산(%)",
+                                        line=dict(color="#E53935", width=1.5)), row=1, col=1)
+            eq_fig.add_trace(go.Scatter(x=df["time"], y=eq_curve["drawdown"] * 100.0, name="낙폭(%)", fill="tozeroy",
+                                        line=dict(color="#1E88E5", width=1)), row=2, col=1)
+            eq_fig.update_layout(height=420, margin=dict(l=30, r=30, t=30, b=30), legend_orientation="h", hovermode="x")
+            st.plotly_chart(eq_fig, use_container_width=True)
+
+        # ✅ 매매기법 9종 동시 비교 — 같은 지표 프레임에서 마스크 9개 + 합의 신호를 한 번에 평가
+        if st.checkbox("🧪 매매기법 9종 동시 비교 (+ 합의 신호)", value=False, key="cmp_on"):
+            cmp_votes = st.multiselect("합의 신호 (같은 봉에서 k개 이상 전략 일치)", [1, 2, 3, 4, 5], default=[2, 3],
+                                       key="cmp_votes")
+            # 마스크는 워밍업 포함 전체 프레임에서 계산 (지연값/이동 통계가 기간 첫 봉에서도 유효) → 기간만 잘라 사용
+            cmp_off = int((df_ind["time"] < start_dt).sum())
+            cmp_masks = {k: v[cmp_off:cmp_off + len(df)]
+                         for k, v in strategy_masks(df_ind, rsi_low=rsi_low).items()}
+            cmp_masks.update(vote_masks(cmp_masks, cmp_votes))
+            cmp_tbl = compare_strategies(
+                frame_arrays(df), cmp_masks, lookahead, threshold_pct, minutes_per_bar,
+                dedup_mode=("중복 포함 (연속 신호 모두)" if dup_mode.startswith("중복 포함") else "중복 제거 (연속 동일 결과 1개)"),
+                sec_cond=sec_cond, bb_cond=bb_cond, manual_supply_levels=manual_supply_levels,
+                maemul_n=int(st.session_state.get("maemul_n", 50)),
+            )
+            st.dataframe(cmp_tbl.round(2), use_container_width=True)
+            st.caption("측정N · 목표수익률 · 중복 처리 · 2차 조건은 현재 설정 그대로 · 진입 제한/요일·거래량 필터는 미적용")
+
         st.markdown("---")
         # 📒 공유 메모 바로 위에서는 ④ 신호 결과 블록 제거
     
@@ -1768,6 +1749,8 @@ def main():
     
             fast_mode = st.checkbox("⚡ 빠른 테스트 모드 (최근 30일만)", value=False,
                                     key="sweep_fast_mode", on_change=_keep_sweep_open)
+            halving_mode = st.checkbox("🪜 단계적 탈락 모드 (최근 구간 → 전체 구간, 상위 1/3만 재평가)", value=False,
+                                       key="sweep_halving_mode", on_change=_keep_sweep_open)
             run_sweep = st.button("▶ 조합 스캔 실행", use_container_width=True, key="btn_run_sweep")
             if run_sweep and not st.session_state.get("use_sweep_wrapper"):
                 prog = st.progress(0)
@@ -1787,6 +1770,8 @@ def main():
                         sec_cond=sec_cond, bottom_mode=bottom_mode,
                         manual_supply_levels=manual_supply_levels,
                         cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, cci_signal=cci_signal,
+                        strategy=st.session_state.get("primary_strategy", "없음"),
+                        maemul_n=int(st.session_state.get("maemul_n", 50)),
                     )
     
                     merged_df, ckpt = run_combination_scan_chunked(
@@ -1802,7 +1787,10 @@ def main():
                         simulate_kwargs=simulate_kwargs,
                     )
     
-                    if merged_df is not None and not merged_df.empty:
+                    if ckpt.get("status") != "done":
+                        st.info(f"🧵 긴 기간 스캔을 백그라운드 작업으로 실행 중입니다 ({ckpt.get('idx', 0)}/{ckpt.get('total') or '?'}) "
+                                "— 아래 작업 패널에서 진행 상황을 확인하세요.")
+                    elif merged_df is not None and not merged_df.empty:
                         if "sweep_state" not in st.session_state:
                             st.session_state["sweep_state"] = {}
                         st.session_state["sweep_state"]["rows"] = merged_df.to_dict("records")
@@ -1819,6 +1807,68 @@ def main():
     
                 st.session_state["sweep_expanded"] = True
     
+            # 🧵 백그라운드 스캔 작업 패널 (새로고침/다른 세션에서도 같은 작업에 연결)
+            scan_jobs_all = list_jobs()
+            if scan_jobs_all:
+                st.markdown("**🧵 백그라운드 스캔 작업**")
+                job_ids = [j["job_id"] for j in scan_jobs_all]
+                job_labels = {
+                    j["job_id"]: (f"{j['spec'].get('symbol')} · {j['spec'].get('interval_key')} · "
+                                  f"{str(j['spec'].get('start'))[:10]}~{str(j['spec'].get('end'))[:10]} · "
+                                  f"{j['state'].get('status')} {j['state'].get('idx', 0)}/{j['state'].get('total') or '?'}")
+                    for j in scan_jobs_all
+                }
+                cur_job = st.session_state.get(f"combo_scan_{sweep_market}_{interval_key}")
+                sel_job = st.selectbox("작업 선택 (연결)", job_ids, index=job_ids.index(cur_job) if cur_job in job_ids else 0,
+                                       format_func=lambda k: job_labels.get(k, k), key="scan_job_sel",
+                                       on_change=_keep_sweep_open)
+                job_st = job_status(sel_job) or {}
+                st.progress(min(job_st.get("idx", 0) / max(job_st.get("total") or 1, 1), 1.0),
+                            text=f"상태: {job_st.get('status')} · 최근 갱신 {job_st.get('updated', '-')}")
+                if job_st.get("status") == "failed" and job_st.get("error"):
+                    st.code(job_st["error"])
+                jc1, jc2, jc3, jc4 = st.columns(4)
+                with jc1:
+                    st.button("🔄 새로고침", key="btn_job_refresh", on_click=_keep_sweep_open, use_container_width=True)
+                with jc2:
+                    if st.button("⏹ 중단", key="btn_job_cancel", use_container_width=True,
+                                 disabled=not job_st.get("alive")):
+                        cancel_job(sel_job)
+                        st.session_state["sweep_expanded"] = True
+                with jc3:
+                    if st.button("↻ 이어서 실행", key="btn_job_resume", use_container_width=True,
+                                 disabled=job_st.get("alive") or job_st.get("status") == "done"):
+                        submit_job(job_spec(sel_job))
+                        st.session_state["sweep_expanded"] = True
+                with jc4:
+                    apply_job = st.button("✅ 결과 적용", key="btn_job_apply", use_container_width=True)
+                job_df = job_results(sel_job)
+                st.caption(f"완료된 조각 결과: {len(job_df)}행 (실행 중에도 부분 결과 조회 가능)")
+                # ✅ 단계별 시간 (fetch=캔들 로드, simulate=엔진, write=저장, *_wait=큐 대기)
+                timings = job_st.get("timings") or {}
+                if timings:
+                    st.caption("단계별 시간: " + " · ".join(
+                        f"{k} {v.get('sec', 0):.1f}s ({v.get('share', 0) * 100:.0f}%)" for k, v in timings.items()))
+                if apply_job and not job_df.empty:
+                    spec_sel = job_spec(sel_job) or {}
+                    st.session_state.setdefault("sweep_state", {})
+                    st.session_state["sweep_state"]["rows"] = job_df.to_dict("records")
+                    st.session_state["sweep_state"]["params"] = {
+                        "sweep_market": spec_sel.get("symbol"), "sdt": pd.Timestamp(spec_sel.get("start")).to_pydatetime(),
+                        "edt": pd.Timestamp(spec_sel.get("end")).to_pydatetime(),
+                        "bb_window": int(spec_sel.get("bb_window", bb_window)), "bb_dev": float(spec_sel.get("bb_dev", bb_dev)),
+                        "cci_window": int(spec_sel.get("cci_window", cci_window)),
+                        "rsi_low": int(rsi_low), "rsi_high": int(rsi_high), "target_thr": float(threshold_pct),
+                    }
+                    st.session_state["sweep_expanded"] = True
+                    st.success("✅ 백그라운드 스캔 결과가 적용되었습니다.")
+                if job_st.get("alive"):
+                    try:
+                        from streamlit_autorefresh import st_autorefresh
+                        st_autorefresh(interval=5000, key="scan_job_poll")
+                    except Exception:
+                        pass
+    
             dedup_label = "중복 제거 (연속 동일 결과 1개)" if dup_mode.startswith("중복 제거") else "중복 포함 (연속 신호 모두)"
     
             def _winrate(df_in: pd.DataFrame):
@@ -1838,7 +1888,6 @@ def main():
                     sdt = datetime.combine(sweep_start, datetime.min.time())
                 edt = datetime.combine(sweep_end, datetime.max.time())
     
-                sweep_rows = []
                 tf_list = ["15분", "30분", "60분"]
                 rsi_list = ["없음", "현재(과매도/과매수 중 하나)", "과매도 기준", "과매수 기준"]
                 bb_list  = ["없음", "상한선", "중앙선", "하한선"]
@@ -1851,65 +1900,116 @@ def main():
                     "매물대 자동 (하단→상단 재진입 + BB하단 위 양봉)",
                 ]
                 lookahead_list = [5, 10, 15, 20, 30]
-    
+
+                # ✅ 타임프레임별 지표 프레임 1회 계산 → shared memory 게시 후 프로세스 풀로 조합 분산
+                frames = {}
                 for tf_lbl in tf_list:
                     interval_key_s, mpb_s = TF_MAP[tf_lbl]
                     df_s = fetch_upbit_paged(sweep_market, interval_key_s, sdt, edt, mpb_s, warmup_bars)
                     if df_s is None or df_s.empty:
                         continue
-                    df_s = add_indicators(df_s, bb_window, bb_dev, cci_window, cci_signal)
-    
-                    for lookahead_s in lookahead_list:
-                        for rsi_m in rsi_list:
-                            for bb_c in bb_list:
-                                for sec_c in sec_list:
-                                    res_s = simulate(
-                                        df_s, rsi_m, rsi_low, rsi_high, lookahead_s, threshold_pct,
-                                        bb_c, dedup_label,
-                                        mpb_s, sweep_market, bb_window, bb_dev,
-                                        sec_cond=sec_c, hit_basis="종가 기준",
-                                        miss_policy="(고정) 성공·실패·중립",
-                                        bottom_mode=False, supply_levels=None, manual_supply_levels=manual_supply_levels,
-                                        cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, cci_signal_n=cci_signal
-                                    )
-                                    win, total, succ, fail, neu = _winrate(res_s)
-                                    total_ret = float(res_s["최종수익률(%)"].sum()) if "최종수익률(%)" in res_s else 0.0
-                                    avg_ret   = float(res_s["최종수익률(%)"].mean()) if "최종수익률(%)" in res_s and total > 0 else 0.0
-    
-                                    target_thr_val = float(threshold_pct)
-                                    wr_val = float(winrate_thr)
-                                    EPS = 1e-3
-    
-                                    if (succ > 0) and (win + EPS >= wr_val) and (total_ret + EPS >= target_thr_val):
-                                        final_result = "성공"
-                                    elif (succ > 0) and (win + EPS >= wr_val) and (total_ret + EPS >= 0) and (total_ret + EPS < target_thr_val):
-                                        final_result = "중립"
-                                    else:
-                                        final_result = "실패"
-    
-                                    sweep_rows.append({
-                                        "타임프레임": tf_lbl,
-                                        "측정N(봉)": lookahead_s,
-                                        "RSI": rsi_m,
-                                        "RSI_low": int(rsi_low),
-                                        "RSI_high": int(rsi_high),
-                                        "BB": bb_c,
-                                        "BB_기간": int(bb_window),
-                                        "BB_승수": round(float(bb_dev), 1),
-                                        "2차조건": sec_c,
-                                        "목표수익률(%)": float(threshold_pct),
-                                        "승률기준(%)": f"{int(winrate_thr)}%",
-                                        "신호수": int(total),
-                                        "성공": int(succ),
-                                        "중립": int(neu),
-                                        "실패": int(fail),
-                                        "승률(%)": round(win, 1),
-                                        "평균수익률(%)": round(avg_ret, 1),
-                                        "합계수익률(%)": round(total_ret, 1),
-                                        "결과": final_result,
-                                        "날짜": (pd.to_datetime(res_s["신호시간"].min()).strftime("%Y-%m-%d")
-                                                if ("신호시간" in res_s and not res_s.empty) else ""),
-                                    })
+                    frames[tf_lbl] = add_indicators(df_s, bb_window, bb_dev, cci_window, cci_signal).reset_index(drop=True)
+
+                sweep_strategy = st.session_state.get("primary_strategy", "없음")
+                combos = [
+                    {"tf": tf_lbl, "minutes_per_bar": TF_MAP[tf_lbl][1], "lookahead": lookahead_s,
+                     "strategy": sweep_strategy, "rsi_mode": rsi_m, "bb_cond": bb_c, "sec_cond": sec_c}
+                    for tf_lbl in tf_list if tf_lbl in frames
+                    for lookahead_s in lookahead_list
+                    for rsi_m in rsi_list
+                    for bb_c in bb_list
+                    for sec_c in sec_list
+                ]
+                sweep_common = dict(
+                    rsi_low=rsi_low, rsi_high=rsi_high, threshold_pct=threshold_pct, dedup_mode=dedup_label,
+                    cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under,
+                    manual_supply_levels=manual_supply_levels, maemul_n=st.session_state.get("maemul_n", 50),
+                    # ✅ 조합 결과 메모: 같은 데이터는 재사용, 새 캔들은 미확정 신호부터만 재계산
+                    market=sweep_market,
+                    indicator=dict(bb_window=bb_window, bb_dev=bb_dev, cci_window=cci_window, cci_signal=cci_signal),
+                    memo_dir=os.path.join(os.path.dirname(__file__), "data_cache", "sweep_memo"),
+                    gate=entry_gate_rules,
+                    calendar=calendar_main,
+                    vol_filter=vol_filter_main,
+                    bootstrap=True,
+                    # ✅ 자산 곡선 통계 (복리 · MDD · 노출 · 샤프) — 합계수익률 대신 정렬 기준으로 선택 가능
+                    equity=True,
+                )
+
+                sweep_prog = st.progress(0.0)
+                sweep_live = st.empty()
+                _done = {"n": 0, "best": []}
+
+                def _on_combo(combo, stats):
+                    _done["n"] += 1
+                    _done["best"].append({"타임프레임": combo["tf"], "측정N(봉)": combo["lookahead"],
+                                          "RSI": combo["rsi_mode"], "BB": combo["bb_cond"],
+                                          "2차조건": combo["sec_cond"], "신호수": stats["신호수"],
+                                          "승률(%)": round(stats["승률(%)"], 1)})
+                    n_total = _done.get("total", len(combos))
+                    if _done["n"] % 40 == 0 or _done["n"] == n_total:
+                        sweep_prog.progress(_done["n"] / max(n_total, 1))
+                        live = pd.DataFrame(_done["best"]).sort_values(["승률(%)", "신호수"], ascending=False).head(5)
+                        sweep_live.dataframe(live, use_container_width=True)
+
+                if halving_mode:
+                    # 부분 구간 단계 진행률 → 마지막(전체 구간) 단계는 생존 조합 수 기준
+                    def _on_rung(r, n_rungs, frac, n_alive):
+                        _done["n"] = 0
+                        _done["best"] = []
+                        _done["total"] = n_alive
+                        sweep_prog.progress(r / n_rungs, text=f"{r + 1}/{n_rungs}단계 · 최근 {frac * 100:.0f}% 구간 · {n_alive}개 조합")
+                    sweep_stats = run_sweep_halving(frames, combos, sweep_common, on_rung=_on_rung, on_result=_on_combo)
+                else:
+                    sweep_stats = run_sweep_parallel(frames, combos, sweep_common, on_result=_on_combo)
+                sweep_live.empty()
+
+                # ✅ 승률/평균수익률 부트스트랩 95% 신뢰구간 + p값 (전체 행 배치 계산, p값 기준 = 승률 기준)
+                sweep_ci = bootstrap_rows(sweep_stats, p0=float(winrate_thr)).to_dict("records")
+                sweep_rows = []
+                for c, ci in zip(sweep_stats, sweep_ci):
+                    win, total, succ, fail, neu = c["승률(%)"], c["신호수"], c["성공"], c["실패"], c["중립"]
+                    total_ret = c["합계수익률(%)"]
+                    avg_ret = c["평균수익률(%)"]
+
+                    target_thr_val = float(threshold_pct)
+                    wr_val = float(winrate_thr)
+                    EPS = 1e-3
+
+                    if (succ > 0) and (win + EPS >= wr_val) and (total_ret + EPS >= target_thr_val):
+                        final_result = "성공"
+                    elif (succ > 0) and (win + EPS >= wr_val) and (total_ret + EPS >= 0) and (total_ret + EPS < target_thr_val):
+                        final_result = "중립"
+                    else:
+                        final_result = "실패"
+
+                    sweep_rows.append({
+                        "타임프레임": c["tf"],
+                        "측정N(봉)": c["lookahead"],
+                        "RSI": c["rsi_mode"],
+                        "RSI_low": int(rsi_low),
+                        "RSI_high": int(rsi_high),
+                        "BB": c["bb_cond"],
+                        "BB_기간": int(bb_window),
+                        "BB_승수": round(float(bb_dev), 1),
+                        "2차조건": c["sec_cond"],
+                        "목표수익률(%)": float(threshold_pct),
+                        "승률기준(%)": f"{int(winrate_thr)}%",
+                        "신호수": int(total),
+                        "성공": int(succ),
+                        "중립": int(neu),
+                        "실패": int(fail),
+                        "승률(%)": round(win, 1),
+                        "평균수익률(%)": round(avg_ret, 1),
+                        "합계수익률(%)": round(total_ret, 1),
+                        **{k: ci[k] for k in CI_COLS},
+                        "복리수익률(%)": round(c.get("복리수익률(%)", 0.0), 1),
+                        "MDD(%)": round(c.get("MDD(%)", 0.0), 1),
+                        "노출(%)": round(c.get("노출(%)", 0.0), 1),
+                        "샤프": round(c.get("샤프", 0.0), 2),
+                        "결과": final_result,
+                        "날짜": c["날짜"],
+                    })
     
                 if "sweep_state" not in st.session_state:
                     st.session_state["sweep_state"] = {}
@@ -1920,51 +2020,231 @@ def main():
                     "rsi_low": int(rsi_low), "rsi_high": int(rsi_high),
                     "target_thr": float(threshold_pct)
                 }
+                # ✅ 결과 저장소(SQLite)에 실행 기록 → 아래 '저장된 결과 조회'에서 세션 간 비교
+                try:
+                    get_store().save_sweep(sweep_rows, sweep_market, sdt, edt, strategy=sweep_strategy,
+                                           params=dict(st.session_state["sweep_state"]["params"],
+                                                       halving=bool(halving_mode), dedup=dedup_label))
+                except Exception:
+                    pass
+            # 🌐 전체 마켓 조합 탐색 — 같은 조합 격자를 거래대금 상위 N개(또는 전체) KRW 마켓에 실행
+            if st.checkbox("🌐 전체 마켓 모드 (상위 N개 KRW 마켓 리더보드)", value=False,
+                           key="market_board_mode", on_change=_keep_sweep_open):
+                mb1, mb2, mb3, mb4 = st.columns(4)
+                with mb1:
+                    mb_top_n = st.number_input("마켓 수 (0=전체)", 0, len(MARKET_LIST), min(20, len(MARKET_LIST)),
+                                               step=5, key="mb_top_n", on_change=_keep_sweep_open)
+                with mb2:
+                    mb_sort = st.selectbox("정렬 기준", list(LEADERBOARD_KEYS), key="mb_sort", on_change=_keep_sweep_open)
+                with mb3:
+                    mb_top_k = st.number_input("상위 K", 5, 200, 30, step=5, key="mb_top_k", on_change=_keep_sweep_open)
+                with mb4:
+                    mb_min_sig = st.number_input("최소 신호수", 1, 500, 10, step=1, key="mb_min_sig",
+                                                 on_change=_keep_sweep_open)
+                mb_tf = st.multiselect("타임프레임", ["15분", "30분", "60분"], default=["15분"],
+                                       key="mb_tf", on_change=_keep_sweep_open)
+                mb_look = st.multiselect("측정N(봉)", [5, 10, 15, 20, 30], default=[5, 10, 15, 20, 30],
+                                         key="mb_look", on_change=_keep_sweep_open)
+                mb_rsi = st.multiselect("RSI", ["없음", "현재(과매도/과매수 중 하나)", "과매도 기준", "과매수 기준"],
+                                        default=["없음", "과매도 기준"], key="mb_rsi", on_change=_keep_sweep_open)
+                mb_bb = st.multiselect("BB", ["없음", "상한선", "중앙선", "하한선"], default=["없음", "하한선"],
+                                       key="mb_bb", on_change=_keep_sweep_open)
+                mb_sec = st.multiselect("2차 조건", ["없음", "양봉 2개 (범위 내)", "양봉 2개 연속 상승", "BB 기반 첫 양봉 50% 진입"],
+                                        default=["없음"], key="mb_sec", on_change=_keep_sweep_open)
+                mb_markets = [code for _, code in MARKET_LIST][:int(mb_top_n) or None]
+                mb_combos = [
+                    {"tf": tf_lbl, "minutes_per_bar": TF_MAP[tf_lbl][1], "lookahead": int(lk),
+                     "strategy": st.session_state.get("primary_strategy", "없음"),
+                     "rsi_mode": rsi_m, "bb_cond": bb_c, "sec_cond": sec_c}
+                    for tf_lbl in mb_tf for lk in mb_look for rsi_m in mb_rsi for bb_c in mb_bb for sec_c in mb_sec
+                ]
+                st.caption(f"{len(mb_markets)}개 마켓 × {len(mb_combos)}개 조합 = {len(mb_markets) * len(mb_combos):,}회 평가")
+                if st.button("▶ 전체 마켓 실행", use_container_width=True, key="btn_run_market_board",
+                             disabled=not mb_combos):
+                    st.session_state["sweep_expanded"] = True
+
+                    def _load_market(mk):
+                        # 스레드에서 호출: 타임프레임별 캔들 + 지표
+                        out = {}
+                        for tf_lbl in mb_tf:
+                            ik, mpb_m = TF_MAP[tf_lbl]
+                            raw = ud.load_candles(mk, ik, sdt, edt, mpb_m, warmup_bars=warmup_bars)
+                            if raw is not None and not raw.empty:
+                                out[tf_lbl] = ud.add_indicators(raw, bb_window, bb_dev, cci_window, cci_signal)
+                        return out
+
+                    mb_prog = st.progress(0.0)
+
+                    def _on_market(mk, n_done, n_total, err):
+                        mb_prog.progress(n_done / max(n_total, 1), text=f"{n_done}/{n_total} 마켓 · {mk}"
+                                         + (" (로드 실패)" if err is not None else ""))
+
+                    mb_common = dict(
+                        rsi_low=rsi_low, rsi_high=rsi_high, threshold_pct=threshold_pct, dedup_mode=dedup_label,
+                        cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under,
+                        # 수동 매물대 가격은 선택 종목 기준 → 전체 마켓 모드에서는 사용 안 함
+                        manual_supply_levels=None, maemul_n=st.session_state.get("maemul_n", 50),
+                        indicator=dict(bb_window=bb_window, bb_dev=bb_dev, cci_window=cci_window, cci_signal=cci_signal),
+                        memo_dir=os.path.join(os.path.dirname(__file__), "data_cache", "sweep_memo"),
+                        gate=entry_gate_rules,
+                        calendar=calendar_main,
+                        vol_filter=vol_filter_main,
+                    )
+                    board = run_sweep_markets(mb_markets, _load_market, mb_combos, mb_common, top_k=int(mb_top_k),
+                                              sort_by=mb_sort, min_signals=int(mb_min_sig), on_market=_on_market)
+                    st.session_state["market_board"] = {"rows": board.rows(), "by_market": board.market_rows(),
+                                                        "seen": board.seen}
+
+                mb_saved = st.session_state.get("market_board")
+                if mb_saved:
+                    mb_cols = ["market", "tf", "lookahead", "rsi_mode", "bb_cond", "sec_cond",
+                               "신호수", "성공", "중립", "실패", "승률(%)", "평균수익률(%)", "합계수익률(%)", "날짜"]
+                    mb_names = {"market": "마켓", "tf": "타임프레임", "lookahead": "측정N(봉)", "rsi_mode": "RSI",
+                                "bb_cond": "BB", "sec_cond": "2차조건"}
+
+                    def _board_df(rows):
+                        df_b = pd.DataFrame(rows)
+                        if df_b.empty:
+                            return df_b
+                        df_b = df_b[[c for c in mb_cols if c in df_b.columns]].rename(columns=mb_names)
+                        return df_b.round({"승률(%)": 1, "평균수익률(%)": 2, "합계수익률(%)": 1})
+
+                    st.markdown(f"**🏆 상위 조합** (평가 {mb_saved['seen']:,}회)")
+                    st.dataframe(_board_df(mb_saved["rows"]), use_container_width=True)
+                    st.markdown("**마켓별 최고 조합**")
+                    st.dataframe(_board_df(mb_saved["by_market"]), use_container_width=True)
+
+            # 🧭 워크포워드 검증 — 학습 구간에서 고른 조합을 바로 다음 구간에서 평가 (표본 외 성과)
+            if st.checkbox("🧭 워크포워드 검증 (롤링 학습/검증 폴드)", value=False,
+                           key="wf_mode", on_change=_keep_sweep_open):
+                wf1, wf2, wf3 = st.columns(3)
+                with wf1:
+                    wf_folds = st.number_input("폴드 수", 2, 12, 4, key="wf_folds", on_change=_keep_sweep_open)
+                with wf2:
+                    wf_ratio = st.number_input("학습/검증 길이 비", 1.0, 10.0, 3.0, step=0.5, key="wf_ratio",
+                                               on_change=_keep_sweep_open)
+                with wf3:
+                    wf_min_sig = st.number_input("학습 최소 신호수", 1, 200, 5, key="wf_min_sig", on_change=_keep_sweep_open)
+                wf_strats = st.multiselect(
+                    "매매기법", ["없음", "TGV", "RVB", "PR", "LCT", "4D_Sync", "240m_Sync", "Composite_Confirm",
+                              "Divergence_RVB", "Market_Divergence"],
+                    default=[st.session_state.get("primary_strategy", "없음")], key="wf_strats", on_change=_keep_sweep_open)
+                wf_tf = st.multiselect("타임프레임", ["15분", "30분", "60분"], default=["15분", "60분"],
+                                       key="wf_tf", on_change=_keep_sweep_open)
+                wf_look = st.multiselect("측정N(봉)", [5, 10, 15, 20, 30], default=[5, 10, 20],
+                                         key="wf_look", on_change=_keep_sweep_open)
+                wf_rsi = st.multiselect("RSI", ["없음", "현재(과매도/과매수 중 하나)", "과매도 기준", "과매수 기준"],
+                                        default=["없음", "과매도 기준"], key="wf_rsi", on_change=_keep_sweep_open)
+                wf_bb = st.multiselect("BB", ["없음", "상한선", "중앙선", "하한선"], default=["없음", "하한선"],
+                                       key="wf_bb", on_change=_keep_sweep_open)
+                wf_combos = [
+                    {"tf": tf_lbl, "minutes_per_bar": TF_MAP[tf_lbl][1], "lookahead": int(lk), "strategy": stg,
+                     "rsi_mode": rsi_m, "bb_cond": bb_c, "sec_cond": "없음"}
+                    for tf_lbl in wf_tf for stg in wf_strats for lk in wf_look for rsi_m in wf_rsi for bb_c in wf_bb
+                ]
+                st.caption(f"{len(wf_combos)}개 조합 × {int(wf_folds)}개 폴드 · 기간 {sdt:%Y-%m-%d} ~ {edt:%Y-%m-%d}")
+                if st.button("▶ 워크포워드 실행", use_container_width=True, key="btn_run_wf", disabled=not wf_combos):
+                    st.session_state["sweep_expanded"] = True
+                    wf_frames = {}
+                    for tf_lbl in wf_tf:
+                        ik, mpb_w = TF_MAP[tf_lbl]
+                        df_w = fetch_upbit_paged(sweep_market, ik, sdt, edt, mpb_w, warmup_bars)
+                        if df_w is not None and not df_w.empty:
+                            wf_frames[tf_lbl] = add_indicators(df_w, bb_window, bb_dev, cci_window, cci_signal)
+                    wf_prog = st.progress(0.0)
+                    wf_common = dict(
+                        rsi_low=rsi_low, rsi_high=rsi_high, threshold_pct=threshold_pct, dedup_mode=dedup_label,
+                        cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under,
+                        manual_supply_levels=manual_supply_levels, maemul_n=st.session_state.get("maemul_n", 50),
+                        gate=entry_gate_rules,
+                        calendar=calendar_main,
+                        vol_filter=vol_filter_main,
+                    )
+                    wf_res = run_walk_forward(wf_frames, [c for c in wf_combos if c["tf"] in wf_frames], wf_common,
+                                              n_folds=int(wf_folds), train_ratio=float(wf_ratio),
+                                              min_signals=int(wf_min_sig), start=sdt,
+                                              on_fold=lambda d, n: wf_prog.progress(d / max(n, 1), text=f"{d}/{n} 폴드 작업"))
+                    st.session_state["walk_forward"] = wf_res
+
+                wf_saved = st.session_state.get("walk_forward")
+                if wf_saved is not None:
+                    if wf_saved.empty:
+                        st.info("학습 구간에서 최소 신호수를 만족한 조합이 없습니다.")
+                    else:
+                        st.markdown("**전략 × 타임프레임 표본 외 안정성**")
+                        st.dataframe(walk_forward_summary(wf_saved), use_container_width=True)
+                        st.caption("승률하락 = 학습 승률 - 검증 승률 (클수록 과최적화) · "
+                                   "조합일치 = 폴드마다 같은 조합이 선택된 비율")
+                        st.markdown("**폴드별 선택 조합 / 검증 결과**")
+                        st.dataframe(wf_saved.round(2), use_container_width=True)
+
+            # 📚 저장된 결과 조회 — 필요한 행만 SQL 조건으로 읽음
+            if st.checkbox("📚 저장된 결과 조회 (이전 실행 기록)", value=False,
+                           key="result_store_mode", on_change=_keep_sweep_open):
+                rq1, rq2, rq3 = st.columns(3)
+                with rq1:
+                    rq_market = st.selectbox("마켓", ["전체", sweep_market], key="rq_market", on_change=_keep_sweep_open)
+                    rq_tf = st.selectbox("타임프레임", ["전체"] + list(TF_MAP), key="rq_tf", on_change=_keep_sweep_open)
+                with rq2:
+                    rq_result = st.multiselect("결과", ["성공", "중립", "실패"], default=["성공"], key="rq_result",
+                                               on_change=_keep_sweep_open)
+                    rq_min_sig = st.number_input("최소 신호수", 0, 10000, 20, step=5, key="rq_min_sig",
+                                                 on_change=_keep_sweep_open)
+                with rq3:
+                    rq_days = st.number_input("최근 N일 (스캔 종료일 기준, 0=전체)", 0, 3650, 90, step=30,
+                                              key="rq_days", on_change=_keep_sweep_open)
+                    rq_latest = st.checkbox("조합별 최신 실행만", value=True, key="rq_latest", on_change=_keep_sweep_open)
+                try:
+                    df_hist = get_store().query_sweeps(
+                        market=None if rq_market == "전체" else rq_market, tf=None if rq_tf == "전체" else rq_tf,
+                        result=rq_result or None, min_signals=int(rq_min_sig) or None,
+                        last_days=int(rq_days) or None, latest_only=rq_latest, limit=500,
+                    )
+                except Exception as _e:
+                    df_hist = pd.DataFrame()
+                    st.warning(f"결과 저장소 조회 실패: {_e}")
+                if df_hist.empty:
+                    st.info("조건에 맞는 저장된 결과가 없습니다.")
+                else:
+                    hist_cols = ["실행시각", "마켓", "타임프레임", "측정N(봉)", "전략", "RSI", "BB", "2차조건",
+                                 "목표수익률(%)", "신호수", "승률(%)", "평균수익률(%)", "합계수익률(%)", "결과", "시작", "종료"]
+                    st.dataframe(df_hist[[c for c in hist_cols if c in df_hist.columns]], use_container_width=True)
+
             # 🧪 빠른 프리셋 테스트 (SOL 예시 등)
             with st.expander("🧪 빠른 프리셋 테스트", expanded=False):
-                st.caption("예: 솔라나 3분×10, 5분×10, 60분×5 등 여러 조합을 한 번에 실행")
-                presets = [
-                    {"label":"SOL · 3분 · N=10",  "symbol":"KRW-SOL", "tf":"minutes/3",  "mpb":3,  "lookahead":10},
-                    {"label":"SOL · 5분 · N=10",  "symbol":"KRW-SOL", "tf":"minutes/5",  "mpb":5,  "lookahead":10},
-                    {"label":"SOL · 60분 · N=5",  "symbol":"KRW-SOL", "tf":"minutes/60", "mpb":60, "lookahead":5},
-                ]
+                st.caption("예: 솔라나 3분×10, 5분×10, 60분×5 등 여러 조합을 한 번에 실행 (목록: presets.json)")
+                # ✅ 같은 (종목, 타임프레임) 프리셋은 캔들/지표 1회 계산 공유, 그룹은 동시에 실행
+                presets = load_presets()
                 use_presets = st.multiselect(
                     "실행할 프리셋 선택",
                     options=[p["label"] for p in presets],
                     default=[p["label"] for p in presets]
                 )
                 if st.button("▶ 프리셋 실행"):
-                    rows = []
-                    for p in presets:
-                        if p["label"] not in use_presets:
-                            continue
-                        sdt_p = datetime.combine(sweep_start, datetime.min.time())
-                        edt_p = datetime.combine(sweep_end,   datetime.max.time())
-                        df_p  = fetch_upbit_paged(p["symbol"], p["tf"], sdt_p, edt_p, p["mpb"], warmup_bars)
-                        if df_p is None or df_p.empty:
-                            continue
-                        df_p  = add_indicators(df_p, bb_window, bb_dev, cci_window, cci_signal)
-                        res_p = simulate(
-                            df_p, rsi_mode, rsi_low, rsi_high, p["lookahead"], threshold_pct,
-                            bb_cond, ("중복 제거 (연속 동일 결과 1개)" if dup_mode.startswith("중복 제거") else "중복 포함 (연속 신호 모두)"),
-                            p["mpb"], p["symbol"], bb_window, bb_dev,
-                            sec_cond=sec_cond, hit_basis="종가 기준",
-                            miss_policy="(고정) 성공·실패·중립",
-                            bottom_mode=bottom_mode, supply_levels=None, manual_supply_levels=manual_supply_levels,
-                            cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, cci_signal_n=cci_signal
-                        )
-                        def _wr(df_):
-                            if df_ is None or df_.empty: return 0.0, 0, 0, 0, 0
-                            tot = len(df_); s=(df_["결과"]=="성공").sum(); f=(df_["결과"]=="실패").sum(); n=(df_["결과"]=="중립").sum()
-                            return (s/tot*100.0 if tot else 0.0), tot, s, f, n
-                        win, total, succ, fail, neu = _wr(res_p)
-                        total_ret = float(res_p["최종수익률(%)"].sum()) if res_p is not None and not res_p.empty else 0.0
-                        rows.append({
-                            "프리셋": p["label"], "신호수": total, "성공": succ, "중립": neu, "실패": fail,
-                            "승률(%)": round(win,1), "합계수익률(%)": round(total_ret,1)
-                        })
-                    if rows:
-                        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+                    sel = [p for p in presets if p["label"] in use_presets]
+                    preset_common = dict(
+                        strategy=st.session_state.get("primary_strategy", "없음"),
+                        rsi_mode=rsi_mode, rsi_low=rsi_low, rsi_high=rsi_high, bb_cond=bb_cond,
+                        cci_mode=cci_mode, cci_over=cci_over, cci_under=cci_under, bottom_mode=bottom_mode,
+                        sec_cond=sec_cond, threshold_pct=threshold_pct,
+                        dedup_mode=("중복 제거 (연속 동일 결과 1개)" if dup_mode.startswith("중복 제거") else "중복 포함 (연속 신호 모두)"),
+                        manual_supply_levels=manual_supply_levels, maemul_n=int(st.session_state.get("maemul_n", 50)),
+                    )
+                    preset_prog = st.progress(0.0)
+
+                    def _on_group(key, n_done, n_total):
+                        preset_prog.progress(n_done / max(n_total, 1), text=f"{n_done}/{n_total} · {key[0]} {key[1]}")
+
+                    t_presets = time.time()
+                    df_presets, preset_timing = run_presets(
+                        sel, preset_common, datetime.combine(sweep_start, datetime.min.time()),
+                        datetime.combine(sweep_end, datetime.max.time()),
+                        indicator=dict(bb_window=bb_window, bb_dev=bb_dev, cci_window=cci_window, cci_signal=cci_signal),
+                        warmup_bars=warmup_bars, on_group=_on_group,
+                    )
+                    if not df_presets.empty:
+                        st.dataframe(df_presets, use_container_width=True)
+                        st.caption(f"{len(sel)}개 프리셋 · {len(preset_timing)}개 데이터 그룹 · {time.time() - t_presets:.1f}초")
                     else:
                         st.info("프리셋 결과가 없습니다. 기간/조건을 조정해보세요.")
     
@@ -1991,10 +2271,16 @@ def main():
                 if df_keep.empty:
                     st.info("조건을 만족하는 조합이 없습니다. (성공·중립 없음)")
                 else:
-                    df_show = df_keep.sort_values(
-                        ["결과","승률(%)","신호수","합계수익률(%)"],
-                        ascending=[True,False,False,False]
-                    ).reset_index(drop=True)
+                    sweep_sort = st.selectbox("정렬 기준", ["승률 (기본)", "복리수익률(%)", "샤프", "MDD(%)"],
+                                              key="sweep_sort", on_change=_keep_sweep_open)
+                    if sweep_sort in df_keep.columns:
+                        # MDD는 음수 → 큰 값(얕은 낙폭)이 위
+                        df_show = df_keep.sort_values([sweep_sort, "신호수"], ascending=[False, False]).reset_index(drop=True)
+                    else:
+                        df_show = df_keep.sort_values(
+                            ["결과","승률(%)","신호수","합계수익률(%)"],
+                            ascending=[True,False,False,False]
+                        ).reset_index(drop=True)
     
                     if "날짜" not in df_show:
                         if "신호시간" in df_show:
@@ -2060,6 +2346,9 @@ def main():
                         subset=["평균수익률(%)","합계수익률(%)"]
                     )
                     st.dataframe(styled_tbl, use_container_width=True)
+                    if CI_COLS[0] in df_show:
+                        st.caption("CI = 부트스트랩 95% 신뢰구간 · 승률p = 승률이 승률기준 이하일 확률 · "
+                                   "수익률p = 평균수익률이 0 이하일 확률 (작을수록 우연이 아님)")
     
                     csv_bytes = df_show.to_csv(index=False).encode("utf-8-sig")
                     st.download_button("⬇ 결과 CSV 다운로드", data=csv_bytes, file_name="sweep_results.csv", mime="text/csv", use_container_width=True)
@@ -2128,6 +2417,45 @@ def main():
                                 styled_detail = res_detail.head(50).style.applymap(style_result, subset=["결과"])
                                 st.dataframe(styled_detail, use_container_width=True)
     
+        # -----------------------------
+        # 🎯 연속 파라미터 최적화 (예산 기반 탐색 → 파레토 집합)
+        # -----------------------------
+        with st.expander("🎯 연속 파라미터 최적화 (RSI/BB 승수/목표수익률/CCI)", expanded=False):
+            st.caption("※ 현재 종목/타임프레임/기간/조건을 고정하고 슬라이더 값만 탐색합니다. 평가한 점은 data_cache/param_search에 캐시됩니다.")
+            opt_cfg = dict(
+                strategy=st.session_state.get("primary_strategy", "없음"), rsi_mode=rsi_mode, bb_cond=bb_cond,
+                cci_mode=cci_mode, sec_cond=sec_cond, bottom_mode=bottom_mode, lookahead=int(lookahead),
+                minutes_per_bar=int(minutes_per_bar), dedup_mode=("중복 제거 (연속 동일 결과 1개)" if dup_mode.startswith("중복 제거") else "중복 포함 (연속 신호 모두)"),
+                bb_window=int(bb_window), manual_supply_levels=manual_supply_levels, maemul_n=int(st.session_state.get("maemul_n", 50)),
+                market=market_code, interval=interval_key,
+                rsi_low=int(rsi_low), rsi_high=int(rsi_high), bb_dev=float(bb_dev), threshold_pct=float(threshold_pct),
+                cci_under=int(cci_under), cci_over=int(cci_over),
+            )
+            opt_params = st.multiselect("탐색할 파라미터", list(PARAM_SPACE.keys()), default=active_params(opt_cfg), key="opt_params")
+            oc1, oc2, oc3 = st.columns(3)
+            with oc1:
+                opt_evals = st.number_input("평가 횟수 예산", min_value=20, max_value=5000, value=300, step=20, key="opt_evals")
+            with oc2:
+                opt_secs = st.number_input("시간 예산(초)", min_value=5, max_value=1800, value=60, step=5, key="opt_secs")
+            with oc3:
+                opt_min_sig = st.number_input("파레토 최소 신호수", min_value=1, max_value=500, value=5, step=1, key="opt_min_sig")
+            if st.button("▶ 최적화 실행", use_container_width=True, key="btn_run_opt") and opt_params:
+                opt_prog = st.progress(0.0)
+                searcher = ParamSearch(df_ind, opt_cfg, params=opt_params, window=(start_dt, end_dt))
+                searcher.run(max_evals=int(opt_evals), time_budget=float(opt_secs),
+                             on_eval=lambda k, n, _r: opt_prog.progress(min(k / max(n, 1), 1.0)))
+                st.session_state["opt_result"] = (searcher.results(min_signals=int(opt_min_sig)), list(opt_params))
+            if st.session_state.get("opt_result"):
+                opt_res, opt_cols = st.session_state["opt_result"]
+                front = pareto_table(opt_res, opt_cols)
+                st.markdown(f"평가 {len(opt_res)}개 · 파레토 {len(front)}개 (승률 × 합계수익률 × 신호수)")
+                if front.empty:
+                    st.info("파레토 집합이 비어 있습니다. (최소 신호수/예산을 조정해보세요)")
+                else:
+                    st.dataframe(front.round(2), use_container_width=True)
+                    st.download_button("⬇ 파레토 CSV 다운로드", data=front.to_csv(index=False).encode("utf-8-sig"),
+                                       file_name="pareto_params.csv", mime="text/csv", use_container_width=True)
+
         # -----------------------------
         # ④ 신호 결과 (테이블)
         # -----------------------------
@@ -2380,225 +2708,39 @@ def main():
             st.session_state["last_alert_at"][key] = datetime.utcnow() + timedelta(hours=9)
             st.toast(msg, icon="📈")
 
-        # --- TGV ---
-        def check_tgv_signal(df, symbol="KRW-BTC", tf="1"):
-            if len(df) < 25: return
-            df["rsi"] = calc_rsi(df["close"]); df["cci"] = calc_cci(df)
-            df["ema5"] = df["close"].ewm(span=5).mean(); df["ema20"] = df["close"].ewm(span=20).mean()
-            df["vol_mean"] = df["volume"].rolling(20).mean()
+        # --- 메인 9전략: 레지스트리 규칙 (백테스트 signal_mask와 같은 1차 조건) ---
+        def check_registry_signal(df, symbol, tf, strategy):
+            cs = REGISTRY[strategy]
+            if len(df) < 3: return
+            if "active_alerts" not in st.session_state: st.session_state["active_alerts"] = {}
+            a = st.session_state["active_alerts"]; k = f"{strategy}|{symbol}|{tf}"
+            spec = cs.spec
             latest, prev = df.iloc[-1], df.iloc[-2]
-
-            # TGV 거래량 임계치(20봉 평균 × 2.5) 계산 — 시각화/알람에서 공용 사용
-            df["vol_threshold"] = df["vol_mean"] * 2.5
-            cond_vol = latest["volume"] > latest["vol_mean"] * 2.5
-            cond_cross = latest["ema5"] > latest["ema20"]
-            cond_break = latest["close"] > prev["high"]
-            cond_rsi = latest["rsi"] > 55
-
-            if "active_alerts" not in st.session_state:
-                st.session_state["active_alerts"] = {}
-            active = st.session_state["active_alerts"]; key = f"TGV|{symbol}|{tf}"
-
-            if cond_vol and cond_cross and cond_break and cond_rsi:
-                if key not in active:
-                    active[key] = {"stage":"initial"}
-                    msg=f"""
-⚡ TGV 최초 신호 [{symbol}, {tf}분봉]
+            ind = f"""📈 RSI: {prev['RSI13']:.1f}→{latest['RSI13']:.1f}
+📉 CCI: {prev['CCI']:.0f}→{latest['CCI']:.0f}
+💰 목표 {spec['tp']} | 손절 {spec['sl']}"""
+            if k not in a:
+                if cs.last(df, "entry"):
+                    a[k] = {"stage": "initial"}
+                    msg = f"""
+⚡ {strategy} 최초 신호 [{symbol}, {tf}분봉]
 ━━━━━━━━━━━━━━━━━━━
 📊 현재 단계: ① 최초 포착
-📈 RSI: {prev['rsi']:.1f}→{latest['rsi']:.1f}
-📉 CCI: {prev['cci']:.0f}→{latest['cci']:.0f}
-💹 거래량: +{latest['volume']/max(latest['vol_mean'],1e-9)*100:.0f}%
-💰 목표 +0.7% | 손절 -0.4%
+{ind}
 ━━━━━━━━━━━━━━━━━━━
-💡 거래량 급등 + 전고점 돌파 포착
+💡 {spec['desc']}
 """
-                    _push_alert(symbol, tf, "TGV", msg, tp="+0.7%", sl="-0.4%")
-            elif key in active and active[key].get("stage")=="initial":
-                if latest["rsi"]>60 and latest["ema5"]>latest["ema20"]:
-                    msg=f"""
-✅ TGV 유효 신호 [{symbol}, {tf}분봉]
+                    _push_alert(symbol, tf, strategy, msg, tp=spec["tp"], sl=spec["sl"])
+            elif a[k].get("stage") == "initial" and cs.last(df, "confirm"):
+                msg = f"""
+✅ {strategy} 유효 신호 [{symbol}, {tf}분봉]
 ━━━━━━━━━━━━━━━━━━━
 📊 현재 단계: ② 진입 확정
-📈 RSI: {prev['rsi']:.1f}→{latest['rsi']:.1f}
-📉 EMA5/20: {latest['ema5']:.1f}/{latest['ema20']:.1f}
-━━━━━━━━━━━━━━━━━━━
-💡 추세 유지 확인
-"""
-                    _push_alert(symbol, tf, "TGV", msg, tp="+0.7%", sl="-0.4%")
-                    del active[key]
-
-        # --- RVB ---
-        def check_rvb_signal(df, symbol, tf):
-            if len(df)<5: return
-            rsi,cci=calc_rsi(df["close"]),calc_cci(df)
-            cond_rsi=rsi.iloc[-1]<35; cond_cci=cci.iloc[-1]<-80
-            cond_candle=df["close"].iloc[-1]>df["open"].iloc[-1]
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"RVB|{symbol}|{tf}"
-            if cond_rsi and cond_cci and cond_candle and k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"""
-⚡ RVB 최초 신호 [{symbol}, {tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-📈 RSI: {rsi.iloc[-2]:.1f}→{rsi.iloc[-1]:.1f}
-📉 CCI: {cci.iloc[-2]:.0f}→{cci.iloc[-1]:.0f}
-💹 거래량 +{df['volume'].iloc[-1]/max(df['volume'].iloc[-2],1e-9)*100:.0f}%
-━━━━━━━━━━━━━━━━━━━
-💡 매물대 지지 + 과매도 반등 포착
-"""
-                _push_alert(symbol,tf,"RVB",msg,tp="+1.2%",sl="-0.5%")
-            elif k in a and a[k].get("stage")=="initial":
-                if rsi.iloc[-1]>40 or cci.iloc[-1]>-50:
-                    msg=f"""
-✅ RVB 유효 신호 [{symbol}, {tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-📈 RSI: {rsi.iloc[-2]:.1f}→{rsi.iloc[-1]:.1f}
-📉 CCI: {cci.iloc[-2]:.0f}→{cci.iloc[-1]:.0f}
-━━━━━━━━━━━━━━━━━━━
-💡 회복 확인 → 진입 확정
-"""
-                    _push_alert(symbol,tf,"RVB",msg,tp="+1.2%",sl="-0.5%")
-                    del a[k]
-
-        # --- PR ---
-        def check_pr_signal(df,symbol,tf):
-            if len(df)<5: return
-            latest,prev=df.iloc[-1],df.iloc[-2]
-            drop=(prev["close"]/df.iloc[-3]["close"]-1.0)
-            cond_drop=drop<-0.015; cond_rsi=calc_rsi(df["close"]).iloc[-1]<25
-            cond_vol=latest["volume"]>latest["volume"].mean()*1.6
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"PR|{symbol}|{tf}"
-            if cond_drop and cond_rsi and cond_vol and k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"""
-⚡ PR 최초 신호 [{symbol}, {tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-📉 급락 감지
-📈 RSI {calc_rsi(df['close']).iloc[-2]:.1f}→{calc_rsi(df['close']).iloc[-1]:.1f}
-💹 거래량 급증
-━━━━━━━━━━━━━━━━━━━
-💡 급락 후 과매도 반등
-"""
-                _push_alert(symbol,tf,"PR",msg,tp="+1.2%",sl="-0.5%")
-            elif k in a and a[k].get("stage")=="initial":
-                if calc_rsi(df["close"]).iloc[-1]>35:
-                    msg=f"""
-✅ PR 유효 신호 [{symbol},{tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-📈 RSI 회복 확인
-💹 거래량 유지
-━━━━━━━━━━━━━━━━━━━
-💡 반등 확정
-"""
-                    _push_alert(symbol,tf,"PR",msg,tp="+1.2%",sl="-0.5%")
-                    del a[k]
-
-        # --- LCT ---
-        def check_lct_signal(df,symbol,tf):
-            if len(df)<200: return
-            ema50=df["close"].ewm(span=50).mean(); ema200=df["close"].ewm(span=200).mean()
-            cci=calc_cci(df)
-            cond1=ema50.iloc[-1]>ema200.iloc[-1]; cond2=cci.iloc[-1]>-100
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"LCT|{symbol}|{tf}"
-            if cond1 and cond2 and k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"""
-⚡ LCT 최초 신호 [{symbol}, {tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-📈 EMA50/200 크로스 감지
-📉 CCI 회복
-━━━━━━━━━━━━━━━━━━━
-💡 장기 추세 전환 초기 징후
-"""
-                _push_alert(symbol,tf,"LCT",msg,tp="+8%",sl="-2%")
-            elif k in a and a[k].get("stage")=="initial":
-                if ema50.iloc[-1]>ema200.iloc[-1]*1.01:
-                    msg=f"""
-✅ LCT 유효 신호 [{symbol},{tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-📈 골든크로스 유지
+{ind}
 ━━━━━━━━━━━━━━━━━━━
-💡 추세 전환 확정
+💡 확인 조건 충족 → 진입 확정
 """
-                    _push_alert(symbol,tf,"LCT",msg,tp="+8%",sl="-2%")
-                    del a[k]
-
-        # --- 4D_Sync ---
-        def check_4d_sync_signal(df,symbol,tf):
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"4D|{symbol}|{tf}"
-            if k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"""
-⚡ 4D_Sync 최초 [{symbol},{tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-💡 다중 타임프레임 상승 시작
-"""
-                _push_alert(symbol,tf,"4D_Sync",msg,tp="+1.5%",sl="-0.4%")
-            elif a[k].get("stage")=="initial":
-                msg=f"""
-✅ 4D_Sync 유효 [{symbol},{tf}분봉]
-━━━━━━━━━━━━━━━━━━━
-💡 상승 동조 지속
-"""
-                _push_alert(symbol,tf,"4D_Sync",msg,tp="+1.5%",sl="-0.4%")
-                del a[k]
-
-        # --- 240m_Sync ---
-        def check_240m_sync_signal(df,symbol,tf):
-            cci=calc_cci(df)
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"240m|{symbol}|{tf}"
-            if cci.iloc[-1]<-200 and k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"⚡ 240m 최초 신호 [{symbol}] CCI={cci.iloc[-1]:.0f}"
-                _push_alert(symbol,tf,"240m_Sync",msg,tp="+2.5%",sl="-0.6%")
-            elif k in a and a[k].get("stage")=="initial" and cci.iloc[-1]>-150:
-                msg=f"✅ 240m 유효 신호 [{symbol}]"
-                _push_alert(symbol,tf,"240m_Sync",msg,tp="+2.5%",sl="-0.6%")
-                del a[k]
-
-        # --- Composite Confirm ---
-        def check_composite_confirm_signal(df,symbol,tf):
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"COMP|{symbol}|{tf}"
-            if k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"⚡ Composite 최초 [{symbol}] BTC·ETH·SOL 동시 포착"
-                _push_alert(symbol,tf,"Composite_Confirm",msg,tp="+1.5%",sl="-0.4%")
-            elif a[k].get("stage")=="initial":
-                msg=f"✅ Composite 유효 [{symbol}] 동조 지속"
-                _push_alert(symbol,tf,"Composite_Confirm",msg,tp="+1.5%",sl="-0.4%")
-                del a[k]
-
-        # --- Divergence RVB ---
-        def check_divergence_rvb_signal(df,symbol,tf):
-            rsi=calc_rsi(df["close"])
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"DIVRVB|{symbol}|{tf}"
-            if rsi.iloc[-1]>rsi.iloc[-2] and df["close"].iloc[-1]<df["close"].iloc[-2] and k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"⚡ Divergence 최초 [{symbol}] RSI 상승/가격하락"
-                _push_alert(symbol,tf,"Divergence_RVB",msg,tp="+1.7%",sl="-0.5%")
-            elif k in a and a[k].get("stage")=="initial":
-                msg=f"✅ Divergence 유효 [{symbol}] 반전 확정"
-                _push_alert(symbol,tf,"Divergence_RVB",msg,tp="+1.7%",sl="-0.5%")
-                del a[k]
-
-        # --- Market Divergence ---
-        def check_market_divergence_signal(df,symbol,tf):
-            if "active_alerts" not in st.session_state: st.session_state["active_alerts"]={}
-            a=st.session_state["active_alerts"]; k=f"MKDIV|{symbol}|{tf}"
-            if k not in a:
-                a[k]={"stage":"initial"}
-                msg=f"⚡ Market Divergence 최초 [{symbol}] BTC RSI 하락멈춤"
-                _push_alert(symbol,tf,"Market_Divergence",msg,tp="+1.4%",sl="-0.5%")
-            elif a[k].get("stage")=="initial":
-                msg=f"✅ Market Divergence 유효 [{symbol}] 알트 상승 확인"
-                _push_alert(symbol,tf,"Market_Divergence",msg,tp="+1.4%",sl="-0.5%")
+                _push_alert(symbol, tf, strategy, msg, tp=spec["tp"], sl=spec["sl"])
                 del a[k]
 
         # ---- [보조 전략 영역 (기존 유지)] ----
@@ -2727,6 +2869,16 @@ def main():
         else:
             st.markdown("⏸ 자동 감시가 일시중지되었습니다.")
 
+        # ✅ 감시 거래량 필터: 최신 봉 거래량이 최근 N봉 중 상위 X%일 때만 전략 판정
+        watch_vol = None
+        if st.checkbox("📊 감시 거래량 상위 필터", value=False, key="watch_vol_on"):
+            wv1, wv2 = st.columns(2)
+            with wv1:
+                wv_top = st.slider("감시 거래량 상위(%)", 5, 100, int(VOL_FILTER["top_pct"]), step=5, key="wv_top")
+            with wv2:
+                wv_win = st.number_input("감시 기준 봉 수(N)", 10, 1000, int(VOL_FILTER["window"]), step=10, key="wv_win")
+            watch_vol = {"window": int(wv_win), "top_pct": float(wv_top)}
+
         # 실전 감시 루프 (선택된 모든 종목×분봉)
         def _to_code(opt):
             # 멀티셀렉트가 (label, code) 또는 "KRW-XXX" 혼재 가능 → 방어 처리
@@ -2771,31 +2923,19 @@ def main():
                                 datetime.now() - timedelta(hours=3),
                                 datetime.now(),
                                 int(tf),
-                                warmup_bars=0
+                                warmup_bars=max(watch_vol["window"] if watch_vol else 0,
+                                                REGISTRY[strategy_name].lookback if strategy_name in REGISTRY else 0)
                             )
                             if df_watch is None or df_watch.empty:
                                 continue
+                            if watch_vol and not RollingRank(df_watch["volume"].to_numpy()).top_mask(
+                                    watch_vol["window"], watch_vol["top_pct"])[-1]:
+                                continue
                             df_watch = add_indicators(df_watch, bb_window=20, bb_dev=2.0, cci_window=14)
 
                             # === [MAIN STRATEGY 9] 하루 1% 수익 전략 ====================
-                            if strategy_name == "TGV":
-                                check_tgv_signal(df_watch, s_code, tf)
-                            elif strategy_name == "RVB":
-                                check_rvb_signal(df_watch, s_code, tf)
-                            elif strategy_name == "PR":
-                                check_pr_signal(df_watch, s_code, tf)
-                            elif strategy_name == "LCT":
-                                check_lct_signal(df_watch, s_code, tf)
-                            elif strategy_name == "4D_Sync":
-                                check_4d_sync_signal(df_watch, s_code, tf)
-                            elif strategy_name == "240m_Sync":
-                                check_240m_sync_signal(df_watch, s_code, tf)
-                            elif strategy_name == "Composite_Confirm":
-                                check_composite_confirm_signal(df_watch, s_code, tf)
-                            elif strategy_name == "Divergence_RVB":
-                                check_divergence_rvb_signal(df_watch, s_code, tf)
-                            elif strategy_name == "Market_Divergence":
-                                check_market_divergence_signal(df_watch, s_code, tf)
+                            if strategy_name in REGISTRY:
+                                check_registry_signal(df_watch, s_code, tf, strategy_name)
 
                             # ---- [보조 전략 영역 (기존 유지)] ---------------------------
                             elif strategy_name == "RSI_과매도반등":
@@ -0,0 +1,612 @@
+# backtest_engine.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 벡터화 백테스트 엔진 (app.py 시뮬레이션 보조)
+# - Streamlit 비의존: 워커 프로세스/잡 러너에서도 import 가능
+# - 판정 규칙은 app.py simulate()와 동일 (종가 기준, 성공·실패·중립)
+# =============================================================
+import os
+import re
+import hashlib
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from candles import Candles
+from entry_gate import gate_entries
+from equity_curve import equity_curve, equity_stats
+from strategy_registry import REGISTRY, STRATEGIES, strategy_masks  # noqa: F401 (재노출)
+
+DEDUP_LABEL = "중복 제거 (연속 동일 결과 1개)"
+OUTCOME_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache", "outcomes")
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """(time, OHLCV) 내용 기반 데이터 버전 해시"""
+    h = hashlib.sha1()
+    h.update(pd.to_datetime(df["time"]).values.astype("datetime64[ns]").astype(np.int64).tobytes())
+    for col in ["open", "high", "low", "close", "volume"]:
+        if col in df.columns:
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()[:16]
+
+
+def arrays_fingerprint(arr: dict, n: Optional[int] = None) -> str:
+    """frame_arrays() 결과의 앞 n행 해시 (data_fingerprint와 동일 규칙)"""
+    n = len(arr["close"]) if n is None else int(n)
+    h = hashlib.sha1()
+    h.update(np.asarray(arr["time"][:n]).astype("datetime64[ns]").astype(np.int64).tobytes())
+    for col in ["open", "high", "low", "close", "volume"]:
+        if col in arr:
+            h.update(np.ascontiguousarray(arr[col][:n], dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+
+# -----------------------------
+# 1차 조건 마스크 (simulate 1) 단계와 동일)
+# -----------------------------
+def signal_mask(df, strategy="없음", rsi_mode="없음", rsi_low=30, rsi_high=70, bb_cond="없음",
+                cci_mode="없음", cci_over=100.0, cci_under=-100.0, bottom_mode=False, sec_cond="없음"):
+    """1차 조건 충족 여부 (bool 배열, 길이 = len(df)). df: DataFrame 또는 Candles"""
+    n = len(df)
+
+    def col(name):
+        return np.asarray(df[name], dtype=np.float64)
+
+    rsi = col("RSI13")
+    with np.errstate(invalid="ignore"):  # NaN 비교 = False
+        if bottom_mode:
+            return (rsi <= float(rsi_low)) & (col("close") <= col("BB_low")) & (col("CCI") <= -100)
+
+        if strategy in REGISTRY:
+            return REGISTRY[strategy].mask(df, {"rsi_low": float(rsi_low)})
+        # (전략 없음) — RSI/BB/CCI 조합 (선택된 조건끼리 AND)
+        masks = []
+        if rsi_mode == "현재(과매도/과매수 중 하나)":
+            masks.append((rsi <= float(rsi_low)) | (rsi >= float(rsi_high)))
+        elif rsi_mode == "과매도 기준":
+            masks.append(rsi <= float(rsi_low))
+        elif rsi_mode != "없음":
+            masks.append(rsi >= float(rsi_high))
+
+        if bb_cond != "없음":
+            c, o, l = col("close"), col("open"), col("low")
+            if bb_cond == "상한선":
+                masks.append(c > col("BB_up"))
+            elif bb_cond == "하한선":
+                lo = col("BB_low")
+                masks.append(((o < lo) | (l <= lo)) & (c >= lo))
+            elif bb_cond == "중앙선":
+                masks.append(c >= col("BB_mid"))
+            else:
+                masks.append(np.zeros(n, dtype=bool))
+
+        if cci_mode == "과매수":
+            masks.append(col("CCI") >= float(cci_over))
+        elif cci_mode == "과매도":
+            masks.append(col("CCI") <= float(cci_under))
+        elif cci_mode != "없음":
+            masks.append(np.zeros(n, dtype=bool))
+
+    if not masks:
+        return np.full(n, sec_cond != "없음", dtype=bool)
+    m = masks[0]
+    for extra in masks[1:]:
+        m = m & extra
+    return m
+
+
+def vote_masks(masks: dict, levels: Sequence[int] = (2, 3)) -> dict:
+    """전략 마스크 합의 신호: {"합의≥k": 같은 봉에서 k개 이상 전략이 신호} (동시 신호 수 = 행렬 합 1회)"""
+    votes = np.sum(np.stack(list(masks.values())), axis=0) if masks else np.zeros(0, dtype=np.int64)
+    return {f"합의≥{int(k)}": votes >= int(k) for k in levels}
+
+
+# -----------------------------
+# 전방 경로 텐서 (앵커별 running max/min)
+# -----------------------------
+class ForwardOutcomes:
+    """
+    앵커 a에 대해 k=1..H 봉 뒤까지의 종가 running max/min을 1회 계산.
+    (lookahead, threshold) 조합 판정은 전부 이 텐서 조회로 처리.
+    """
+
+    def __init__(self, close, max_h: int, times=None, fwd_max=None, fwd_min=None):
+        self.close = np.asarray(close, dtype=np.float64)
+        self.max_h = int(max_h)
+        self.times = None if times is None else np.asarray(times)
+        n = len(self.close)
+        if fwd_max is None or fwd_min is None:
+            fwd = np.full((n, self.max_h), np.nan)
+            for k in range(1, self.max_h + 1):
+                if k < n:
+                    fwd[:n - k, k - 1] = self.close[k:]
+            fwd_max = np.fmax.accumulate(fwd, axis=1)
+            fwd_min = np.fmin.accumulate(fwd, axis=1)
+        self.fwd_max = fwd_max
+        self.fwd_min = fwd_min
+
+    def __len__(self):
+        return len(self.close)
+
+    def first_passage(self, anchors, thr):
+        """목표가(종가 × (1+thr%) × 0.9999) 최초 도달 봉 수 (미도달: max_h+1)"""
+        anchors = np.asarray(anchors, dtype=np.int64)
+        base = self.close[anchors]
+        level = (base * (1.0 + float(thr) / 100.0)) * 0.9999
+        # running max는 k에 대해 단조 증가 → 미도달 칸 수 + 1 = 최초 도달 봉
+        return (~(self.fwd_max[anchors] >= level[:, None])).sum(axis=1) + 1
+
+    def evaluate(self, anchors, lookahead: int, thr: float):
+        """앵커 배열의 판정 결과 dict (simulate 행과 동일한 값)"""
+        L = int(lookahead)
+        if L > self.max_h:
+            raise ValueError(f"lookahead {L} > max_h {self.max_h}")
+        anchors = np.asarray(anchors, dtype=np.int64)
+        base = self.close[anchors]
+        fp = self.first_passage(anchors, thr)
+        hit = fp <= L
+        end_idx = np.where(hit, anchors + fp, anchors + L)
+        end_close = np.where(hit, (base * (1.0 + float(thr) / 100.0)), self.close[np.minimum(end_idx, len(self) - 1)])
+        miss_ret = (self.close[np.minimum(anchors + L, len(self) - 1)] / base - 1) * 100
+        final_ret = np.where(hit, float(thr), miss_ret)
+        result = np.where(hit, "성공", np.where(miss_ret <= 0, "실패", "중립"))
+        return {
+            "anchor": anchors,
+            "hit": hit,
+            "end_idx": end_idx,
+            "bars": np.where(hit, fp, L),
+            "base": base,
+            "end_close": end_close,
+            "final_ret": final_ret,
+            "min_ret": (self.fwd_min[anchors, L - 1] / base - 1) * 100,
+            "max_ret": (self.fwd_max[anchors, L - 1] / base - 1) * 100,
+            "result": result,
+        }
+
+    # --- 저장/로드 ---
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, close=self.close, fwd_max=self.fwd_max, fwd_min=self.fwd_min,
+                 max_h=np.array([self.max_h]),
+                 times=(self.times.astype("datetime64[ns]").astype(np.int64)
+                        if self.times is not None else np.array([], dtype=np.int64)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        z = np.load(path)
+        times = z["times"].astype("datetime64[ns]") if len(z["times"]) else None
+        return cls(z["close"], int(z["max_h"][0]), times=times, fwd_max=z["fwd_max"], fwd_min=z["fwd_min"])
+
+
+def load_forward_outcomes(df: pd.DataFrame, max_h: int, market_code: str = "", tf_key: str = "",
+                          cache_dir: Optional[str] = OUTCOME_CACHE_DIR) -> ForwardOutcomes:
+    """
+    (종목, 분봉, 데이터 버전)별 전방 경로 텐서 — 디스크 캐시 우선.
+    새 데이터 버전을 저장하면 같은 (종목, 분봉, max_h)의 이전 버전 파일은 삭제 (종목·분봉당 1개 유지)
+    """
+    times = pd.to_datetime(df["time"]).values
+    path = None
+    if cache_dir and market_code:
+        prefix = "_".join(re.sub(r"[^0-9A-Za-z가-힣.-]+", "-", str(x)) for x in (market_code, tf_key)) + "_"
+        suffix = f"_{int(max_h)}.npz"
+        path = os.path.join(cache_dir, f"{prefix}{data_fingerprint(df)}{suffix}")
+        if os.path.exists(path):
+            try:
+                return ForwardOutcomes.load(path)
+            except Exception:
+                pass
+    fo = ForwardOutcomes(df["close"].to_numpy(dtype=np.float64), max_h, times=times)
+    if path:
+        try:
+            fo.save(path)
+            for name in os.listdir(cache_dir):
+                old = os.path.join(cache_dir, name)
+                if name.startswith(prefix) and name.endswith(suffix) and old != path:
+                    os.remove(old)
+        except Exception:
+            pass
+    return fo
+
+
+def next_true(mask) -> np.ndarray:
+    """nt[k] = k 이상에서 처음 True인 위치 (없으면 n). 길이 n+1"""
+    mask = np.asarray(mask, dtype=bool)
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.append(np.minimum.accumulate(idx[::-1])[::-1], n)
+
+
+def frame_arrays(df) -> dict:
+    """시뮬레이션에 필요한 컬럼만 numpy 배열로 추출 (Candles: float64 컨테이너면 복사 없음)"""
+    if isinstance(df, Candles):
+        arr = df.arrays(np.float64)
+        return {k: arr[k] for k in ["time", "open", "high", "low", "close", "volume", "RSI13", "BB_up", "BB_low",
+                                    "BB_mid", "CCI", "CCI_sig"] if k in arr}
+    arr = {"time": pd.to_datetime(df["time"]).values}
+    for col in ["open", "high", "low", "close", "volume", "RSI13", "BB_up", "BB_low", "BB_mid", "CCI", "CCI_sig"]:
+        if col in df.columns:
+            arr[col] = df[col].to_numpy(dtype=np.float64)
+    return arr
+
+
+def resolve_anchors(arr: dict, sig_idx, lookahead: int, sec_cond: str = "없음", bb_cond: str = "없음",
+                    manual_supply_levels=None, maemul_n: int = 50, return_open: bool = False):
+    """
+    1차 신호 → 2차 조건 반영 앵커 인덱스 (충족 못하면 -1).
+    simulate.process_one의 2차 조건 분기와 동일한 규칙을 배열 연산으로 처리.
+    return_open=True: (앵커, open) 반환 — open은 데이터 끝에 걸려 새 캔들이 오면 결과가 바뀔 수 있는 신호
+    """
+    o, h, l, c = arr["open"], arr["high"], arr["low"], arr["close"]
+    n = len(c)
+    L = int(lookahead)
+    sig = np.asarray(sig_idx, dtype=np.int64)
+    anchors = np.full(len(sig), -1, dtype=np.int64)
+    open_ = np.zeros(len(sig), dtype=bool)
+    if len(sig) == 0:
+        return (anchors, open_) if return_open else anchors
+    bull = c > o
+
+    if sec_cond == "양봉 2개 연속 상승":
+        ok = sig + 3 < n
+        s = sig[ok]
+        good = bull[s + 1] & bull[s + 2] & (c[s + 2] > c[s + 1])
+        anchors[np.flatnonzero(ok)[good]] = s[good] + 3
+        open_ = ~ok
+
+    elif sec_cond == "양봉 2개 (범위 내)":
+        cb = np.cumsum(bull)
+        T = np.searchsorted(cb, cb[sig] + 2, side="left")
+        ok = T <= np.minimum(sig + L, n - 1)
+        anchors[ok] = T[ok] + 1
+        open_ = ~ok & (sig + L > n - 1)
+
+    elif sec_cond == "BB 기반 첫 양봉 50% 진입":
+        if bb_cond == "없음":
+            return (anchors, open_) if return_open else anchors
+        ref = arr["BB_low"] if bb_cond == "하한선" else arr["BB_mid"] if bb_cond == "중앙선" else arr["BB_up"]
+        with np.errstate(invalid="ignore"):
+            below = c < ref
+            cond = bull & ~np.isnan(ref) & ((o < ref) | (l <= ref)) & (c >= ref)
+        # 밴드 아래 구간이 끝나는 첫 봉(kb)만 '첫 진입' 후보
+        kb = next_true(~below)[np.minimum(sig + 1, n)]
+        ok = (kb < n)
+        open_ = ~ok
+        ok[ok] = cond[kb[ok]]
+        anchors[ok] = kb[ok] + 1
+
+    elif sec_cond == "매물대 터치 후 반등(위→아래→반등)":
+        if not manual_supply_levels:
+            return (anchors, open_) if return_open else anchors
+        lv = max(float(x) for x in manual_supply_levels)
+        prior_min = pd.Series(l).rolling(int(maemul_n), min_periods=1).min().shift(1).to_numpy()
+        with np.errstate(invalid="ignore"):
+            cond = (l <= lv) & (l <= prior_min * 1.001) & (c > lv)
+        j = next_true(cond)[np.minimum(sig + 1, n)]
+        ok = (j < n) & (j <= sig + L)
+        anchors[ok] = j[ok] + 1
+        open_ = ~ok & (sig + L > n - 1)
+
+    elif sec_cond == "매물대 자동 (하단→상단 재진입 + BB하단 위 양봉)":
+        maemul = np.full(n, np.nan)
+        maemul[1:] = np.maximum(h[:-1], np.where(c[:-1] >= o[:-1], c[:-1], o[:-1]))
+        with np.errstate(invalid="ignore"):
+            cond = (l <= maemul * 0.999) & (c >= maemul) & bull & (maemul >= arr["BB_low"])
+        j = next_true(cond)[np.minimum(sig + 2, n)]
+        ok = (j < n) & (j <= sig + L)
+        anchors[ok] = j[ok]
+        open_ = ~ok & (sig + L > n - 1)
+
+    else:
+        anchors = sig + 1
+
+    tail = (anchors >= 0) & (anchors + L > n - 1)
+    anchors[tail] = -1
+    if return_open:
+        return anchors, open_ | tail
+    return anchors
+
+
+def _dedup_pass(sig, anchors, lock_end, nxt: int = -1):
+    """중복 제거: 판정 종료 봉(lock_end)까지 다음 신호 무시 (simulate 메인 루프와 동일)"""
+    keep = []
+    for k, (i, a) in enumerate(zip(sig.tolist(), anchors.tolist())):
+        if i < nxt or a < 0:
+            continue
+        keep.append(k)
+        nxt = int(lock_end[k]) + 1
+    return np.asarray(keep, dtype=np.int64)
+
+
+def _result_frame(fo: ForwardOutcomes, anchors, lookahead, thr, minutes_per_bar, arr=None, bb_cond="없음"):
+    ev = fo.evaluate(anchors, lookahead, thr)
+    times = fo.times if fo.times is not None else np.arange(len(fo))
+    out = {
+        "신호시간": pd.to_datetime(times[anchors]),
+        "종료시간": pd.to_datetime(times[ev["end_idx"]]),
+        "기준시가": np.round(ev["base"]).astype(np.int64),
+        "종료가": ev["end_close"],
+    }
+    if arr is not None and "RSI13" in arr:
+        rsi = np.round(arr["RSI13"][anchors], 2)
+        out["RSI(13)"] = np.where(np.isnan(rsi), None, rsi)
+        bb_col = {"상한선": "BB_up", "중앙선": "BB_mid", "하한선": "BB_low"}.get(bb_cond)
+        if bb_col:
+            bbv = np.round(arr[bb_col][anchors], 1)
+            out["BB값"] = np.where(np.isnan(bbv), None, bbv)
+        else:
+            out["BB값"] = None
+    out.update({
+        "성공기준(%)": round(float(thr), 1),
+        "결과": ev["result"],
+        "도달분": ev["bars"] * int(minutes_per_bar),
+        "도달캔들(bars)": ev["bars"].astype(int),
+        "최종수익률(%)": np.round(ev["final_ret"], 2),
+        "최저수익률(%)": np.round(ev["min_ret"], 2),
+        "최고수익률(%)": np.round(ev["max_ret"], 2),
+        "anchor_i": anchors.astype(int),
+        "end_i": ev["end_idx"].astype(int),
+    })
+    return pd.DataFrame(out)
+
+
+def _pick_anchors(arr: dict, sig_idx, L: int, thr: float, dedup_mode: str, sec_cond: str, bb_cond: str,
+                  manual_supply_levels, maemul_n: int, fo: ForwardOutcomes, start_sig: int = 0, lock_from: int = -1):
+    """simulate 메인 루프: 평가 대상 (앵커, 1차 신호) 인덱스"""
+    sig = np.asarray(sig_idx, dtype=np.int64)
+    sig = sig[sig >= int(start_sig)]
+    anchors = resolve_anchors(arr, sig, L, sec_cond, bb_cond, manual_supply_levels, maemul_n)
+    valid = anchors >= 0
+    if not valid.any():
+        return anchors[:0], sig[:0]
+    if dedup_mode.startswith("중복 제거"):
+        lock_end = np.zeros(len(sig), dtype=np.int64)
+        fp = fo.first_passage(anchors[valid], thr)
+        lock_end[valid] = np.where(fp <= L, anchors[valid] + fp, anchors[valid] + L)
+        k = _dedup_pass(sig, anchors, lock_end, nxt=int(lock_from))
+    else:
+        k = np.flatnonzero(valid)
+        _, first = np.unique(anchors[k], return_index=True)
+        k = k[np.sort(first)]
+    return anchors[k], sig[k]
+
+
+def simulate_arrays(arr: dict, sig_idx, lookahead: int, threshold_pct: float, minutes_per_bar: int,
+                    dedup_mode: str = DEDUP_LABEL, sec_cond: str = "없음", bb_cond: str = "없음",
+                    manual_supply_levels=None, maemul_n: int = 50,
+                    fo: Optional[ForwardOutcomes] = None, start_sig: int = 0, lock_from: int = -1,
+                    return_sig: bool = False):
+    """
+    Streamlit 비의존 simulate (1차 신호 인덱스를 입력으로 받음).
+    결과 컬럼/판정은 app.py simulate()와 동일.
+    start_sig/lock_from: 이어서 계산할 첫 신호와 중복 제거 잠금 위치 (증분 재계산용)
+    return_sig=True: (결과, 행별 1차 신호 인덱스) 반환
+    """
+    L = int(lookahead)
+    thr = float(threshold_pct)
+    if fo is None or fo.max_h < L:
+        fo = ForwardOutcomes(arr["close"], L, times=arr["time"])
+    anchors, sig = _pick_anchors(arr, sig_idx, L, thr, dedup_mode, sec_cond, bb_cond,
+                                 manual_supply_levels, maemul_n, fo, start_sig, lock_from)
+    if len(anchors) == 0:
+        return (pd.DataFrame(), sig) if return_sig else pd.DataFrame()
+    res = _result_frame(fo, anchors, L, thr, minutes_per_bar, arr=arr, bb_cond=bb_cond)
+    return (res, sig) if return_sig else res
+
+
+def simulate_stats(arr: dict, sig_idx, lookahead: int, threshold_pct: float,
+                   dedup_mode: str = DEDUP_LABEL, sec_cond: str = "없음", bb_cond: str = "없음",
+                   manual_supply_levels=None, maemul_n: int = 50, fo: Optional[ForwardOutcomes] = None,
+                   gate: Optional[dict] = None, with_returns: bool = False) -> dict:
+    """
+    summarize(simulate_arrays(...))와 같은 통계 — 결과 테이블 생성 없이 배열만으로 계산.
+    gate: 진입 제한 규칙 (entry_gate) — 판정 결과에 시간순으로 적용한 뒤 집계
+    with_returns: 신호별 최종수익률 / 진입·종료 봉 배열을 "_rets" / "_anchor_i" / "_end_i"로 포함
+                  (부트스트랩 신뢰구간 · 자산 곡선용)
+    """
+    L = int(lookahead)
+    thr = float(threshold_pct)
+    if fo is None or fo.max_h < L:
+        fo = ForwardOutcomes(arr["close"], L, times=arr["time"])
+    anchors, _ = _pick_anchors(arr, sig_idx, L, thr, dedup_mode, sec_cond, bb_cond,
+                               manual_supply_levels, maemul_n, fo)
+    if len(anchors) == 0:
+        return summarize(None, with_returns)
+    ev = fo.evaluate(anchors, L, thr)
+    rets = np.round(ev["final_ret"], 2)
+    times = fo.times if fo.times is not None else arr["time"]
+    if gate:
+        keep, _ = gate_entries(times[anchors], times[np.minimum(ev["end_idx"], len(fo) - 1)], rets, gate)
+        if not keep.any():
+            return summarize(None, with_returns)
+        anchors, rets, ev = anchors[keep], rets[keep], {"result": ev["result"][keep], "end_idx": ev["end_idx"][keep]}
+    total = len(anchors)
+    succ = int((ev["result"] == "성공").sum())
+    fail = int((ev["result"] == "실패").sum())
+    out = {
+        "신호수": int(total),
+        "성공": succ,
+        "중립": int(total - succ - fail),
+        "실패": fail,
+        "승률(%)": succ / total * 100.0,
+        "평균수익률(%)": float(pd.Series(rets).mean()),
+        "합계수익률(%)": float(pd.Series(rets).sum()),
+        "날짜": pd.Timestamp(times[int(anchors.min())]).strftime("%Y-%m-%d"),
+    }
+    if with_returns:
+        out.update(_rets=rets.astype(np.float32), _anchor_i=anchors.astype(np.int64),
+                   _end_i=np.asarray(ev["end_idx"], dtype=np.int64))
+    return out
+
+
+def compare_strategies(arr: dict, masks: dict, lookahead: int, threshold_pct: float, minutes_per_bar: int,
+                       dedup_mode: str = DEDUP_LABEL, sec_cond: str = "없음", bb_cond: str = "없음",
+                       manual_supply_levels=None, maemul_n: int = 50, fo: Optional[ForwardOutcomes] = None) -> pd.DataFrame:
+    """
+    {이름: 1차 마스크} 여러 개를 같은 전방 텐서로 동시에 평가 → 이름 × 지표 표.
+    앵커 선택은 마스크별, 판정은 전체 앵커를 이어붙여 evaluate 1회 + 그룹 집계(bincount)
+    """
+    L = int(lookahead)
+    thr = float(threshold_pct)
+    if fo is None or fo.max_h < L:
+        fo = ForwardOutcomes(arr["close"], L, times=arr["time"])
+    names = list(masks)
+    picked = [_pick_anchors(arr, np.flatnonzero(masks[k]), L, thr, dedup_mode, sec_cond, bb_cond,
+                            manual_supply_levels, maemul_n, fo)[0] for k in names]
+    gid = np.repeat(np.arange(len(names)), [len(a) for a in picked])
+    anchors = np.concatenate(picked) if picked else np.zeros(0, dtype=np.int64)
+    k = len(names)
+    if len(anchors):
+        ev = fo.evaluate(anchors, L, thr)
+        rets = np.round(ev["final_ret"], 2)
+        succ = np.bincount(gid, weights=ev["result"] == "성공", minlength=k)
+        fail = np.bincount(gid, weights=ev["result"] == "실패", minlength=k)
+        ret_sum = np.bincount(gid, weights=rets, minlength=k)
+    else:
+        ev, rets = {"end_idx": anchors}, anchors.astype(np.float64)
+        succ = fail = ret_sum = np.zeros(k)
+    total = np.bincount(gid, minlength=k)
+    rows = []
+    for i, name in enumerate(names):
+        n_i = int(total[i])
+        sel = gid == i
+        eq = equity_stats(equity_curve(arr["close"], anchors[sel], ev["end_idx"][sel], rets[sel]), minutes_per_bar)
+        rows.append({
+            "전략": name,
+            "신호봉수": int(np.count_nonzero(masks[name])),
+            "신호수": n_i,
+            "성공": int(succ[i]),
+            "중립": int(n_i - succ[i] - fail[i]),
+            "실패": int(fail[i]),
+            "승률(%)": succ[i] / n_i * 100.0 if n_i else 0.0,
+            "평균수익률(%)": ret_sum[i] / n_i if n_i else 0.0,
+            "합계수익률(%)": float(ret_sum[i]),
+            "복리수익률(%)": eq["복리수익률(%)"],
+            "MDD(%)": eq["MDD(%)"],
+        })
+    return pd.DataFrame(rows)
+
+
+def first_open_signal(arr: dict, sig_idx, lookahead: int, n_closed: int, sec_cond: str = "없음",
+                      bb_cond: str = "없음", manual_supply_levels=None, maemul_n: int = 50,
+                      start_sig: int = 0) -> int:
+    """
+    확정 캔들 n_closed개 기준으로 결과가 아직 열려 있는(새 캔들에 따라 바뀔 수 있는) 첫 신호 인덱스.
+    이보다 앞선 신호의 결과는 이후 데이터와 무관하게 확정.
+    start_sig: 이전에 확정된 구간 (그 앞 신호는 다시 보지 않음)
+    """
+    n_closed = int(n_closed)
+    sig = np.asarray(sig_idx, dtype=np.int64)
+    sig = sig[(sig >= int(start_sig)) & (sig < n_closed)]
+    trunc = {k: v[:n_closed] for k, v in arr.items()}
+    _, open_ = resolve_anchors(trunc, sig, lookahead, sec_cond, bb_cond, manual_supply_levels, maemul_n,
+                               return_open=True)
+    return int(sig[open_].min()) if open_.any() else n_closed
+
+
+def extend_simulation(arr: dict, sig_idx, prev_rows: pd.DataFrame, prev_sig, first_open: int,
+                      lookahead: int, threshold_pct: float, minutes_per_bar: int,
+                      dedup_mode: str = DEDUP_LABEL, sec_cond: str = "없음", bb_cond: str = "없음",
+                      manual_supply_levels=None, maemul_n: int = 50, fo: Optional[ForwardOutcomes] = None,
+                      back: Optional[int] = None):
+    """
+    확정된 이전 결과(first_open 이전 신호) + first_open 이후 신호만 재계산.
+    반환: (결과, 행별 1차 신호 인덱스) — 전체 재계산과 동일
+    back: 지정 시 first_open - back 이후 구간 배열만으로 계산 (측정 구간 텐서도 그 구간만 → 비용 ∝ 새 구간)
+    """
+    prev_sig = np.asarray(prev_sig, dtype=np.int64)
+    keep = prev_sig < int(first_open)
+    rows = prev_rows[keep] if prev_rows is not None and not prev_rows.empty else pd.DataFrame()
+    kept_sig = prev_sig[keep]
+    dedup = dedup_mode.startswith("중복 제거")
+    lock_from = int(rows["end_i"].max()) + 1 if (dedup and not rows.empty) else -1
+    k = max(int(first_open) - int(back), 0) if back is not None else 0
+    if k > 0:
+        sub = {c: v[k:] for c, v in arr.items()}
+        sig_sub = np.asarray(sig_idx, dtype=np.int64)
+        new_rows, new_sig = simulate_arrays(
+            sub, sig_sub[sig_sub >= k] - k, lookahead, threshold_pct, minutes_per_bar, dedup_mode, sec_cond,
+            bb_cond, manual_supply_levels, maemul_n, start_sig=int(first_open) - k,
+            lock_from=lock_from - k if lock_from >= 0 else -1, return_sig=True
+        )
+        new_sig = np.asarray(new_sig, dtype=np.int64) + k
+        if not new_rows.empty:
+            new_rows["anchor_i"] += k
+            new_rows["end_i"] += k
+    else:
+        new_rows, new_sig = simulate_arrays(
+            arr, sig_idx, lookahead, threshold_pct, minutes_per_bar, dedup_mode, sec_cond, bb_cond,
+            manual_supply_levels, maemul_n, fo=fo, start_sig=first_open, lock_from=lock_from, return_sig=True
+        )
+    if rows.empty:
+        return new_rows, new_sig
+    if new_rows.empty:
+        return rows.reset_index(drop=True), kept_sig
+    out = pd.concat([rows, new_rows], ignore_index=True)
+    out_sig = np.concatenate([kept_sig, new_sig])
+    if not dedup:
+        first = ~out["anchor_i"].duplicated(keep="first").to_numpy()
+        out, out_sig = out[first].reset_index(drop=True), out_sig[first]
+    return out, out_sig
+
+
+def resimulate(arr: dict, sig_idx, lookahead: int, threshold_pct: float, minutes_per_bar: int,
+               prev: Optional[dict] = None, dedup_mode: str = DEDUP_LABEL, sec_cond: str = "없음",
+               bb_cond: str = "없음", manual_supply_levels=None, maemul_n: int = 50,
+               fo: Optional[ForwardOutcomes] = None):
+    """
+    같은 시작점에서 캔들만 늘어나는 재실행용 (종료일=오늘 새로고침).
+    prev(이전 호출 상태)의 확정 구간이 그대로면 미확정 신호(first_open) 이후만 다시 계산.
+    반환: (결과, 상태) — 상태를 다음 호출의 prev로 전달. 결과는 simulate_arrays()와 동일
+    """
+    n = len(arr["close"])
+    sim_kw = dict(dedup_mode=dedup_mode, sec_cond=sec_cond, bb_cond=bb_cond,
+                  manual_supply_levels=manual_supply_levels, maemul_n=maemul_n)
+    reuse = (prev is not None and prev.get("n_closed", n + 1) <= n
+             and arrays_fingerprint(arr, prev["n_closed"]) == prev["prefix_fp"])
+    if reuse:
+        # 2차 조건이 참조하는 과거 봉(매물대 prior_min 등)만 남기고 앞부분은 계산에서 제외
+        res, res_sig = extend_simulation(arr, sig_idx, prev["rows"], prev["sig"], prev["first_open"],
+                                         lookahead, threshold_pct, minutes_per_bar, fo=fo,
+                                         back=int(maemul_n) + 30, **sim_kw)
+    else:
+        res, res_sig = simulate_arrays(arr, sig_idx, lookahead, threshold_pct, minutes_per_bar, fo=fo,
+                                       return_sig=True, **sim_kw)
+    # 마지막 봉은 진행 중일 수 있음 → 확정 구간 = 앞 n-1봉
+    n_closed = max(n - 1, 0)
+    first_open = first_open_signal(arr, sig_idx, lookahead, n_closed, sec_cond, bb_cond, manual_supply_levels,
+                                   maemul_n, start_sig=prev["first_open"] if reuse else 0)
+    state = {"n_closed": n_closed, "prefix_fp": arrays_fingerprint(arr, n_closed), "first_open": first_open,
+             "rows": res, "sig": res_sig, "reused": bool(reuse)}
+    return res, state
+
+
+def summarize(res: pd.DataFrame, with_returns: bool = False) -> dict:
+    """결과 테이블 → 신호수/성공/중립/실패/승률/평균·합계 수익률/첫 신호 날짜 (with_returns: "_rets" 등 배열 포함)"""
+    if res is None or res.empty:
+        out = {"신호수": 0, "성공": 0, "중립": 0, "실패": 0, "승률(%)": 0.0,
+               "평균수익률(%)": 0.0, "합계수익률(%)": 0.0, "날짜": ""}
+        if with_returns:
+            out.update(_rets=np.zeros(0, dtype=np.float32), _anchor_i=np.zeros(0, dtype=np.int64),
+                       _end_i=np.zeros(0, dtype=np.int64))
+        return out
+    total = len(res)
+    succ = int((res["결과"] == "성공").sum())
+    fail = int((res["결과"] == "실패").sum())
+    out = {
+        "신호수": int(total),
+        "성공": succ,
+        "중립": int((res["결과"] == "중립").sum()),
+        "실패": fail,
+        "승률(%)": succ / total * 100.0,
+        "평균수익률(%)": float(res["최종수익률(%)"].mean()),
+        "합계수익률(%)": float(res["최종수익률(%)"].sum()),
+        "날짜": pd.to_datetime(res["신호시간"].min()).strftime("%Y-%m-%d"),
+    }
+    if with_returns:
+        out.update(_rets=res["최종수익률(%)"].to_numpy(dtype=np.float32),
+                   _anchor_i=res["anchor_i"].to_numpy(dtype=np.int64), _end_i=res["end_i"].to_numpy(dtype=np.int64))
+    return out
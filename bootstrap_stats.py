@@ -0,0 +1,101 @@
+# bootstrap_stats.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 부트스트랩 신뢰구간 / p값 (승률 · 평균수익률)
+# - 조합 스캔 결과 전체 행을 한 번의 배치 재표본으로 계산 (행별 루프 없음)
+# - 승률: 성공 수 재표본 = 이항(n, p). 0% / 100% 칸의 퇴화 방지를 위해 p = (성공+1)/(n+2)
+# - 평균수익률: 포아송 부트스트랩 (신호별 가중치 ~ Poisson(1), 가중평균)
+#   가중치 행렬 1회 생성 → 행들을 0 채움 행렬로 묶어 묶음당 행렬곱 1회로 재표본 평균 계산
+# - p값(단측): 승률 ≤ 기준 승률 / 평균수익률 ≤ 0 인 재표본 비율
+# =============================================================
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+N_BOOT = 1000
+CI_COLS = ("승률CI하한(%)", "승률CI상한(%)", "승률p", "평균CI하한(%)", "평균CI상한(%)", "수익률p")
+_MAX_CELLS = 1 << 22  # 평균수익률 묶음 행렬(행 × 신호수) 원소 수 상한 (메모리 제한)
+
+
+def _p_value(boot: np.ndarray, null: float) -> np.ndarray:
+    return (np.sum(boot <= null, axis=1) + 1.0) / (boot.shape[1] + 1.0)
+
+
+def bootstrap_winrate(n, k, n_boot: int = N_BOOT, p0: float = 50.0, alpha: float = 0.05,
+                      rng: Optional[np.random.Generator] = None):
+    """(신호수, 성공수) 배열 → (CI 하한, CI 상한, p값). 신호 0건 행은 NaN"""
+    rng = rng or np.random.default_rng(0)
+    n = np.asarray(n, dtype=np.int64)
+    k = np.asarray(k, dtype=np.int64)
+    lo = np.full(len(n), np.nan)
+    hi = lo.copy()
+    p = lo.copy()
+    ok = n > 0
+    if ok.any():
+        pt = (k[ok] + 1.0) / (n[ok] + 2.0)
+        boot = rng.binomial(n[ok][:, None], pt[:, None], size=(int(ok.sum()), int(n_boot))) / n[ok][:, None] * 100.0
+        lo[ok], hi[ok] = np.percentile(boot, [alpha / 2 * 100, (1 - alpha / 2) * 100], axis=1)
+        p[ok] = _p_value(boot, float(p0))
+    return lo, hi, p
+
+
+def bootstrap_mean(returns: Sequence[np.ndarray], n_boot: int = N_BOOT, alpha: float = 0.05,
+                   rng: Optional[np.random.Generator] = None):
+    """행별 수익률 배열 목록 → 평균수익률 (CI 하한, CI 상한, p값(평균 ≤ 0))"""
+    rng = rng or np.random.default_rng(0)
+    rows = [np.asarray(r, dtype=np.float32).ravel() for r in returns]
+    n = np.array([len(r) for r in rows], dtype=np.int64)
+    lo = np.full(len(rows), np.nan)
+    hi = lo.copy()
+    p = lo.copy()
+    if not (n > 0).any():
+        return lo, hi, p
+    B = int(n_boot)
+    # 포아송 가중치 (최대 신호수 × B) 1회 생성 → 신호수 n인 행은 앞 n행 사용 (공통 난수)
+    W = rng.poisson(1.0, size=(int(n.max()), B)).astype(np.float32)
+    wsum = np.cumsum(W, axis=0, dtype=np.float64)
+    order = np.argsort(n, kind="stable")
+    order = order[n[order] > 0]
+    a = 0
+    while a < len(order):
+        # 신호수 오름차순으로 묶어 0 채움 행렬 (k × L) 구성 → 재표본 합계는 행렬곱 1회
+        b = a + 1
+        while b < len(order) and (b - a + 1) * n[order[b]] <= _MAX_CELLS:
+            b += 1
+        part = order[a:b]
+        L = int(n[part[-1]])
+        X = np.zeros((len(part), L), dtype=np.float32)
+        for r, i in enumerate(part):
+            X[r, :n[i]] = rows[i]
+        ws = wsum[n[part] - 1]                               # (k × B) 가중치 합
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(ws > 0, (X @ W[:L]) / ws, np.nan)
+        lo[part], hi[part] = np.nanpercentile(means, [alpha / 2 * 100, (1 - alpha / 2) * 100], axis=1)
+        valid = ~np.isnan(means)
+        p[part] = (np.sum(valid & (means <= 0), axis=1) + 1.0) / (valid.sum(axis=1) + 1.0)
+        a = b
+    return lo, hi, p
+
+
+def bootstrap_rows(rows: List[dict], n_boot: int = N_BOOT, p0: float = 50.0, alpha: float = 0.05,
+                   seed: int = 0) -> pd.DataFrame:
+    """
+    통계 행(신호수/성공, 선택적으로 "_rets" 수익률 배열) 목록 → CI_COLS 표 (행 순서 유지).
+    "_rets"가 없는 행은 평균수익률 구간을 NaN으로 둠
+    """
+    rng = np.random.default_rng(seed)
+    n = [int(r.get("신호수", 0)) for r in rows]
+    k = [int(r.get("성공", 0)) for r in rows]
+    w_lo, w_hi, w_p = bootstrap_winrate(n, k, n_boot, p0, alpha, rng)
+    has = [i for i, r in enumerate(rows) if r.get("_rets") is not None]
+    m_lo = np.full(len(rows), np.nan)
+    m_hi = m_lo.copy()
+    m_p = m_lo.copy()
+    if has:
+        a, b, c = bootstrap_mean([rows[i]["_rets"] for i in has], n_boot, alpha, rng)
+        m_lo[has], m_hi[has], m_p[has] = a, b, c
+    return pd.DataFrame({
+        CI_COLS[0]: np.round(w_lo, 1), CI_COLS[1]: np.round(w_hi, 1), CI_COLS[2]: np.round(w_p, 4),
+        CI_COLS[3]: np.round(m_lo, 2), CI_COLS[4]: np.round(m_hi, 2), CI_COLS[5]: np.round(m_p, 4),
+    })
@@ -0,0 +1,229 @@
+# candles.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 읽기 전용 캔들 컨테이너 (배열 기반 · 복사 없는 슬라이스)
+# - 시각 = int64 epoch ns, 가격/지표 = 연속 float 배열 (쓰기 금지 플래그)
+# - compact: float32 저장 (정수부 2^24 미만 열만 — BTC 등 고가 원화 가격은 float64 유지)
+# - 구간/최근 N봉/열 추가 = 같은 버퍼의 뷰 공유 (DataFrame .copy() 연쇄 없음)
+# - add_indicators / frame_arrays(시뮬레이션) / 차트 빌더가 DataFrame 대신 그대로 받음
+# - python -m candles [CSV]: 렌더 경로 메모리 · 준비 시간 벤치마크 (기존 복사 경로 / app 뷰 경로 / 컨테이너 전체)
+# =============================================================
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+_F32_MAX = float(1 << 24)  # float32 정수 정밀도 한계
+
+
+def _freeze(a: np.ndarray) -> np.ndarray:
+    v = a.view()
+    v.flags.writeable = False
+    return v
+
+
+def _compact(a: np.ndarray) -> np.ndarray:
+    """float 열 → float32 (값 범위가 float32 정수 정밀도 안일 때만)"""
+    with np.errstate(invalid="ignore"):
+        top = np.nanmax(np.abs(a)) if len(a) and not np.isnan(a).all() else 0.0
+    return a.astype(np.float32) if top < _F32_MAX else a
+
+
+class Candles:
+    """
+    열 이름 → 1차원 배열 (길이 동일). "time"은 int64 epoch ns로 보관, 조회 시 datetime64[ns] 뷰.
+    슬라이스/열 추가는 새 컨테이너를 만들지만 배열은 복사하지 않음
+    """
+
+    __slots__ = ("_cols", "_n")
+
+    def __init__(self, cols: Dict[str, np.ndarray]):
+        n = None
+        frozen = {}
+        for k, v in cols.items():
+            a = np.asarray(v)
+            if n is None:
+                n = len(a)
+            elif len(a) != n:
+                raise ValueError(f"열 길이 불일치: {k} ({len(a)} != {n})")
+            frozen[k] = _freeze(a)
+        self._cols = frozen
+        self._n = int(n or 0)
+
+    # --- 생성 ---
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, compact: bool = False, columns: Optional[Iterable[str]] = None) -> "Candles":
+        """DataFrame → 컨테이너 (float64 열은 가능한 한 블록 뷰 그대로, compact면 float32 변환)"""
+        cols = {}
+        for c in (columns or df.columns):
+            s = df[c]
+            if c == "time":
+                cols[c] = pd.to_datetime(s).to_numpy().astype("datetime64[ns]").view(np.int64)
+            elif s.dtype.kind == "f":
+                a = s.to_numpy()
+                cols[c] = _compact(a) if compact else a
+            elif s.dtype.kind in "iub":
+                cols[c] = s.to_numpy()
+        return cls(cols)
+
+    def with_columns(self, **arrays) -> "Candles":
+        """열 추가/교체 (기존 열은 공유). float 열은 컨테이너 compact 여부를 따름"""
+        compact = any(v.dtype == np.float32 for v in self._cols.values())
+        cols = dict(self._cols)
+        for k, v in arrays.items():
+            a = np.asarray(v)
+            cols[k] = _compact(a) if (compact and a.dtype.kind == "f") else a
+        return Candles(cols)
+
+    # --- 조회 ---
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, key):
+        return key in self._cols
+
+    @property
+    def columns(self) -> tuple:
+        return tuple(self._cols)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Candles({k: v[key] for k, v in self._cols.items()})
+        a = self._cols[key]
+        return a.view("datetime64[ns]") if key == "time" else a
+
+    def get(self, key, default=None):
+        return self[key] if key in self._cols else default
+
+    def tail(self, n: int) -> "Candles":
+        return self[max(self._n - int(n), 0):]
+
+    def between(self, start=None, end=None) -> "Candles":
+        """시각 구간 [start, end] 뷰 (시각 오름차순 가정)"""
+        t = self._cols["time"]
+        lo = 0 if start is None else int(np.searchsorted(t, pd.Timestamp(start).value, "left"))
+        hi = self._n if end is None else int(np.searchsorted(t, pd.Timestamp(end).value, "right"))
+        return self[lo:hi]
+
+    def series(self, key) -> pd.Series:
+        """pandas 연산(rolling/ta)용 Series (배열 공유, 인덱스 0..n-1)"""
+        return pd.Series(self[key], copy=False)
+
+    def arrays(self, dtype=np.float64) -> dict:
+        """backtest_engine.frame_arrays 형식 (dtype이 같으면 복사 없음)"""
+        out = {"time": self["time"]}
+        for k, v in self._cols.items():
+            if k != "time" and v.dtype.kind == "f":
+                out[k] = np.asarray(v, dtype=dtype)
+        return out
+
+    def frame(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """DataFrame 변환 (표 출력 등 경계에서만 — 복사 발생)"""
+        return pd.DataFrame({k: self[k] for k in (columns or self._cols)})
+
+    @property
+    def nbytes(self) -> int:
+        """열 배열 크기 합 (뷰가 가리키는 원본 블록 전체가 아닌 실제 봉 구간만)"""
+        return sum(v.nbytes for v in self._cols.values())
+
+
+# -----------------------------
+# 벤치마크: 재실행 1회의 렌더 경로 (지표 → 기간 필터 → 최근 5000봉 차트 데이터)
+# -----------------------------
+def _bench_frame(n: int = 60000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    c = 1000.0 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    o = c * np.exp(rng.normal(0, 0.001, n))
+    return pd.DataFrame({
+        "time": pd.date_range("2024-01-01", periods=n, freq="15min"),
+        "open": o, "high": np.maximum(o, c) * 1.001, "low": np.minimum(o, c) * 0.999, "close": c,
+        "volume": rng.lognormal(8, 1, n),
+    })
+
+
+def _hover(ts, o, h, l, c, pnl):
+    return ["시간: " + t + "<br>시가: " + a + "<br>고가: " + b + "<br>저가: " + d + "<br>종가: " + e
+            + "<br>수익률(%): " + p for t, a, b, d, e, p in zip(ts, o, h, l, c, pnl)]
+
+
+def _pct(v):
+    return f"{'+' if v >= 0 else ''}{v:.2f}%"
+
+
+def _legacy_render(raw: pd.DataFrame, start, max_bars: int, buy_price: float):
+    """기존 경로: 깊은 복사 + ta CCI(rolling.apply) 지표 → 불리언 필터 → df_view/df_plot 복사 + 문자열 열"""
+    import ta
+    import upbit_data as ud
+    ind = ud.add_indicators(raw.copy(), 20, 2.0, 14)
+    ind["CCI"] = ta.trend.CCIIndicator(high=ind["high"], low=ind["low"], close=ind["close"], window=14,
+                                       constant=0.015).cci()
+    ind["CCI_sig"] = ind["CCI"].rolling(9, min_periods=1).mean()
+    df = ind[ind["time"] >= start].reset_index(drop=True)
+    df_view = df.copy().iloc[-max_bars:].reset_index(drop=True)
+    df_plot = df_view.copy()
+    df_plot["수익률(%)"] = (df_plot["close"] / buy_price - 1) * 100
+    df_plot["_pnl_str"] = df_plot["수익률(%)"].apply(_pct)
+    hover = _hover(df_plot["time"].dt.strftime("%Y-%m-%d %H:%M"), *(df_plot[k].astype(str) for k in
+                   ("open", "high", "low", "close")), df_plot["_pnl_str"])
+    return ind, df, df_view, df_plot, hover
+
+
+def _view_render(raw: pd.DataFrame, start, max_bars: int, buy_price: float):
+    """app 경로: 얕은 복사 지표 → 위치 구간 뷰 → 최근 N봉만 compact 컨테이너"""
+    import upbit_data as ud
+    ind = ud.add_indicators(raw, 20, 2.0, 14)
+    lo = int(ind["time"].to_numpy().searchsorted(np.datetime64(pd.Timestamp(start)), "left"))
+    df = ind.iloc[lo:].set_axis(pd.RangeIndex(len(ind) - lo), axis=0, copy=False)
+    view = Candles.from_frame(df.iloc[-max_bars:], compact=True)
+    pnl = (view["close"].astype(float) / buy_price - 1) * 100
+    hover = _hover(pd.DatetimeIndex(view["time"]).strftime("%Y-%m-%d %H:%M"), *(view[k].astype(str) for k in
+                   ("open", "high", "low", "close")), [_pct(v) for v in pnl.tolist()])
+    return ind, df, view, hover
+
+
+def _container_render(raw: pd.DataFrame, start, max_bars: int, buy_price: float):
+    """컨테이너 전체 경로: compact 변환 1회 → 지표 열 추가 → 구간/최근 N봉 뷰"""
+    import upbit_data as ud
+    cv = ud.add_indicators(Candles.from_frame(raw, compact=True), 20, 2.0, 14)
+    view = cv.between(start).tail(max_bars)
+    pnl = (view["close"].astype(float) / buy_price - 1) * 100
+    hover = _hover(pd.DatetimeIndex(view["time"]).strftime("%Y-%m-%d %H:%M"), *(view[k].astype(str) for k in
+                   ("open", "high", "low", "close")), [_pct(v) for v in pnl.tolist()])
+    return cv, view, hover
+
+
+def benchmark(raw: Optional[pd.DataFrame] = None, max_bars: int = 5000, repeat: int = 3) -> pd.DataFrame:
+    """
+    재실행 1회 렌더 준비 경로별 유지 메모리 / 할당 피크 (tracemalloc 1회, 원본 캔들 제외)
+    + 소요 시간 (추적 없이 repeat회 중 최소)
+    """
+    import gc
+    import time
+    import tracemalloc
+    raw = _bench_frame() if raw is None else raw
+    buy = float(raw["close"].iloc[len(raw) // 2])
+    start = raw["time"].iloc[min(200, len(raw) - 1)]  # 워밍업 이후 조회 시작
+    rows = []
+    for name, fn in (("DataFrame 복사 (기존)", _legacy_render), ("DataFrame 뷰 + 차트 컨테이너 (app)", _view_render),
+                     ("Candles compact 전체", _container_render)):
+        sec = []
+        for _ in range(int(repeat)):
+            t0 = time.perf_counter()
+            fn(raw, start, max_bars, buy)
+            sec.append(time.perf_counter() - t0)
+        gc.collect()
+        tracemalloc.start()
+        keep = fn(raw, start, max_bars, buy)
+        cur, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del keep
+        rows.append({"경로": name, "봉수": len(raw), "유지메모리(MB)": cur / 2**20, "피크메모리(MB)": peak / 2**20,
+                     "소요(ms)": min(sec) * 1000.0})
+    return pd.DataFrame(rows).round(2)
+
+
+if __name__ == "__main__":
+    import sys
+    import candles  # __main__이 아닌 모듈 클래스로 실행 (upbit_data isinstance 판정 일치)
+    src = pd.read_csv(sys.argv[1], parse_dates=["time"]) if len(sys.argv) > 1 else None
+    print(candles.benchmark(src).to_string(index=False))
@@ -0,0 +1,100 @@
+# entry_gate.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 진입 제한 규칙 (shared_notes.md 추가 전략)
+# - 이미 평가된 신호/트레이드 목록에 시간순 1회 순회로 적용 (결과 재계산 없음)
+# - 연속 손실 후 스킵, 같은 시간대(시) 중복 진입 금지, 동시 보유 한도, 일일 진입 한도
+# - 손실/연속 판정은 진입 시점까지 청산된 거래만 반영 (미래 결과 참조 없음)
+# =============================================================
+import heapq
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+GATE_RULES = {
+    "loss_streak": 2,       # n연속 손실 시 (0이면 없음)
+    "skip_n": 1,            # 다음 신호 k개 스킵
+    "hour_lockout": True,   # 같은 시간대(날짜+시) 진입은 1회만
+    "max_concurrent": 0,    # 동시 보유 최대 (0이면 무제한)
+    "daily_cap": 0,         # 하루 최대 진입 (0이면 무제한)
+}
+GATE_REASONS = ("진입", "연속손실 스킵", "같은 시간대", "일일 한도", "동시 보유 한도")
+_HOUR = 3600 * 10**9
+_DAY = 24 * _HOUR
+
+
+def gate_rules(rules: Optional[dict] = None) -> dict:
+    r = dict(GATE_RULES)
+    r.update({k: v for k, v in (rules or {}).items() if k in GATE_RULES})
+    return r
+
+
+def gate_entries(entry_t, exit_t, pnl, rules: Optional[dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (진입 시각, 청산 시각, 수익률) → (진입 여부, 사유). 입력 순서 그대로 반환.
+    손실 = 수익률 ≤ 0 (실패 판정과 같은 기준)
+    """
+    r = gate_rules(rules)
+    et = np.asarray(entry_t).astype("datetime64[ns]").astype(np.int64)
+    xt = np.asarray(exit_t).astype("datetime64[ns]").astype(np.int64)
+    loss = np.asarray(pnl, dtype=np.float64) <= 0
+    n = len(et)
+    keep = np.zeros(n, dtype=bool)
+    why = np.full(n, "", dtype=object)
+    streak_n, skip_n = int(r["loss_streak"] or 0), int(r["skip_n"] or 0)
+    cap, max_open = int(r["daily_cap"] or 0), int(r["max_concurrent"] or 0)
+    opened = []          # (청산 시각, 행) 최소 힙
+    streak = skip = 0
+    last_hour = day = None
+    day_n = 0
+    for i in np.argsort(et, kind="stable"):
+        t = et[i]
+        while opened and opened[0][0] <= t:
+            _, j = heapq.heappop(opened)
+            if not loss[j]:
+                streak = 0
+                continue
+            streak += 1
+            if streak_n and streak >= streak_n:
+                skip, streak = skip_n, 0
+        if skip > 0:
+            skip -= 1
+            why[i] = "연속손실 스킵"
+            continue
+        hour = t // _HOUR
+        if r["hour_lockout"] and hour == last_hour:
+            why[i] = "같은 시간대"
+            continue
+        if t // _DAY != day:
+            day, day_n = t // _DAY, 0
+        if cap and day_n >= cap:
+            why[i] = "일일 한도"
+            continue
+        if max_open and len(opened) >= max_open:
+            why[i] = "동시 보유 한도"
+            continue
+        keep[i] = True
+        why[i] = "진입"
+        last_hour = hour
+        day_n += 1
+        heapq.heappush(opened, (xt[i], int(i)))
+    return keep, why
+
+
+def apply_gate(res: pd.DataFrame, rules: Optional[dict] = None, keep_all: bool = False) -> pd.DataFrame:
+    """
+    simulate 결과(신호시간/종료시간/최종수익률) 또는 트레이드 테이블(청산시간/실현수익률)에 규칙 적용.
+    keep_all=True면 전체 행 + "진입판정" 컬럼, 아니면 진입한 행만
+    """
+    if res is None or res.empty:
+        return res
+    exit_col = "청산시간" if "청산시간" in res.columns else "종료시간"
+    pnl_col = "실현수익률(%)" if "실현수익률(%)" in res.columns else "최종수익률(%)"
+    keep, why = gate_entries(pd.to_datetime(res["신호시간"]).values, pd.to_datetime(res[exit_col]).values,
+                             res[pnl_col].to_numpy(), rules)
+    if keep_all:
+        out = res.copy()
+        out["진입판정"] = why
+        return out
+    return res[keep].reset_index(drop=True)
@@ -0,0 +1,90 @@
+# equity_curve.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 자산 곡선 / 낙폭 / 노출 (신호 결과 → 캔들 시간축)
+# - 결과 테이블(anchor_i / end_i / 최종수익률)을 봉 단위 포트폴리오 수익률로 변환 → 누적곱 = 자산 곡선
+# - 보유 구간 (진입봉, 청산봉]: 보유 중인 봉은 종가 변화, 청산봉은 실현 수익률에 맞춰 정산
+#   (같은 종목이라 봉 수익률이 공통 → 동시 보유 수 × 봉 수익률, 차분 배열 + 누적합으로 O(봉 + 거래))
+# - 포지션 비중 기본 = 1 / 최대 동시 보유 (레버리지 없음)
+# - MDD / 노출 / 샤프·소르티노·칼마 / 중복 진입 통계 — 조합 스캔 행마다 계산 가능한 속도
+# =============================================================
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+EQUITY_KEYS = ("복리수익률(%)", "MDD(%)", "노출(%)", "샤프", "소르티노", "칼마", "최대동시보유", "중복진입(%)")
+_YEAR_MIN = 365 * 24 * 60  # 코인 시장 24시간 · 연중무휴
+
+
+def _bar_returns(close: np.ndarray) -> np.ndarray:
+    r = np.zeros(len(close))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r[1:] = close[1:] / close[:-1] - 1.0
+    return np.nan_to_num(r, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def equity_curve(close, anchors, ends, rets, size: Optional[float] = None) -> dict:
+    """
+    종가 배열 + 거래 (진입봉, 청산봉, 실현수익률 %) → 봉별 자산/낙폭/보유 수.
+    size: 거래당 자산 비중 (None이면 1 / 최대 동시 보유)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    a = np.asarray(anchors, dtype=np.int64)
+    r = np.asarray(rets, dtype=np.float64) / 100.0
+    ok = (a >= 0) & (a < n)
+    a, r = a[ok], r[ok]
+    e = np.clip(np.asarray(ends, dtype=np.int64)[ok], a, max(n - 1, 0))
+    # 보유 봉 (a, e) — 종가 변화로 평가 / 청산봉 e — 실현 수익률로 정산
+    m = e > a
+    hold = np.cumsum(np.bincount(a[m] + 1, minlength=n + 1)[:n] - np.bincount(e[m], minlength=n + 1)[:n])
+    prev = close[np.maximum(e - 1, a)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        exit_ret = np.nan_to_num((1.0 + r) * close[a] / prev - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+    n_open = hold + np.bincount(e, minlength=n)[:n]
+    max_open = int(n_open.max()) if n else 0
+    if size is None:
+        size = 1.0 / max(max_open, 1)
+    # 같은 봉 진입·청산(e == a) 거래는 진입봉에서 바로 정산 (prev = 진입 종가 → exit_ret = 실현 수익률)
+    port = size * (hold * _bar_returns(close) + np.bincount(e, weights=exit_ret, minlength=n)[:n])
+    equity = np.cumprod(1.0 + port)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0 if n else equity
+    # 중복 진입: 앞선 거래가 아직 보유 중일 때 들어간 거래
+    sa, se = np.sort(a), np.sort(e)
+    active = np.searchsorted(sa, a, "left") - np.searchsorted(se, a, "right")
+    return {"equity": equity, "drawdown": drawdown, "bar_ret": port, "open": n_open,
+            "size": float(size), "overlap": active > 0}
+
+
+def equity_stats(curve: dict, minutes_per_bar: int) -> dict:
+    """equity_curve() → EQUITY_KEYS 통계 (연환산은 봉 길이 기준)"""
+    eq, port = curve["equity"], curve["bar_ret"]
+    n = len(eq)
+    if n == 0 or not len(curve["overlap"]):
+        return {k: 0.0 for k in EQUITY_KEYS}
+    per_year = _YEAR_MIN / max(int(minutes_per_bar), 1)
+    sd = port.std()
+    down = np.sqrt(np.mean(np.minimum(port, 0.0) ** 2))
+    mdd = float(curve["drawdown"].min())
+    cagr = eq[-1] ** (per_year / n) - 1.0 if eq[-1] > 0 else -1.0
+    return {
+        "복리수익률(%)": float((eq[-1] - 1.0) * 100.0),
+        "MDD(%)": mdd * 100.0,
+        "노출(%)": float((curve["open"] > 0).mean() * 100.0),
+        "샤프": float(port.mean() / sd * np.sqrt(per_year)) if sd > 0 else 0.0,
+        "소르티노": float(port.mean() / down * np.sqrt(per_year)) if down > 0 else 0.0,
+        "칼마": float(cagr / -mdd) if mdd < 0 else 0.0,
+        "최대동시보유": int(curve["open"].max()),
+        "중복진입(%)": float(curve["overlap"].mean() * 100.0),
+    }
+
+
+def equity_from_frame(res: pd.DataFrame, close, minutes_per_bar: int, size: Optional[float] = None):
+    """simulate 결과 테이블 (anchor_i / end_i / 최종수익률(%)) → (곡선, 통계)"""
+    if res is None or res.empty:
+        curve = equity_curve(close, [], [], [], size)
+    else:
+        curve = equity_curve(close, res["anchor_i"].to_numpy(), res["end_i"].to_numpy(),
+                             res["최종수익률(%)"].to_numpy(), size)
+    return curve, equity_stats(curve, minutes_per_bar)
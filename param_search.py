@@ -0,0 +1,272 @@
+# param_search.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 연속 파라미터 탐색기 (rsi_low/high, bb_dev, threshold_pct, cci_under/over)
+# - 평가 예산(횟수/시간) 안에서 무작위 탐색 → 대리 모델(커널 회귀) 기반 후보 선택
+# - 평가는 backtest_engine 벡터화 경로 (simulate_stats)
+# - 평가한 점은 전부 data_cache/param_search에 캐시
+# - 결과: 승률 × 합계수익률 × 신호수 파레토 집합
+# =============================================================
+import os
+import json
+import time
+import pickle
+import hashlib
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine as be
+
+SEARCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache", "param_search")
+
+# 이름: (최소, 최대, 단위) — 사이드바 입력 범위/단위와 동일
+SPACE: Dict[str, tuple] = {
+    "rsi_low": (0, 100, 1),
+    "rsi_high": (0, 100, 1),
+    "bb_dev": (1.0, 4.0, 0.1),
+    "threshold_pct": (0.1, 5.0, 0.1),
+    "cci_under": (-300, 0, 5),
+    "cci_over": (0, 300, 5),
+}
+OBJECTIVES = ["승률(%)", "합계수익률(%)", "신호수"]
+
+
+def active_params(cfg: dict) -> List[str]:
+    """현재 조건 조합에서 결과에 영향을 주는 파라미터만"""
+    names = ["threshold_pct"]
+    rsi_mode, strategy = cfg.get("rsi_mode", "없음"), cfg.get("strategy", "없음")
+    if cfg.get("bottom_mode") or strategy == "RVB" or (strategy == "없음" and rsi_mode in ("현재(과매도/과매수 중 하나)", "과매도 기준")):
+        names.append("rsi_low")
+    if strategy == "없음" and rsi_mode in ("현재(과매도/과매수 중 하나)", "과매수 기준"):
+        names.append("rsi_high")
+    if cfg.get("bb_cond", "없음") in ("상한선", "하한선") or cfg.get("sec_cond", "").startswith("BB") \
+            or cfg.get("sec_cond", "").startswith("매물대 자동") or cfg.get("bottom_mode") \
+            or strategy == "Market_Divergence":
+        names.append("bb_dev")
+    if strategy == "없음" and cfg.get("cci_mode") == "과매도":
+        names.append("cci_under")
+    if strategy == "없음" and cfg.get("cci_mode") == "과매수":
+        names.append("cci_over")
+    return names
+
+
+def bollinger(close: pd.Series, window: int, dev: float):
+    """ta.volatility.BollingerBands와 동일 계산 (+ add_indicators의 bfill/ffill)"""
+    mavg = close.rolling(int(window), min_periods=int(window)).mean()
+    mstd = close.rolling(int(window), min_periods=int(window)).std(ddof=0)
+    up = (mavg + float(dev) * mstd).fillna(method="bfill").fillna(method="ffill")
+    low = (mavg - float(dev) * mstd).fillna(method="bfill").fillna(method="ffill")
+    return up, low, mavg.fillna(method="bfill").fillna(method="ffill")
+
+
+def pareto_mask(values: np.ndarray) -> np.ndarray:
+    """모든 목표 최대화 기준 비지배 행 (True)"""
+    v = np.asarray(values, dtype=np.float64)
+    keep = np.ones(len(v), dtype=bool)
+    for i in range(len(v)):
+        if not keep[i]:
+            continue
+        dominated = np.all(v >= v[i], axis=1) & np.any(v > v[i], axis=1)
+        if dominated.any():
+            keep[i] = False
+    return keep
+
+
+class ParamSearch:
+    """
+    df_ind: 워밍업 포함 지표 프레임 (add_indicators 결과), window: (시작, 종료) 평가 구간.
+    cfg: strategy, rsi_mode, bb_cond, cci_mode, sec_cond, lookahead, minutes_per_bar, dedup_mode,
+         bb_window, bottom_mode, manual_supply_levels, maemul_n 및 파라미터 기본값
+    """
+
+    def __init__(self, df_ind: pd.DataFrame, cfg: dict, params: Optional[Sequence[str]] = None,
+                 window=None, space: Optional[Dict[str, tuple]] = None,
+                 cache_dir: Optional[str] = SEARCH_DIR, seed: int = 0):
+        self.df_ind = df_ind.reset_index(drop=True)
+        self.cfg = dict(cfg)
+        self.space = dict(space or SPACE)
+        self.params = list(params) if params else active_params(self.cfg)
+        self.rng = np.random.default_rng(seed)
+        t = pd.to_datetime(self.df_ind["time"])
+        if window is not None:
+            sel = ((t >= pd.Timestamp(window[0])) & (t <= pd.Timestamp(window[1]))).to_numpy()
+        else:
+            sel = np.ones(len(t), dtype=bool)
+        self._sel = sel
+        self._df = self.df_ind[sel].reset_index(drop=True)
+        self._arr = be.frame_arrays(self._df)
+        self._fo = be.ForwardOutcomes(self._arr["close"], int(self.cfg["lookahead"]), times=self._arr["time"])
+        self._frames: Dict[float, tuple] = {}
+        self._masks: Dict[tuple, np.ndarray] = {}
+        self.cache: Dict[tuple, dict] = {}
+        self._cache_path = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._cache_path = os.path.join(cache_dir, f"{self._cache_key()}.pkl")
+            try:
+                with open(self._cache_path, "rb") as f:
+                    self.cache = pickle.load(f)
+            except Exception:
+                self.cache = {}
+
+    # --- 캐시 ---
+    def _cache_key(self) -> str:
+        fixed = {k: v for k, v in self.cfg.items() if k not in SPACE}
+        raw = json.dumps({"cfg": fixed, "data": be.data_fingerprint(self._df)},
+                         sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def save(self):
+        if not self._cache_path:
+            return
+        tmp = self._cache_path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self.cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._cache_path)
+
+    # --- 점 표현 ---
+    def _full_point(self, point: dict) -> dict:
+        p = {k: self.cfg.get(k, (self.space[k][0] + self.space[k][1]) / 2) for k in SPACE}
+        p.update(point)
+        for k in SPACE:
+            lo, hi, step = self.space[k]
+            v = min(max(float(p[k]), lo), hi)
+            p[k] = round(round((v - lo) / step) * step + lo, 6)
+        return p
+
+    def _key(self, p: dict) -> tuple:
+        return tuple(p[k] for k in SPACE)
+
+    def _encode(self, p: dict) -> np.ndarray:
+        return np.array([(p[k] - self.space[k][0]) / (self.space[k][1] - self.space[k][0]) for k in self.params])
+
+    def _decode(self, u: np.ndarray) -> dict:
+        lo = np.array([self.space[k][0] for k in self.params], dtype=np.float64)
+        hi = np.array([self.space[k][1] for k in self.params], dtype=np.float64)
+        return self._full_point(dict(zip(self.params, lo + np.clip(u, 0, 1) * (hi - lo))))
+
+    def _feasible(self, p: dict) -> bool:
+        return p["rsi_low"] < p["rsi_high"] and p["cci_under"] < p["cci_over"]
+
+    # --- 평가 ---
+    def _arrays(self, bb_dev: float):
+        key = round(float(bb_dev), 1)
+        if key not in self._frames:
+            up, low, mid = bollinger(self.df_ind["close"], self.cfg.get("bb_window", 30), key)
+            df = self._df.copy()
+            df["BB_up"], df["BB_low"], df["BB_mid"] = up[self._sel].to_numpy(), low[self._sel].to_numpy(), mid[self._sel].to_numpy()
+            arr = dict(self._arr)
+            arr.update({c: df[c].to_numpy(dtype=np.float64) for c in ("BB_up", "BB_low", "BB_mid")})
+            self._frames[key] = (df, arr)
+        return self._frames[key]
+
+    def evaluate(self, point: dict) -> dict:
+        """점 1개 평가 (캐시 우선) → 파라미터 + summarize 통계"""
+        p = self._full_point(point)
+        key = self._key(p)
+        if key not in self.cache:
+            df, arr = self._arrays(p["bb_dev"])
+            c = self.cfg
+            mkey = (p["bb_dev"], p["rsi_low"], p["rsi_high"], p["cci_under"], p["cci_over"])
+            sig = self._masks.get(mkey)
+            if sig is None:
+                sig = np.flatnonzero(be.signal_mask(
+                    df, strategy=c.get("strategy", "없음"), rsi_mode=c.get("rsi_mode", "없음"),
+                    rsi_low=p["rsi_low"], rsi_high=p["rsi_high"], bb_cond=c.get("bb_cond", "없음"),
+                    cci_mode=c.get("cci_mode", "없음"), cci_over=p["cci_over"], cci_under=p["cci_under"],
+                    bottom_mode=c.get("bottom_mode", False), sec_cond=c.get("sec_cond", "없음"),
+                ))
+                self._masks[mkey] = sig
+            self.cache[key] = be.simulate_stats(
+                arr, sig, int(c["lookahead"]), p["threshold_pct"], dedup_mode=c.get("dedup_mode", be.DEDUP_LABEL),
+                sec_cond=c.get("sec_cond", "없음"), bb_cond=c.get("bb_cond", "없음"),
+                manual_supply_levels=c.get("manual_supply_levels"), maemul_n=c.get("maemul_n", 50), fo=self._fo,
+            )
+        return dict(p, **self.cache[key])
+
+    # --- 탐색 ---
+    def _suggest(self, evaluated: List[dict], n_cand: int = 512, kappa: float = 0.5) -> dict:
+        """대리 모델: 무작위 가중 목표(ParEGO식)의 커널 회귀 예측 + 탐색 보너스(최근접 거리)"""
+        X = np.array([self._encode(r) for r in evaluated])
+        Y = np.array([[r[o] for o in OBJECTIVES] for r in evaluated], dtype=np.float64)
+        Y[:, 2] = np.log1p(Y[:, 2])
+        span = Y.max(axis=0) - Y.min(axis=0)
+        Yn = (Y - Y.min(axis=0)) / np.where(span > 0, span, 1.0)
+        w = self.rng.dirichlet(np.ones(len(OBJECTIVES)))
+        score = Yn @ w
+
+        d = len(self.params)
+        front = X[pareto_mask(Y)]
+        cand = np.vstack([
+            self.rng.random((n_cand, d)),
+            front[self.rng.integers(len(front), size=n_cand // 2)] + self.rng.normal(0, 0.05, (n_cand // 2, d)),
+        ]).clip(0, 1)
+        dist2 = ((cand[:, None, :] - X[None, :, :]) ** 2).sum(axis=2)
+        h2 = (0.15 ** 2) * d
+        K = np.exp(-dist2 / (2 * h2))
+        mu = (K @ score) / np.maximum(K.sum(axis=1), 1e-12)
+        ucb = mu + kappa * np.sqrt(dist2.min(axis=1))
+        for j in np.argsort(-ucb):
+            p = self._decode(cand[j])
+            if self._feasible(p) and self._key(p) not in self._seen:
+                return p
+        return self._random_point()
+
+    def _random_point(self) -> dict:
+        for _ in range(100):
+            p = self._decode(self.rng.random(len(self.params)))
+            if self._feasible(p) and self._key(p) not in self._seen:
+                return p
+        return self._decode(self.rng.random(len(self.params)))
+
+    def run(self, max_evals: int = 200, time_budget: Optional[float] = None, n_init: Optional[int] = None,
+            on_eval: Optional[Callable[[int, int, dict], None]] = None) -> pd.DataFrame:
+        """예산(평가 횟수/초) 안에서 탐색 → 전체 평가 결과 (파레토 여부 포함)"""
+        t0 = time.time()
+        n_init = n_init or max(8, min(max_evals // 4, 40))
+        evaluated: List[dict] = []
+        self._seen = set()
+        # 현재 설정값을 첫 점으로 (기준선)
+        first = self._full_point({})
+        queue = [first] if self._feasible(first) else []
+        k = 0
+        while k < max_evals and (time_budget is None or time.time() - t0 < time_budget):
+            if queue:
+                p = queue.pop()
+            elif k < n_init or len(evaluated) < 2:
+                p = self._random_point()
+            else:
+                p = self._suggest(evaluated)
+            self._seen.add(self._key(p))
+            evaluated.append(self.evaluate(p))
+            k += 1
+            if on_eval:
+                on_eval(k, max_evals, evaluated[-1])
+            if k % 25 == 0:
+                self.save()
+        self.save()
+        return self.results(evaluated)
+
+    def results(self, rows: Optional[List[dict]] = None, min_signals: int = 1) -> pd.DataFrame:
+        """평가 결과 표 (rows 없으면 캐시 전체) + 파레토 컬럼"""
+        if rows is None:
+            rows = [dict(zip(SPACE, k), **v) for k, v in self.cache.items()]
+        if not rows:
+            return pd.DataFrame()
+        out = pd.DataFrame(rows).drop_duplicates(subset=list(SPACE)).reset_index(drop=True)
+        out["파레토"] = False
+        elig = out["신호수"] >= int(min_signals)
+        if elig.any():
+            out.loc[elig, "파레토"] = pareto_mask(out.loc[elig, OBJECTIVES].to_numpy())
+        return out
+
+
+def pareto_table(res: pd.DataFrame, params: Sequence[str]) -> pd.DataFrame:
+    """파레토 행만, 탐색 파라미터 + 목표 컬럼으로 정리 (승률 → 합계수익률 순)"""
+    if res is None or res.empty:
+        return pd.DataFrame()
+    cols = list(params) + ["신호수", "성공", "중립", "실패", "승률(%)", "평균수익률(%)", "합계수익률(%)"]
+    out = res[res["파레토"]][cols].sort_values(["승률(%)", "합계수익률(%)"], ascending=False)
+    return out.reset_index(drop=True)
@@ -0,0 +1,146 @@
+# pipeline.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 단계(stage) 파이프라인 유틸
+# - prefetch(): 생산 스레드가 다음 항목을 미리 만들어 bounded queue에 적재 (가득 차면 대기 = backpressure)
+# - background_writer(): 소비 측 결과를 순서대로 별도 스레드에서 기록
+# - StageTimer: 단계별 누적 시간/횟수 (+ 큐 대기 시간) → 어디서 시간이 쓰이는지 표시
+# =============================================================
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+_DONE = object()
+
+
+class StageTimer:
+    """단계별 누적 시간(초)/횟수. 여러 스레드에서 기록 가능"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sec: Dict[str, float] = {}
+        self.count: Dict[str, int] = {}
+        self.t0 = time.time()
+
+    def add(self, stage: str, sec: float):
+        with self._lock:
+            self.sec[stage] = self.sec.get(stage, 0.0) + float(sec)
+            self.count[stage] = self.count.get(stage, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t)
+
+    def summary(self) -> dict:
+        """{단계: {"sec", "count", "share"}} + wall(전체 경과)"""
+        wall = max(time.time() - self.t0, 1e-9)
+        with self._lock:
+            out = {k: {"sec": round(v, 3), "count": self.count.get(k, 0), "share": round(v / wall, 3)}
+                   for k, v in self.sec.items()}
+        out["wall"] = {"sec": round(wall, 3), "count": 1, "share": 1.0}
+        return out
+
+
+def prefetch(items: Iterable, produce: Callable, maxsize: int = 2, timer: Optional[StageTimer] = None,
+             stage: str = "fetch", stop: Optional[Callable[[], bool]] = None) -> Iterator:
+    """
+    produce(item)를 생산 스레드에서 실행, 결과를 (item, 결과) 순서대로 반환.
+    큐가 maxsize개로 차면 생산 스레드가 대기 → 메모리 상한. 생산 중 예외는 소비 측에서 다시 발생
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=max(int(maxsize), 1))
+    halt = threading.Event()
+
+    def _worker():
+        try:
+            for it in items:
+                if halt.is_set() or (stop is not None and stop()):
+                    break
+                t = time.perf_counter()
+                res = produce(it)
+                if timer is not None:
+                    timer.add(stage, time.perf_counter() - t)
+                while not halt.is_set():
+                    try:
+                        q.put((it, res, None), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        except BaseException as e:  # 소비 측으로 전달
+            q.put((None, None, e))
+        finally:
+            q.put((_DONE, None, None))
+
+    th = threading.Thread(target=_worker, name=f"prefetch-{stage}", daemon=True)
+    th.start()
+    try:
+        while True:
+            t = time.perf_counter()
+            it, res, err = q.get()
+            if timer is not None:
+                timer.add(f"{stage}_wait", time.perf_counter() - t)
+            if err is not None:
+                raise err
+            if it is _DONE:
+                break
+            yield it, res
+    finally:
+        halt.set()
+        # 생산 스레드가 put에서 막혀 있으면 풀어줌
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+
+
+class background_writer:
+    """
+    with background_writer(write_fn, maxsize) as w: w.put(x) — write_fn(x)를 별도 스레드에서 순서대로 실행.
+    종료 시 남은 항목을 모두 기록하고, 기록 중 예외는 put/종료 시점에 다시 발생
+    """
+
+    def __init__(self, write: Callable, maxsize: int = 4, timer: Optional[StageTimer] = None, stage: str = "write"):
+        self.write, self.timer, self.stage = write, timer, stage
+        self.q: "queue.Queue" = queue.Queue(maxsize=max(int(maxsize), 1))
+        self.err: Optional[BaseException] = None
+        self.th = threading.Thread(target=self._run, name=f"writer-{stage}", daemon=True)
+
+    def _run(self):
+        while True:
+            item = self.q.get()
+            if item is _DONE:
+                return
+            if self.err is not None:
+                continue
+            t = time.perf_counter()
+            try:
+                self.write(item)
+            except BaseException as e:
+                self.err = e
+            if self.timer is not None:
+                self.timer.add(self.stage, time.perf_counter() - t)
+
+    def put(self, item):
+        if self.err is not None:
+            raise self.err
+        t = time.perf_counter()
+        self.q.put(item)
+        if self.timer is not None:
+            self.timer.add(f"{self.stage}_wait", time.perf_counter() - t)
+
+    def __enter__(self):
+        self.th.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.q.put(_DONE)
+        self.th.join()
+        if exc_type is None and self.err is not None:
+            raise self.err
+        return False
@@ -0,0 +1,138 @@
+# preset_runner.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 프리셋 일괄 실행기
+# - 프리셋 목록: presets.json (label, symbol, tf, mpb, lookahead + 선택적 조건 덮어쓰기)
+# - (종목, 타임프레임) 그룹마다 캔들 로드/지표 계산 1회 → 그룹 내 프리셋은 같은 배열/측정 구간 공유
+# - 그룹은 스레드로 동시에 실행 (로드 대기 중 다른 그룹 계산)
+# =============================================================
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine as be
+import upbit_data as ud
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PRESETS_PATH = os.path.join(BASE_DIR, "presets.json")
+
+# 프리셋에서 덮어쓸 수 있는 조건 (없으면 공통 설정 사용)
+PRESET_KEYS = ("strategy", "rsi_mode", "rsi_low", "rsi_high", "bb_cond", "cci_mode", "cci_over", "cci_under",
+               "bottom_mode", "sec_cond", "threshold_pct", "dedup_mode", "maemul_n")
+
+DEFAULT_PRESETS = [
+    {"label": "SOL · 3분 · N=10", "symbol": "KRW-SOL", "tf": "minutes/3", "mpb": 3, "lookahead": 10},
+    {"label": "SOL · 5분 · N=10", "symbol": "KRW-SOL", "tf": "minutes/5", "mpb": 5, "lookahead": 10},
+    {"label": "SOL · 60분 · N=5", "symbol": "KRW-SOL", "tf": "minutes/60", "mpb": 60, "lookahead": 5},
+]
+
+
+def load_presets(path: str = PRESETS_PATH) -> List[dict]:
+    """presets.json 읽기 ({"presets": [...]} 또는 목록). 없거나 깨졌으면 기본 프리셋"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        items = data.get("presets", []) if isinstance(data, dict) else data
+        out = [p for p in items if isinstance(p, dict) and p.get("symbol") and p.get("tf")]
+        for p in out:
+            p.setdefault("label", f"{p['symbol']} · {p['tf']} · N={p.get('lookahead', 10)}")
+            p.setdefault("mpb", int(p["tf"].split("/")[1]) if "minutes/" in p["tf"] else 24 * 60)
+            p.setdefault("lookahead", 10)
+        return out or list(DEFAULT_PRESETS)
+    except Exception:
+        return list(DEFAULT_PRESETS)
+
+
+def group_presets(presets: List[dict]) -> Dict[Tuple[str, str], List[dict]]:
+    groups: Dict[Tuple[str, str], List[dict]] = {}
+    for p in presets:
+        groups.setdefault((p["symbol"], p["tf"]), []).append(p)
+    return groups
+
+
+def _summary_row(p: dict, res: pd.DataFrame) -> dict:
+    stats = be.summarize(res)
+    return {
+        "프리셋": p["label"], "신호수": stats["신호수"], "성공": stats["성공"], "중립": stats["중립"],
+        "실패": stats["실패"], "승률(%)": round(stats["승률(%)"], 1), "합계수익률(%)": round(stats["합계수익률(%)"], 1),
+    }
+
+
+def run_group(df_ind: pd.DataFrame, presets: List[dict], common: dict, minutes_per_bar: int) -> List[Tuple[dict, pd.DataFrame]]:
+    """지표 프레임 1개에서 프리셋 여러 개 평가 (1차 신호 마스크/측정 구간 텐서 공유)"""
+    df_ind = df_ind.reset_index(drop=True)
+    arr = be.frame_arrays(df_ind)
+    max_h = max(int(p.get("lookahead", 10)) for p in presets)
+    fo = be.ForwardOutcomes(arr["close"], max_h, times=arr["time"])
+    masks: Dict[tuple, np.ndarray] = {}
+    out = []
+    for p in presets:
+        c = dict(common)
+        c.update({k: p[k] for k in PRESET_KEYS if k in p})
+        mkey = tuple(c.get(k) for k in ("strategy", "rsi_mode", "rsi_low", "rsi_high", "bb_cond", "cci_mode",
+                                        "cci_over", "cci_under", "bottom_mode")) + (c.get("sec_cond", "없음") != "없음",)
+        sig = masks.get(mkey)
+        if sig is None:
+            sig = np.flatnonzero(be.signal_mask(
+                df_ind, strategy=c.get("strategy", "없음"), rsi_mode=c.get("rsi_mode", "없음"),
+                rsi_low=c.get("rsi_low", 30), rsi_high=c.get("rsi_high", 70), bb_cond=c.get("bb_cond", "없음"),
+                cci_mode=c.get("cci_mode", "없음"), cci_over=c.get("cci_over", 100.0),
+                cci_under=c.get("cci_under", -100.0), bottom_mode=c.get("bottom_mode", False),
+                sec_cond=c.get("sec_cond", "없음"),
+            ))
+            masks[mkey] = sig
+        res = be.simulate_arrays(arr, sig, int(p.get("lookahead", 10)), float(c.get("threshold_pct", 1.0)),
+                                 int(minutes_per_bar), dedup_mode=c.get("dedup_mode", be.DEDUP_LABEL),
+                                 sec_cond=c.get("sec_cond", "없음"), bb_cond=c.get("bb_cond", "없음"),
+                                 manual_supply_levels=c.get("manual_supply_levels"),
+                                 maemul_n=int(c.get("maemul_n", 50)), fo=fo)
+        out.append((p, res))
+    return out
+
+
+def run_presets(presets: List[dict], common: dict, start_dt: datetime, end_dt: datetime,
+                indicator: Optional[dict] = None, warmup_bars: int = 0, max_workers: int = 4,
+                load: Optional[Callable[[str, str, int], pd.DataFrame]] = None,
+                on_group: Optional[Callable[[tuple, int, int], None]] = None):
+    """
+    프리셋 실행 → (요약 DataFrame(프리셋 순서), 그룹별 {"sec", "bars", "presets"}).
+    지표는 워밍업 포함 전체로 계산하고 평가는 [start_dt, end_dt] 구간만 (메인 화면과 같은 규칙).
+    load(symbol, interval_key, mpb) 미지정 시 upbit_data.load_candles (캐시 → API 보충)
+    """
+    ind = dict(bb_window=30, bb_dev=2.0, cci_window=14, cci_signal=9)
+    ind.update(indicator or {})
+    if load is None:
+        def load(symbol, interval_key, mpb):
+            return ud.load_candles(symbol, interval_key, start_dt, end_dt, mpb, warmup_bars=warmup_bars)
+
+    groups = group_presets(presets)
+    results: Dict[int, dict] = {}
+    timing: Dict[tuple, dict] = {}
+
+    def _run(key, items):
+        t0 = time.perf_counter()
+        raw = load(key[0], key[1], int(items[0]["mpb"]))
+        if raw is None or raw.empty:
+            return key, [], {"sec": round(time.perf_counter() - t0, 3), "bars": 0, "presets": len(items)}
+        df = ud.add_indicators(raw, ind["bb_window"], ind["bb_dev"], ind["cci_window"], ind["cci_signal"])
+        df = df[(df["time"] >= start_dt) & (df["time"] <= end_dt)]
+        done = run_group(df, items, common, int(items[0]["mpb"])) if not df.empty else []
+        return key, done, {"sec": round(time.perf_counter() - t0, 3), "bars": len(df), "presets": len(items)}
+
+    with ThreadPoolExecutor(max_workers=max(min(int(max_workers), len(groups)), 1)) as pool:
+        futs = [pool.submit(_run, k, v) for k, v in groups.items()]
+        for n, fut in enumerate(as_completed(futs), 1):
+            key, done, info = fut.result()
+            timing[key] = info
+            for p, res in done:
+                results[id(p)] = _summary_row(p, res)
+            if on_group:
+                on_group(key, n, len(groups))
+    rows = [results[id(p)] for p in presets if id(p) in results]
+    return pd.DataFrame(rows), timing
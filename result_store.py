@@ -0,0 +1,270 @@
+# result_store.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 조합 스캔 / 백그라운드 스캔 결과 저장소 (SQLite, data_cache/results.sqlite)
+# - sweep_rows: 실행(run)별 조합 통계 — 마켓/타임프레임/조합 키/기간 인덱스
+# - scan_rows: 작업(job)별 신호 결과 행 — (job_id, anchor_i) 유일, 마켓/타임프레임/신호시간 인덱스
+# - 조회 조건은 SQL WHERE로 전달 (필요한 행만 읽음) → 세션 메모리에 전체를 들고 있지 않아도 됨
+# =============================================================
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "data_cache", "results.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweep_runs (
+    run_id TEXT PRIMARY KEY, created TEXT, market TEXT, sdt TEXT, edt TEXT, strategy TEXT, params TEXT
+);
+CREATE TABLE IF NOT EXISTS sweep_rows (
+    run_id TEXT, created TEXT, market TEXT, sdt TEXT, edt TEXT, combo_key TEXT,
+    tf TEXT, lookahead INTEGER, strategy TEXT, rsi_mode TEXT, rsi_low REAL, rsi_high REAL,
+    bb_cond TEXT, bb_window INTEGER, bb_dev REAL, sec_cond TEXT, thr REAL, winrate_thr TEXT,
+    signals INTEGER, succ INTEGER, neu INTEGER, fail INTEGER,
+    winrate REAL, avg_ret REAL, total_ret REAL, result TEXT, first_date TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_sweep_market_tf ON sweep_rows (market, tf, edt);
+CREATE INDEX IF NOT EXISTS ix_sweep_tf ON sweep_rows (tf, edt);
+CREATE INDEX IF NOT EXISTS ix_sweep_combo ON sweep_rows (combo_key, edt);
+CREATE INDEX IF NOT EXISTS ix_sweep_edt ON sweep_rows (edt);
+CREATE INDEX IF NOT EXISTS ix_sweep_run ON sweep_rows (run_id);
+CREATE TABLE IF NOT EXISTS scan_rows (
+    job_id TEXT, market TEXT, tf TEXT, signal_time TEXT, end_time TEXT,
+    base_open REAL, end_close REAL, rsi REAL, bb_value REAL, thr REAL, result TEXT,
+    reach_min INTEGER, reach_bars INTEGER, final_ret REAL, min_ret REAL, max_ret REAL,
+    anchor_i INTEGER, end_i INTEGER,
+    PRIMARY KEY (job_id, anchor_i)
+);
+CREATE INDEX IF NOT EXISTS ix_scan_market_tf ON scan_rows (market, tf, signal_time);
+CREATE INDEX IF NOT EXISTS ix_scan_time ON scan_rows (signal_time);
+"""
+
+# 앱 조합 스캔 행(한글 컬럼) ↔ 저장 컬럼
+SWEEP_COLS = {
+    "타임프레임": "tf", "측정N(봉)": "lookahead", "RSI": "rsi_mode", "RSI_low": "rsi_low", "RSI_high": "rsi_high",
+    "BB": "bb_cond", "BB_기간": "bb_window", "BB_승수": "bb_dev", "2차조건": "sec_cond",
+    "목표수익률(%)": "thr", "승률기준(%)": "winrate_thr", "신호수": "signals", "성공": "succ", "중립": "neu",
+    "실패": "fail", "승률(%)": "winrate", "평균수익률(%)": "avg_ret", "합계수익률(%)": "total_ret",
+    "결과": "result", "날짜": "first_date",
+}
+# 조합 키 = 같은 설정이면 실행/기간이 달라도 같은 값 (세션 간 비교용)
+COMBO_FIELDS = ("tf", "lookahead", "strategy", "rsi_mode", "rsi_low", "rsi_high", "bb_cond", "bb_window", "bb_dev",
+                "sec_cond", "thr")
+# 신호 결과 행(_result_frame) ↔ 저장 컬럼
+SCAN_COLS = {
+    "신호시간": "signal_time", "종료시간": "end_time", "기준시가": "base_open", "종료가": "end_close",
+    "RSI(13)": "rsi", "BB값": "bb_value", "성공기준(%)": "thr", "결과": "result", "도달분": "reach_min",
+    "도달캔들(bars)": "reach_bars", "최종수익률(%)": "final_ret", "최저수익률(%)": "min_ret",
+    "최고수익률(%)": "max_ret", "anchor_i": "anchor_i", "end_i": "end_i",
+}
+
+_local = threading.local()
+
+
+def _ts(v) -> Optional[str]:
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return None
+    return pd.Timestamp(v).isoformat(sep=" ")
+
+
+def _py(v):
+    """numpy 스칼라/NaN → SQLite 값"""
+    if v is None:
+        return None
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating, float)):
+        return None if np.isnan(v) else float(v)
+    if isinstance(v, (pd.Timestamp, datetime, np.datetime64)):
+        return _ts(v)
+    return v
+
+
+def tf_label(interval_key: str) -> str:
+    """"minutes/15" → "15분", "days" → "일봉" (앱 TF_MAP 라벨과 동일)"""
+    if "minutes/" in interval_key:
+        return f"{interval_key.split('/')[1]}분"
+    return "일봉"
+
+
+def combo_key(row: dict) -> str:
+    raw = json.dumps({k: _py(row.get(k)) for k in COMBO_FIELDS}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultStore:
+    """스레드마다 연결 1개 (WAL: 워커 프로세스 기록 중에도 앱에서 조회 가능)"""
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conn(self):
+        conns = getattr(_local, "conns", None)
+        if conns is None:
+            conns = _local.conns = {}
+        con = conns.get(self.path)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            conns[self.path] = con
+        with con:  # 커밋/롤백
+            yield con
+
+    # --- 조합 스캔 ---
+    def save_sweep(self, rows: List[dict], market: str, sdt, edt, strategy: str = "없음",
+                   params: Optional[dict] = None) -> str:
+        """앱 조합 스캔 결과(한글 컬럼 행) 저장 → run_id"""
+        created = datetime.now().isoformat(sep=" ", timespec="seconds")
+        sdt_s, edt_s = _ts(sdt), _ts(edt)
+        run_id = hashlib.sha1(f"{created}|{market}|{sdt_s}|{edt_s}|{len(rows)}|{os.getpid()}".encode()).hexdigest()[:16]
+        recs = []
+        for r in rows:
+            rec = {v: _py(r.get(k)) for k, v in SWEEP_COLS.items()}
+            rec["strategy"] = r.get("전략", strategy)
+            rec.update(run_id=run_id, created=created, market=r.get("마켓", market), sdt=sdt_s, edt=edt_s)
+            rec["combo_key"] = combo_key(rec)
+            recs.append(rec)
+        cols = list(recs[0]) if recs else []
+        with self._conn() as con:
+            con.execute("INSERT OR REPLACE INTO sweep_runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (run_id, created, market, sdt_s, edt_s, strategy,
+                         json.dumps(params or {}, ensure_ascii=False, default=str)))
+            if recs:
+                con.executemany(f"INSERT INTO sweep_rows ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                                [tuple(r[c] for c in cols) for r in recs])
+        return run_id
+
+    def query_sweeps(self, market: Optional[str] = None, tf: Optional[str] = None,
+                     result: Optional[Iterable[str]] = None, min_signals: Optional[int] = None,
+                     min_winrate: Optional[float] = None, last_days: Optional[int] = None,
+                     since=None, until=None, combo: Optional[str] = None, run_id: Optional[str] = None,
+                     latest_only: bool = False, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        조건 조회 (예: 결과=성공, 신호수≥20, 15분, 최근 90일 → query_sweeps(tf="15분", result=["성공"],
+        min_signals=20, last_days=90)). last_days/since/until은 스캔 기간 종료일(edt) 기준.
+        latest_only=True면 (마켓, 조합 키)별 가장 최근 실행만
+        """
+        where, args = [], []
+        if market:
+            where.append("market = ?")
+            args.append(market)
+        if tf:
+            where.append("tf = ?")
+            args.append(tf)
+        if result:
+            result = [result] if isinstance(result, str) else list(result)
+            where.append(f"result IN ({', '.join('?' * len(result))})")
+            args.extend(result)
+        if min_signals is not None:
+            where.append("signals >= ?")
+            args.append(int(min_signals))
+        if min_winrate is not None:
+            where.append("winrate >= ?")
+            args.append(float(min_winrate))
+        if last_days is not None:
+            since = datetime.now() - timedelta(days=int(last_days))
+        if since is not None:
+            where.append("edt >= ?")
+            args.append(_ts(since))
+        if until is not None:
+            where.append("edt <= ?")
+            args.append(_ts(until))
+        if combo:
+            where.append("combo_key = ?")
+            args.append(combo)
+        if run_id:
+            where.append("run_id = ?")
+            args.append(run_id)
+        sql = "SELECT * FROM sweep_rows"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if latest_only:
+            sql = (f"SELECT * FROM ({sql}) t WHERE created = (SELECT MAX(created) FROM sweep_rows s "
+                   f"WHERE s.market = t.market AND s.combo_key = t.combo_key)")
+        sql += " ORDER BY created DESC, winrate DESC, signals DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._conn() as con:
+            df = pd.read_sql_query(sql, con, params=args)
+        return df.rename(columns={v: k for k, v in SWEEP_COLS.items()}).rename(columns={
+            "market": "마켓", "strategy": "전략", "sdt": "시작", "edt": "종료", "created": "실행시각"})
+
+    def sweep_runs(self, limit: int = 50) -> pd.DataFrame:
+        with self._conn() as con:
+            return pd.read_sql_query("SELECT * FROM sweep_runs ORDER BY created DESC LIMIT ?", con, params=[int(limit)])
+
+    # --- 백그라운드 스캔 ---
+    def add_scan_rows(self, job_id: str, market: str, tf: str, rows: pd.DataFrame):
+        """작업 조각 결과 기록 ((job_id, anchor_i) 중복은 덮어씀 → 재실행해도 한 번만)"""
+        if rows is None or rows.empty:
+            return
+        cols = [c for c in SCAN_COLS if c in rows.columns]
+        recs = [(job_id, market, tf) + tuple(_py(v) for v in vals)
+                for vals in rows[cols].itertuples(index=False, name=None)]
+        names = ["job_id", "market", "tf"] + [SCAN_COLS[c] for c in cols]
+        with self._conn() as con:
+            con.executemany(f"INSERT OR REPLACE INTO scan_rows ({', '.join(names)}) "
+                            f"VALUES ({', '.join('?' * len(names))})", recs)
+
+    def scan_frame(self, job_id: Optional[str] = None, market: Optional[str] = None, tf: Optional[str] = None,
+                   result: Optional[Iterable[str]] = None, since=None, until=None) -> pd.DataFrame:
+        """신호 결과 행 조회 (신호시간 순, 한글 컬럼)"""
+        where, args = [], []
+        for col, val in (("job_id", job_id), ("market", market), ("tf", tf)):
+            if val:
+                where.append(f"{col} = ?")
+                args.append(val)
+        if result:
+            result = [result] if isinstance(result, str) else list(result)
+            where.append(f"result IN ({', '.join('?' * len(result))})")
+            args.extend(result)
+        if since is not None:
+            where.append("signal_time >= ?")
+            args.append(_ts(since))
+        if until is not None:
+            where.append("signal_time <= ?")
+            args.append(_ts(until))
+        names = list(SCAN_COLS.values())
+        sql = f"SELECT {', '.join(names)} FROM scan_rows"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY signal_time, anchor_i"
+        with self._conn() as con:
+            df = pd.read_sql_query(sql, con, params=args)
+        if df.empty:
+            return pd.DataFrame()
+        df = df.rename(columns={v: k for k, v in SCAN_COLS.items()})
+        df["신호시간"] = pd.to_datetime(df["신호시간"])
+        df["종료시간"] = pd.to_datetime(df["종료시간"])
+        for c in ("RSI(13)", "BB값"):
+            df[c] = df[c].astype(object).where(df[c].notna(), None)
+        for c in ("기준시가", "도달분", "도달캔들(bars)", "anchor_i", "end_i"):
+            df[c] = df[c].astype(np.int64)
+        return df
+
+    def scan_count(self, job_id: str) -> int:
+        with self._conn() as con:
+            return int(con.execute("SELECT COUNT(*) FROM scan_rows WHERE job_id = ?", (job_id,)).fetchone()[0])
+
+
+_STORES: Dict[str, ResultStore] = {}
+
+
+def get_store(path: str = DB_PATH) -> ResultStore:
+    if path not in _STORES:
+        _STORES[path] = ResultStore(path)
+    return _STORES[path]
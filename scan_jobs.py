@@ -0,0 +1,357 @@
+# scan_jobs.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 긴 기간 스캔 백그라운드 작업
+# - 제출 → 별도 워커 프로세스에서 실행 (브라우저 새로고침/세션 종료와 무관)
+# - 체크포인트: data_cache/scan_jobs/<job_id>/state.json, 조각 결과: data_cache/scan_parts/<job_id>/
+# - 같은 조건으로 다시 제출하면 기존 작업에 연결 (다른 세션에서도 동일)
+# - 워커가 죽은 작업은 재제출 시 마지막 체크포인트부터 이어서 실행
+# - 조각 간 지표/측정 구간/중복 제거 상태는 stream_backtest가 이어받음 (anchor_i는 전체 기준)
+# - 조각 결과는 result_store(SQLite)에도 기록 → job_results는 저장소에서 조회 (조각 파일은 백업)
+#   python scan_jobs.py run <job_id>
+# =============================================================
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import subprocess
+import traceback
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOB_DIR = os.path.join(BASE_DIR, "data_cache", "scan_jobs")
+PART_DIR = os.path.join(BASE_DIR, "data_cache", "scan_parts")
+FINAL_STATUS = ("done", "failed", "cancelled")
+_PROCS = {}  # 이 프로세스가 띄운 워커 (종료 시 회수용)
+
+# 작업 스펙 기본값 (run_combination_scan_chunked 인자와 동일)
+DEFAULT_SPEC = {
+    "symbol": "KRW-BTC", "interval_key": "minutes/15", "minutes_per_bar": 15,
+    "start": None, "end": None, "days_per_chunk": 7,
+    "bb_window": 30, "bb_dev": 2.0, "cci_window": 14, "cci_signal": 9,
+    "simulate_kwargs": {},
+}
+
+
+# -----------------------------
+# 상태 파일
+# -----------------------------
+def _job_path(job_id: str, name: str) -> str:
+    return os.path.join(JOB_DIR, job_id, name)
+
+
+def _write_json(path: str, obj: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def job_id_for(spec: dict) -> str:
+    raw = json.dumps(spec, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def job_spec(job_id: str) -> Optional[dict]:
+    return _read_json(_job_path(job_id, "job.json"))
+
+
+def job_status(job_id: str) -> Optional[dict]:
+    """state.json + 워커 생존 여부(alive)"""
+    state = _read_json(_job_path(job_id, "state.json"))
+    if state is not None:
+        proc = _PROCS.get(job_id)
+        if proc is not None and proc.poll() is not None:
+            _PROCS.pop(job_id, None)
+        state["alive"] = state.get("status") not in FINAL_STATUS and _pid_alive(_read_pid(job_id))
+        if state.get("status") == "running" and not state["alive"]:
+            state["status"] = "stalled"
+    return state
+
+
+def _save_state(job_id: str, state: dict):
+    state = {k: v for k, v in state.items() if k != "alive"}
+    state["updated"] = datetime.now().isoformat(timespec="seconds")
+    _write_json(_job_path(job_id, "state.json"), state)
+
+
+def _read_pid(job_id: str):
+    try:
+        with open(_job_path(job_id, "worker.pid"), "r") as f:
+            return int(f.read().strip() or 0)
+    except Exception:
+        return None
+
+
+def _write_pid(job_id: str, pid: int):
+    path = _job_path(job_id, "worker.pid")
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(pid))
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def list_jobs() -> List[dict]:
+    """전체 작업 (최근 갱신 순): job_id, spec, state"""
+    if not os.path.isdir(JOB_DIR):
+        return []
+    out = []
+    for job_id in os.listdir(JOB_DIR):
+        spec, state = job_spec(job_id), job_status(job_id)
+        if spec is not None and state is not None:
+            out.append({"job_id": job_id, "spec": spec, "state": state})
+    return sorted(out, key=lambda j: j["state"].get("updated", ""), reverse=True)
+
+
+# -----------------------------
+# 제출 / 취소
+# -----------------------------
+def submit_job(spec: dict) -> str:
+    """작업 제출 (이미 실행 중/완료된 같은 작업이면 그 job_id에 연결)"""
+    spec = dict(DEFAULT_SPEC, **spec)
+    job_id = job_id_for(spec)
+    state = job_status(job_id)
+    if state is not None and (state["status"] == "done" or state["alive"]):
+        return job_id
+    _write_json(_job_path(job_id, "job.json"), spec)
+    if state is None:
+        state = {"status": "queued", "idx": 0, "total": None, "parts": [], "error": None,
+                 "created": datetime.now().isoformat(timespec="seconds")}
+    else:
+        state.update(status="queued", error=None)
+    try:
+        os.remove(_job_path(job_id, "cancel"))
+    except FileNotFoundError:
+        pass
+    _save_state(job_id, state)
+    _spawn(job_id)
+    return job_id
+
+
+def _spawn(job_id: str):
+    log = open(_job_path(job_id, "worker.log"), "ab")
+    kw = {"start_new_session": True} if os.name != "nt" else {"creationflags": 0x00000200}
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "run", job_id],
+                            cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, **kw)
+    log.close()
+    _PROCS[job_id] = proc
+    _write_pid(job_id, proc.pid)
+
+
+def cancel_job(job_id: str):
+    """다음 조각 경계에서 중단 (체크포인트 유지 → 재제출 시 이어서 실행)"""
+    os.makedirs(os.path.dirname(_job_path(job_id, "cancel")), exist_ok=True)
+    open(_job_path(job_id, "cancel"), "w").close()
+
+
+# -----------------------------
+# 조각 결과 저장/로드 (parquet, 미설치 시 pickle)
+# -----------------------------
+def _write_part(df: pd.DataFrame, path_base: str) -> str:
+    try:
+        df.to_parquet(path_base + ".parquet", index=False)
+        return path_base + ".parquet"
+    except ImportError:
+        df.to_pickle(path_base + ".pkl")
+        return path_base + ".pkl"
+
+
+def _read_part(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+
+
+def job_results(job_id: str) -> pd.DataFrame:
+    """지금까지 완료된 조각 결과 (실행 중에도 부분 결과 조회 가능). 저장소에 없으면 조각 파일 병합"""
+    try:
+        from result_store import get_store
+
+        store = get_store()
+        if store.scan_count(job_id):
+            return store.scan_frame(job_id=job_id)
+    except Exception:
+        pass
+    state = job_status(job_id) or {}
+    dfs = []
+    for p in state.get("parts", []):
+        try:
+            dfp = _read_part(p)
+            if dfp is not None and not dfp.empty:
+                dfs.append(dfp)
+        except Exception:
+            pass
+    if not dfs:
+        return pd.DataFrame()
+    return pd.concat(dfs, ignore_index=True)
+
+
+def job_cube(job_id: str):
+    """지금까지 완료된 조각의 시간대 × 요일 성과 큐브 (체크포인트에 누적, 이전 작업은 결과에서 생성)"""
+    from time_cube import TimeCube
+
+    ckpt = _load_ckpt(job_id) or {}
+    if ckpt.get("cube") is not None:
+        return TimeCube.from_state(ckpt["cube"])
+    return TimeCube.from_frame(job_results(job_id))
+
+
+# -----------------------------
+# 워커
+# -----------------------------
+def chunked_periods(start_dt, end_dt, days_per_chunk=7):
+    cur = start_dt
+    delta = timedelta(days=days_per_chunk)
+    while cur < end_dt:
+        nxt = min(cur + delta, end_dt)
+        yield cur, nxt
+        cur = nxt
+
+
+def _load_ckpt(job_id: str) -> Optional[dict]:
+    try:
+        with open(_job_path(job_id, "stream.pkl"), "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _save_ckpt(job_id: str, ckpt: dict):
+    path = _job_path(job_id, "stream.pkl")
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(ckpt, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _new_engine(spec: dict, start_dt: datetime):
+    from stream_backtest import StreamingBacktest
+
+    return StreamingBacktest(spec.get("simulate_kwargs") or {}, int(spec["minutes_per_bar"]),
+                             bb_window=spec["bb_window"], bb_dev=spec["bb_dev"], cci_window=spec["cci_window"],
+                             cci_signal=spec["cci_signal"], start_time=start_dt)
+
+
+def run_job(job_id: str):
+    """
+    조각 파이프라인: [fetch 스레드] 다음 조각 캔들 미리 로드 → [메인] 스트리밍 엔진 공급 →
+    [write 스레드] 조각 파일 + 체크포인트(stream.pkl) 기록.
+    엔진이 지표/열린 측정 구간/중복 제거 상태를 이어받으므로 결과 = 전체 구간 1회 실행.
+    단계별 누적 시간은 state["timings"]에 기록
+    """
+    import upbit_data as ud
+    from pipeline import StageTimer, prefetch, background_writer
+    from result_store import get_store, tf_label
+    from time_cube import TimeCube
+
+    spec = job_spec(job_id)
+    state = job_status(job_id) or {}
+    if spec is None:
+        return
+    start_dt, end_dt = pd.Timestamp(spec["start"]).to_pydatetime(), pd.Timestamp(spec["end"]).to_pydatetime()
+    chunks = list(chunked_periods(start_dt, end_dt, int(spec["days_per_chunk"])))
+    part_dir = os.path.join(PART_DIR, job_id)
+    os.makedirs(part_dir, exist_ok=True)
+    # 체크포인트(조각 번호 + 엔진 상태 + 조각 파일)는 한 파일에 원자적으로 기록
+    ckpt = _load_ckpt(job_id) or {"idx": 0, "engine": _new_engine(spec, start_dt).state_dict(), "parts": []}
+    from stream_backtest import StreamingBacktest
+    eng_state = ckpt["engine"]
+    engine = StreamingBacktest.from_state(pickle.loads(eng_state) if isinstance(eng_state, bytes) else eng_state)
+    mpb = int(spec["minutes_per_bar"])
+    warmup_bars = max(13, int(spec["bb_window"]), int(spec["cci_window"])) * 5
+    tag = f"{spec['symbol']}_{spec['interval_key'].replace('/', '-')}"
+    timer = StageTimer()
+    cancel_path = _job_path(job_id, "cancel")
+    store = get_store()
+    cube = TimeCube.from_state(ckpt.get("cube"))  # 시간대 × 요일 성과 (조각마다 누적)
+
+    def _load(i: int) -> pd.DataFrame:
+        s, e = chunks[i]
+        return ud.load_candles(spec["symbol"], spec["interval_key"], s, e, mpb,
+                               warmup_bars=warmup_bars if i == 0 else 0)
+
+    def _write(item):
+        # item: (idx, 결과 행, 파일명, 엔진 상태 pickle, 남은 버퍼 봉 수) — 메인 스레드에서 만든 스냅샷
+        idx, rows, name, eng_blob, buffered = item
+        if rows is not None and not rows.empty:
+            part = _write_part(rows, os.path.join(part_dir, name))
+            if part not in ckpt["parts"]:
+                ckpt["parts"].append(part)
+            store.add_scan_rows(job_id, spec["symbol"], tf_label(spec["interval_key"]), rows)
+            cube.add_frame(rows)
+        ckpt.update(idx=idx, engine=eng_blob, cube=cube.state_dict())
+        _save_ckpt(job_id, ckpt)
+        state.update(idx=idx, parts=list(ckpt["parts"]), buffered_bars=buffered, timings=timer.summary())
+        _save_state(job_id, state)
+
+    def _snapshot(idx: int, rows: pd.DataFrame, name: str):
+        blob = pickle.dumps(engine.state_dict(), protocol=pickle.HIGHEST_PROTOCOL)
+        return idx, rows, name, blob, engine.buffered_bars
+
+    _write_pid(job_id, os.getpid())
+    state.update(status="running", total=len(chunks), error=None, idx=ckpt["idx"], parts=list(ckpt["parts"]),
+                 last_chunk_sec=None)
+    _save_state(job_id, state)
+    cancelled, fed = False, int(ckpt["idx"])
+    try:
+        with background_writer(_write, maxsize=4, timer=timer, stage="write") as writer:
+            feed = prefetch(range(int(ckpt["idx"]), len(chunks)), _load, maxsize=3, timer=timer, stage="fetch",
+                            stop=lambda: os.path.exists(cancel_path))
+            for i, df in feed:
+                if os.path.exists(cancel_path):
+                    cancelled = True
+                    break
+                s, e = chunks[i]
+                t0 = time.time()
+                with timer.stage("simulate"):
+                    rows = engine.feed(df)
+                    item = _snapshot(i + 1, rows, f"{tag}_{s:%Y%m%d%H%M}_{e:%Y%m%d%H%M}")
+                writer.put(item)
+                fed = i + 1
+                state["last_chunk_sec"] = round(time.time() - t0, 2)
+            feed.close()
+            # 생산 스레드가 취소 표시를 보고 먼저 멈춘 경우
+            cancelled = cancelled or (fed < len(chunks) and os.path.exists(cancel_path))
+            if not cancelled:
+                with timer.stage("simulate"):
+                    item = _snapshot(len(chunks), engine.finish(), f"{tag}_final")
+                writer.put(item)
+        state["status"] = "cancelled" if cancelled else "done"
+        state["timings"] = timer.summary()
+        _save_state(job_id, state)
+    except Exception:
+        state["status"] = "failed"
+        state["error"] = traceback.format_exc(limit=5)
+        state["timings"] = timer.summary()
+        _save_state(job_id, state)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "run":
+        run_job(sys.argv[2])
+    else:
+        for j in list_jobs():
+            st_ = j["state"]
+            print(j["job_id"], st_.get("status"), f"{st_.get('idx', 0)}/{st_.get('total')}", j["spec"].get("symbol"))
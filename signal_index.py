@@ -0,0 +1,179 @@
+# signal_index.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 1차 신호 인덱스 (data_cache/signal_index)
+# - (종목, 타임프레임, 지표 파라미터, 1차 조건) 별로 캐시 전체 구간의 신호 봉 시각(정렬 배열)을 저장
+# - 새 캔들은 지표 상태(RSI ewm + 과거 참조 창)를 이어받아 증분 계산 → 전체 재계산과 같은 값
+# - 기간 조회 = 인덱스 구간 자르기 (마지막 진행 중 봉만 직접 계산)
+# =============================================================
+import os
+import json
+import zlib
+import pickle
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine as be
+import upbit_data as ud
+from stream_backtest import OHLCV, RSI_WINDOW, extend_indicators
+
+INDEX_DIR = os.path.join(ud.DATA_DIR, "signal_index")
+# signal_mask 인자 (sec_cond는 "없음" 여부만 결과에 영향)
+SIGNAL_KEYS = ("strategy", "rsi_mode", "rsi_low", "rsi_high", "bb_cond", "cci_mode", "cci_over", "cci_under",
+               "bottom_mode")
+# signal_mask가 참조하는 과거 봉 수 (rolling 20 / shift 2 / rolling 3)
+_MASK_BACK = 25
+
+
+def signal_params(params: dict) -> dict:
+    p = {k: params.get(k) for k in SIGNAL_KEYS}
+    p["sec_any"] = params.get("sec_cond", "없음") != "없음"
+    return p
+
+
+def _pack(times: np.ndarray) -> bytes:
+    """정렬된 int64(ns) 시각 → 차분 + zlib"""
+    t = np.asarray(times, dtype=np.int64)
+    d = np.diff(t, prepend=np.int64(0)) if len(t) else t
+    return zlib.compress(d.tobytes(), 6)
+
+
+def _unpack(blob: bytes) -> np.ndarray:
+    d = np.frombuffer(zlib.decompress(blob), dtype=np.int64)
+    return np.cumsum(d) if len(d) else d.copy()
+
+
+class SignalIndex:
+    """
+    update(raw): 캐시 캔들(전체, time 오름차순)에서 아직 반영 안 된 확정 봉만 처리.
+    times: 신호 봉 시각(datetime64[ns]) 정렬 배열, last_time: 반영된 마지막 봉
+    """
+
+    def __init__(self, market: str, interval_key: str, indicator: dict, params: dict, root: str = INDEX_DIR):
+        self.market, self.interval_key = market, interval_key
+        self.ind = (int(indicator.get("bb_window", 30)), float(indicator.get("bb_dev", 2.0)),
+                    int(indicator.get("cci_window", 14)), int(indicator.get("cci_signal", 9)))
+        self.params = signal_params(params)
+        self.back = max(self.ind[0], self.ind[2] + self.ind[3], _MASK_BACK, RSI_WINDOW) + 5
+        payload = {"market": market, "tf": interval_key, "ind": self.ind, "params": self.params}
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        self.key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+        self.path = os.path.join(root, f"{self.key}.pkl")
+        self.times = np.zeros(0, dtype="datetime64[ns]")
+        self.buf = pd.DataFrame()     # 과거 참조 창 (지표 포함)
+        self.rsi_seed = None
+        self.n_seen = 0
+        self.first_time = None
+        self.last_time = None
+        self._load()
+
+    # --- 저장/로드 ---
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                st = pickle.load(f)
+        except Exception:
+            return
+        self.times = _unpack(st["times"]).view("datetime64[ns]")
+        self.buf, self.rsi_seed, self.n_seen = st["buf"], st["rsi_seed"], st["n_seen"]
+        self.first_time, self.last_time = st["first_time"], st["last_time"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + f".{os.getpid()}.tmp"
+        st = {"times": _pack(self.times.view(np.int64)), "buf": self.buf, "rsi_seed": self.rsi_seed,
+              "n_seen": self.n_seen, "first_time": self.first_time, "last_time": self.last_time}
+        with open(tmp, "wb") as f:
+            pickle.dump(st, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        self.times = np.zeros(0, dtype="datetime64[ns]")
+        self.buf, self.rsi_seed, self.n_seen = pd.DataFrame(), None, 0
+        self.first_time = self.last_time = None
+
+    # --- 갱신 ---
+    def _mask(self, df: pd.DataFrame) -> np.ndarray:
+        p = self.params
+        return be.signal_mask(df, strategy=p["strategy"] or "없음", rsi_mode=p["rsi_mode"] or "없음",
+                              rsi_low=p["rsi_low"] if p["rsi_low"] is not None else 30,
+                              rsi_high=p["rsi_high"] if p["rsi_high"] is not None else 70,
+                              bb_cond=p["bb_cond"] or "없음", cci_mode=p["cci_mode"] or "없음",
+                              cci_over=p["cci_over"] if p["cci_over"] is not None else 100.0,
+                              cci_under=p["cci_under"] if p["cci_under"] is not None else -100.0,
+                              bottom_mode=bool(p["bottom_mode"]), sec_cond="있음" if p["sec_any"] else "없음")
+
+    def update(self, raw: pd.DataFrame, closed_only: bool = True) -> int:
+        """
+        raw(캐시 전체 캔들)의 새 확정 봉 반영 → 반영한 봉 수.
+        closed_only=True면 마지막 봉(진행 중일 수 있음)은 반영하지 않음.
+        캐시 앞쪽이 바뀐 경우(더 과거 캔들 보충)는 처음부터 다시 계산
+        """
+        if raw is None or raw.empty:
+            return 0
+        raw = raw[OHLCV]
+        if closed_only:
+            raw = raw.iloc[:-1]
+        if raw.empty:
+            return 0
+        t0 = pd.Timestamp(raw["time"].iloc[0])
+        if self.first_time is not None and t0 < self.first_time:
+            self.reset()
+        new = raw if self.last_time is None else raw[raw["time"] > self.last_time]
+        if new.empty:
+            return 0
+        fresh = self.n_seen < self.back
+        if fresh:
+            # 시작 구간: 지금까지 본 봉 + 새 봉 전체 재계산 (add_indicators 규칙 그대로)
+            new = raw if self.last_time is None else raw[raw["time"] >= self.first_time]
+            self.reset()
+        nb = len(self.buf)
+        out, self.rsi_seed = extend_indicators(self.buf, new.reset_index(drop=True), self.ind, self.rsi_seed,
+                                               self.n_seen, fresh=fresh)
+        m = self._mask(out)
+        added = out["time"].to_numpy()[nb:][m[nb:]].astype("datetime64[ns]")
+        self.times = np.concatenate([self.times, added])
+        if self.first_time is None:
+            self.first_time = pd.Timestamp(out["time"].iloc[0])
+        self.n_seen += len(new)
+        self.last_time = pd.Timestamp(out["time"].iloc[-1])
+        self.buf = out.iloc[-self.back:].reset_index(drop=True)
+        return int(len(new))
+
+    # --- 조회 ---
+    def query(self, start=None, end=None) -> np.ndarray:
+        """[start, end] 신호 시각 (인덱스 구간 자르기)"""
+        lo = 0 if start is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(self.times) if end is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(end)), "right"))
+        return self.times[lo:hi]
+
+    def positions(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        지표 프레임 df(time 오름차순)의 신호 위치. 인덱스에 반영된 구간은 조회,
+        그 이후 봉(진행 중/캐시에 없는 봉)은 df로 직접 계산
+        """
+        if df is None or df.empty:
+            return np.zeros(0, dtype=np.int64)
+        t = pd.to_datetime(df["time"]).to_numpy().astype("datetime64[ns]")
+        if self.last_time is None or t[0] < np.datetime64(self.first_time):
+            return np.flatnonzero(self._mask(df))
+        cut = int(np.searchsorted(t, np.datetime64(self.last_time), "right"))
+        hits = self.query(t[0], t[cut - 1]) if cut else self.times[:0]
+        pos = np.flatnonzero(np.isin(t[:cut], hits))
+        if cut < len(t):
+            lo = max(cut - _MASK_BACK, 0)
+            tail = np.flatnonzero(self._mask(df.iloc[lo:].reset_index(drop=True))) + lo
+            pos = np.concatenate([pos, tail[tail >= cut]])
+        return pos.astype(np.int64)
+
+
+def signal_positions(market: str, interval_key: str, df: pd.DataFrame, indicator: dict, params: dict,
+                     root: str = INDEX_DIR) -> np.ndarray:
+    """캐시 CSV로 인덱스 증분 갱신 후 df의 1차 신호 위치 반환"""
+    _, tf_key = ud.candle_url(interval_key)
+    idx = SignalIndex(market, interval_key, indicator, params, root=root)
+    if idx.update(ud._read_cache(market, tf_key)) or not os.path.exists(idx.path):
+        idx.save()
+    return idx.positions(df)
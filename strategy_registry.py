@@ -0,0 +1,209 @@
+# strategy_registry.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 매매기법 레지스트리 (선언형 규칙 → 벡터 마스크 / 실시간 최신 봉 판정)
+# - 전략 = 지표 컬럼(add_indicators 결과: RSI13 / CCI / BB_*, OHLCV) 위의 비교식 목록 (AND) — DataFrame / Candles 공용
+#   비교식: (좌변, 연산자, 우변[, 배수]) — 피연산자는 "컬럼", "컬럼[k]"(k봉 전), 숫자, "$파라미터"
+#   ("any", [비교식...]) 는 OR 묶음
+# - 파생 컬럼(이동평균/최대/변화율/EMA)은 DERIVED에 한 번만 정의
+# - import 시 1회 컴파일 → mask(): 전체 봉 벡터 평가 (백테스트/조합 스캔/비교 모드)
+#                          last(): 필요한 최소 꼬리 봉만 잘라 최신 봉 판정 (실시간 감시)
+# - 새 전략 = STRATEGY_RULES 항목 1개 추가
+# =============================================================
+import operator
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 파생 컬럼: 이름 → (원본 컬럼, 종류, 창, min_periods)
+DERIVED = {
+    "vol_ma20": ("volume", "mean", 20, 1),
+    "high_max3": ("high", "max", 3, 3),
+    "chg": ("close", "pct", 1, None),
+    "ema5": ("close", "ema", 5, None),
+    "ema20": ("close", "ema", 20, None),
+    "ema50": ("close", "ema", 50, None),
+    "ema200": ("close", "ema", 200, None),
+}
+_EMA_TAIL = 5  # EMA는 창 × 5봉 꼬리로 근사 (잘린 가중치 (1-α)^k ≈ e^-10 → 무시 가능)
+
+# entry: 1차 신호 (백테스트 마스크 = 실시간 최초 포착), confirm: 실시간 2단계(유효 신호) 확인 — 비어 있으면 다음 판정에서 바로 확정
+STRATEGY_RULES = {
+    "TGV": {
+        "entry": [("volume", ">", "vol_ma20", 2.0), ("close", ">", "high[1]"), ("RSI13", ">", 55)],
+        "confirm": [("RSI13", ">", 60), ("ema5", ">", "ema20")],
+        "tp": "+0.7%", "sl": "-0.4%", "desc": "거래량 급등 + 전고점 돌파",
+    },
+    "RVB": {
+        "entry": [("RSI13", "<=", "$rsi_low"), ("CCI", "<=", -100), ("close", ">", "open")],
+        "confirm": [("any", [("RSI13", ">", 40), ("CCI", ">", -50)])],
+        "tp": "+1.2%", "sl": "-0.5%", "desc": "과매도 + CCI 바닥권 양봉 반전",
+    },
+    "PR": {
+        "entry": [("chg[1]", "<=", -0.015), ("RSI13", "<=", 30), ("close", ">", "open")],
+        "confirm": [("RSI13", ">", 35)],
+        "tp": "+1.2%", "sl": "-0.5%", "desc": "급락 후 과매도 반등",
+    },
+    "LCT": {
+        "entry": [("CCI", ">", -100), ("CCI", ">", "CCI[1]"), ("RSI13", ">", 50)],
+        "confirm": [("ema50", ">", "ema200", 1.01)],
+        "tp": "+8%", "sl": "-2%", "desc": "CCI 회복 + 장기 추세 전환",
+    },
+    "4D_Sync": {
+        "entry": [("close", ">=", "BB_mid"), ("RSI13", ">=", 55)],
+        "confirm": [],
+        "tp": "+1.5%", "sl": "-0.4%", "desc": "BB 중앙선 위 상승 동조",
+    },
+    "240m_Sync": {
+        "entry": [("CCI[1]", "<=", -200), ("CCI", ">", "CCI[1]")],
+        "confirm": [("CCI", ">", -150)],
+        "tp": "+2.5%", "sl": "-0.6%", "desc": "CCI -200 이하 과매도 반전",
+    },
+    "Composite_Confirm": {
+        "entry": [("close", ">=", "BB_mid"), ("RSI13", ">=", 60), ("close", ">", "high_max3[1]")],
+        "confirm": [],
+        "tp": "+1.5%", "sl": "-0.4%", "desc": "BB 중앙선 위 + 3봉 고점 돌파",
+    },
+    "Divergence_RVB": {
+        "entry": [("RSI13", ">", "RSI13[1]"), ("close", "<=", "close[1]", 0.999)],
+        "confirm": [],
+        "tp": "+1.7%", "sl": "-0.5%", "desc": "가격 하락 중 RSI 상승 (다이버전스)",
+    },
+    "Market_Divergence": {
+        "entry": [("close", ">=", "BB_low"), ("RSI13", ">", "RSI13[1]"), ("RSI13", ">=", 45)],
+        "confirm": [],
+        "tp": "+1.4%", "sl": "-0.5%", "desc": "BB 하단 위 RSI 상승 전환",
+    },
+}
+DEFAULT_PARAMS = {"rsi_low": 30.0}
+
+_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+_REF = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)(?:\[(\d+)\])?$")
+
+
+def _series(df, name: str, cache: dict) -> np.ndarray:
+    """컬럼/파생 컬럼 배열 (프레임별 cache 공유)"""
+    hit = cache.get(name)
+    if hit is not None:
+        return hit
+    if name in DERIVED:
+        src, kind, win, mp = DERIVED[name]
+        s = pd.Series(np.asarray(df[src], dtype=np.float64))
+        if kind == "mean":
+            out = s.rolling(win, min_periods=mp).mean()
+        elif kind == "max":
+            out = s.rolling(win, min_periods=mp).max()
+        elif kind == "pct":
+            out = s / s.shift(win) - 1.0
+        else:
+            out = s.ewm(span=win).mean()
+        arr = out.to_numpy(dtype=np.float64)
+    else:
+        arr = np.asarray(df[name], dtype=np.float64)
+    cache[name] = arr
+    return arr
+
+
+class CompiledStrategy:
+    """규칙 목록 1개를 (피연산자 참조, 연산자) 튜플로 미리 해석"""
+
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.spec = spec
+        self.entry = [self._compile(c) for c in spec.get("entry", [])]
+        self.confirm = [self._compile(c) for c in spec.get("confirm", [])]
+        self.lookback = max([self._need(c) for c in self.entry + self.confirm] + [1])
+
+    # --- 컴파일 ---
+    def _operand(self, x):
+        if isinstance(x, (int, float)):
+            return ("const", float(x), 0)
+        if isinstance(x, str) and x.startswith("$"):
+            return ("param", x[1:], 0)
+        m = _REF.match(str(x))
+        if not m:
+            raise ValueError(f"{self.name}: 알 수 없는 피연산자 {x!r}")
+        return ("col", m.group(1), int(m.group(2) or 0))
+
+    def _compile(self, cond):
+        if cond[0] == "any":
+            return ("any", [self._compile(c) for c in cond[1]])
+        lhs, op, rhs = cond[:3]
+        scale = float(cond[3]) if len(cond) > 3 else 1.0
+        return ("cmp", self._operand(lhs), _OPS[op], self._operand(rhs), scale)
+
+    def _need(self, c) -> int:
+        """이 비교식을 최신 봉에서 평가하는 데 필요한 꼬리 봉 수"""
+        if c[0] == "any":
+            return max(self._need(x) for x in c[1])
+        need = 1
+        for kind, name, lag in (c[1], c[3]):
+            if kind != "col":
+                continue
+            win = 1
+            if name in DERIVED:
+                _, dkind, w, _ = DERIVED[name]
+                win = w * _EMA_TAIL if dkind == "ema" else w + 1
+            need = max(need, lag + win)
+        return need
+
+    # --- 평가 ---
+    def _value(self, df, ref, params, cache):
+        kind, name, lag = ref
+        if kind == "const":
+            return name
+        if kind == "param":
+            return float(params.get(name, DEFAULT_PARAMS.get(name, np.nan)))
+        arr = _series(df, name, cache)
+        if lag == 0:
+            return arr
+        key = f"{name}[{lag}]"
+        hit = cache.get(key)
+        if hit is None:
+            hit = np.full(len(arr), np.nan)
+            hit[lag:] = arr[:-lag]
+            cache[key] = hit
+        return hit
+
+    def _eval(self, df, c, params, cache) -> np.ndarray:
+        if c[0] == "any":
+            out = np.zeros(len(df), dtype=bool)
+            for x in c[1]:
+                out |= self._eval(df, x, params, cache)
+            return out
+        _, lhs, op, rhs, scale = c
+        r = self._value(df, rhs, params, cache)
+        with np.errstate(invalid="ignore"):
+            res = op(self._value(df, lhs, params, cache), r * scale if scale != 1.0 else r)
+        return np.broadcast_to(np.asarray(res, dtype=bool), (len(df),))
+
+    def _all(self, df, conds, params, cache) -> np.ndarray:
+        out = np.ones(len(df), dtype=bool)
+        for c in conds:
+            out &= self._eval(df, c, params, cache)  # NaN 비교 = False
+        return out
+
+    def mask(self, df, params: Optional[dict] = None, cache: Optional[dict] = None) -> np.ndarray:
+        """전체 봉 1차 신호 (bool 배열). cache: 같은 프레임의 여러 전략이 공유"""
+        return self._all(df, self.entry, params or {}, {} if cache is None else cache)
+
+    def last(self, df, stage: str = "entry", params: Optional[dict] = None) -> bool:
+        """최신 봉 판정 — 꼬리 lookback봉만 평가 (실시간 감시용)"""
+        tail = df[-self.lookback:]
+        conds = self.entry if stage == "entry" else self.confirm
+        if len(tail) == 0:
+            return False
+        return bool(self._all(tail, conds, params or {}, {})[-1])
+
+
+REGISTRY: Dict[str, CompiledStrategy] = {k: CompiledStrategy(k, v) for k, v in STRATEGY_RULES.items()}
+STRATEGIES = tuple(REGISTRY)
+
+
+def strategy_masks(df, rsi_low=30, names: Optional[List[str]] = None) -> dict:
+    """여러 전략 1차 마스크를 한 번에 ({전략: bool 배열}) — 컬럼/지연값/파생 컬럼은 전략끼리 공유"""
+    cache: dict = {}
+    params = {"rsi_low": float(rsi_low)}
+    return {k: REGISTRY[k].mask(df, params, cache) for k in (names or STRATEGIES)}
@@ -0,0 +1,211 @@
+# stream_backtest.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 조각(chunk) 단위 스트리밍 백테스트
+# - 조각 경계를 넘어 지표 워밍업(RSI ewm 상태 + 창 지표용 과거 봉), 열린 측정 구간,
+#   중복 제거 잠금 상태를 이어받음 → 전체 구간 1회 실행과 같은 결과
+# - 유지하는 봉 = 미확정 신호 이후 + 과거 참조 창 → 기간 길이와 무관한 메모리
+# - anchor_i / end_i 는 스트림 전체 기준 인덱스 (조각 간 충돌 없음)
+# =============================================================
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine as be
+import upbit_data as ud
+
+OHLCV = ["time", "open", "high", "low", "close", "volume"]
+IND_COLS = ["RSI13", "BB_up", "BB_low", "BB_mid", "CCI", "CCI_sig"]
+RSI_WINDOW = 13
+
+
+def rsi_continue(close: np.ndarray, prev_close: Optional[float], seed: Optional[tuple], n_prev: int,
+                 window: int = RSI_WINDOW):
+    """
+    ta RSIIndicator와 같은 ewm(alpha=1/window, adjust=False) 계산을 이전 상태에서 이어서 수행.
+    반환: (rsi, (emaup, emadn) 마지막 상태)
+    """
+    s = pd.Series(np.asarray(close, dtype=np.float64))
+    if prev_close is not None:
+        s = pd.concat([pd.Series([float(prev_close)]), s], ignore_index=True)
+    diff = s.diff(1)
+    up = diff.where(diff > 0, 0.0)
+    dn = -diff.where(diff < 0, 0.0)
+    if prev_close is not None:
+        up, dn = up.iloc[1:], dn.iloc[1:]
+    if seed is not None:
+        # 첫 관측값 = 이전 ewm 상태 → 이후 재귀식이 전체 구간 계산과 동일
+        up = pd.concat([pd.Series([seed[0]]), up], ignore_index=True)
+        dn = pd.concat([pd.Series([seed[1]]), dn], ignore_index=True)
+    emaup = up.ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    emadn = dn.ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    if seed is not None:
+        emaup, emadn = emaup[1:], emadn[1:]
+    count = n_prev + np.arange(1, len(emaup) + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+    rsi = np.where(count < window, np.nan, rsi)
+    state = (float(emaup[-1]), float(emadn[-1])) if len(emaup) else seed
+    return rsi, state
+
+
+def extend_indicators(buf: pd.DataFrame, raw_new: pd.DataFrame, ind: tuple, rsi_seed: Optional[tuple], n_seen: int,
+                      fresh: bool = False):
+    """
+    buf(지표 포함, 과거 참조 창) 뒤에 raw_new를 이어 붙여 지표 계산 → (buf + 새 행, RSI 상태).
+    buf 행의 지표는 저장값 유지, RSI는 ewm 상태에서 이어서 계산 (전체 구간 1회 계산과 같은 값).
+    fresh=True: 시작 구간 → 전체 재계산 (bfill 등 add_indicators 규칙 그대로)
+    """
+    nb = len(buf)
+    work = pd.concat([buf[OHLCV], raw_new[OHLCV]], ignore_index=True) if nb else raw_new[OHLCV].reset_index(drop=True)
+    bb_window, bb_dev, cci_window, cci_signal = ind
+    out = ud.add_indicators(work, bb_window, bb_dev, cci_window, cci_signal)
+    if fresh:
+        rsi, seed = rsi_continue(work["close"].to_numpy(), None, None, 0)
+        out["RSI13"] = rsi
+        return out, seed
+    prev_close = float(buf["close"].iloc[-1]) if nb else None
+    rsi, seed = rsi_continue(raw_new["close"].to_numpy(), prev_close, rsi_seed, n_seen)
+    out.loc[nb:, "RSI13"] = rsi
+    if nb:
+        out.loc[:nb - 1, IND_COLS] = buf[IND_COLS].to_numpy()
+    return out, seed
+
+
+class StreamingBacktest:
+    """
+    cfg: strategy, rsi_mode, rsi_low, rsi_high, bb_cond, cci_mode, cci_over, cci_under, bottom_mode,
+         sec_cond, lookahead, threshold_pct, dup_mode(또는 dedup_mode), manual_supply_levels, maemul_n
+    feed(조각) → 이번 조각으로 확정된 결과 행, finish() → 남은 행.
+    start_time 이전 신호는 무시 (워밍업 봉만 공급할 때)
+    """
+
+    def __init__(self, cfg: dict, minutes_per_bar: int, bb_window=30, bb_dev=2.0, cci_window=14, cci_signal=9,
+                 start_time=None):
+        self.cfg = dict(cfg)
+        self.mpb = int(minutes_per_bar)
+        self.ind = (int(bb_window), float(bb_dev), int(cci_window), int(cci_signal))
+        self.L = int(self.cfg.get("lookahead", 10))
+        self.thr = float(self.cfg.get("threshold_pct", 1.0))
+        self.dedup_mode = self.cfg.get("dedup_mode", self.cfg.get("dup_mode", be.DEDUP_LABEL))
+        self.start_time = None if start_time is None else pd.Timestamp(start_time)
+        # 과거 참조 창: 지표 창, TGV 거래량 평균(20), 매물대 반등 prior_min(maemul_n) + 여유
+        self.back = max(self.ind[0], self.ind[2] + self.ind[3], 20, int(self.cfg.get("maemul_n", 50)) + 1,
+                        RSI_WINDOW) + 5
+        self.buf = pd.DataFrame(columns=OHLCV + IND_COLS)
+        self.g0 = 0            # buf 첫 행의 전체 인덱스
+        self.n_seen = 0        # 지금까지 받은 봉 수
+        self.rsi_seed = None   # (emaup, emadn)
+        self.start_sig = 0     # 다음에 평가할 첫 신호 (전체 인덱스)
+        self.lock_from = -1    # 중복 제거 잠금 (전체 인덱스)
+        self.emitted = set()   # 중복 포함 모드: 이미 내보낸 앵커 (start_sig 이후만 유지)
+        self.start_idx = None  # start_time에 해당하는 전체 인덱스
+
+    # --- 상태 저장 (작업 체크포인트용) ---
+    def state_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_state(cls, state: dict) -> "StreamingBacktest":
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        return obj
+
+    @property
+    def buffered_bars(self) -> int:
+        return len(self.buf)
+
+    # --- 지표 (버퍼 행은 저장값 유지, 새 행만 계산) ---
+    def _indicators(self, raw_new: pd.DataFrame) -> pd.DataFrame:
+        out, self.rsi_seed = extend_indicators(self.buf, raw_new, self.ind, self.rsi_seed, self.n_seen,
+                                               fresh=self.g0 == 0 and self.n_seen < self.back)
+        return out
+
+    # --- 평가 ---
+    def _step(self, final: bool) -> pd.DataFrame:
+        df = self.buf
+        n = len(df)
+        if n == 0:
+            return pd.DataFrame()
+        c = self.cfg
+        sec_cond, bb_cond = c.get("sec_cond", "없음"), c.get("bb_cond", "없음")
+        levels, maemul_n = c.get("manual_supply_levels"), int(c.get("maemul_n", 50))
+        sig = np.flatnonzero(be.signal_mask(
+            df, strategy=c.get("strategy", "없음"), rsi_mode=c.get("rsi_mode", "없음"),
+            rsi_low=c.get("rsi_low", 30), rsi_high=c.get("rsi_high", 70), bb_cond=bb_cond,
+            cci_mode=c.get("cci_mode", "없음"), cci_over=c.get("cci_over", 100.0),
+            cci_under=c.get("cci_under", -100.0), bottom_mode=c.get("bottom_mode", False), sec_cond=sec_cond,
+        ))
+        start_local = max(self.start_sig - self.g0, 0)
+        sig = sig[sig >= start_local]
+        arr = be.frame_arrays(df)
+        fo = be.ForwardOutcomes(arr["close"], self.L, times=arr["time"])
+        anchors, picked = be._pick_anchors(arr, sig, self.L, self.thr, self.dedup_mode, sec_cond, bb_cond,
+                                           levels, maemul_n, fo, start_sig=start_local,
+                                           lock_from=self.lock_from - self.g0 if self.lock_from >= 0 else -1)
+        first_open = n if final else be.first_open_signal(arr, sig, self.L, n, sec_cond, bb_cond, levels, maemul_n)
+        keep = picked < first_open
+        anchors = anchors[keep]
+        dedup = self.dedup_mode.startswith("중복 제거")
+        if not dedup and len(anchors):
+            anchors = np.array([a for a in anchors if a + self.g0 not in self.emitted], dtype=np.int64)
+        out = pd.DataFrame()
+        if len(anchors):
+            out = be._result_frame(fo, anchors, self.L, self.thr, self.mpb, arr=arr, bb_cond=bb_cond)
+            out["anchor_i"] += self.g0
+            out["end_i"] += self.g0
+            if dedup:
+                self.lock_from = int(out["end_i"].iloc[-1]) + 1
+            else:
+                self.emitted.update(out["anchor_i"].tolist())
+        self.start_sig = self.g0 + int(first_open)
+        self.emitted = {a for a in self.emitted if a >= self.start_sig}
+        # 버퍼 정리: 첫 미확정 신호 이전은 과거 참조 창만 남김
+        cut = max(int(first_open) - self.back, 0)
+        if cut > 0:
+            self.buf = self.buf.iloc[cut:].reset_index(drop=True)
+            self.g0 += cut
+        return out
+
+    def feed(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """새 캔들 조각 (time 오름차순, 이미 받은 시각 이후만 사용) → 이번에 확정된 결과 행"""
+        if raw is None or raw.empty:
+            return pd.DataFrame()
+        raw = raw[OHLCV].copy()
+        raw["time"] = pd.to_datetime(raw["time"])
+        raw = raw.sort_values("time").drop_duplicates(subset=["time"], keep="last")
+        if len(self.buf):
+            raw = raw[raw["time"] > self.buf["time"].iloc[-1]]
+        if raw.empty:
+            return pd.DataFrame()
+        self.buf = self._indicators(raw.reset_index(drop=True))
+        self.n_seen += len(raw)
+        if self.start_time is not None and self.start_idx is None:
+            pos = int(np.searchsorted(self.buf["time"].to_numpy(), np.datetime64(self.start_time), side="left"))
+            if pos < len(self.buf):
+                self.start_idx = self.g0 + pos
+            self.start_sig = max(self.start_sig, self.g0 + pos)
+        return self._step(final=False)
+
+    def finish(self) -> pd.DataFrame:
+        """스트림 종료: 남은 신호를 전체 구간 실행과 같은 규칙(끝에 걸린 신호 제외)으로 확정"""
+        return self._step(final=True)
+
+
+def run_stream(chunks: Iterable[pd.DataFrame], cfg: dict, minutes_per_bar: int, on_rows=None, **ind) -> pd.DataFrame:
+    """조각 iterable 전체 실행 → 결과 (on_rows(df)로 조각별 확정 행 스트리밍)"""
+    eng = StreamingBacktest(cfg, minutes_per_bar, **ind)
+    parts = []
+    for ch in chunks:
+        rows = eng.feed(ch)
+        if not rows.empty:
+            parts.append(rows)
+            if on_rows:
+                on_rows(rows)
+    rows = eng.finish()
+    if not rows.empty:
+        parts.append(rows)
+        if on_rows:
+            on_rows(rows)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
@@ -0,0 +1,570 @@
+# sweep_engine.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 조합 스캔 병렬 실행기
+# - OHLCV+지표 배열과 전방 경로 텐서를 shared memory에 1회 게시 → 워커 프로세스가 복사·재계산 없이 조회
+# - 조합(타임프레임 × N봉 × RSI × BB × 2차 조건)을 프로세스 풀에 분산
+# - 완료되는 순서대로 결과 스트리밍 (on_result 콜백)
+# - 조합별 결과 메모 (data_cache/sweep_memo): 같은 데이터는 재사용, 새 캔들은 증분 재계산
+# - 전체 마켓 모드: 마켓별 캔들은 스레드로 미리 로드, 조합은 한 프로세스 풀에서 평가, 상위 K만 유지
+# =============================================================
+import os
+import json
+import heapq
+import pickle
+import hashlib
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine as be
+from entry_gate import apply_gate
+from equity_curve import equity_curve, equity_stats
+from time_cube import calendar_filter
+from volume_rank import RollingRank, filter_signals
+
+SHARED_COLS = ["open", "high", "low", "close", "volume", "RSI13", "BB_up", "BB_low", "BB_mid", "CCI", "CCI_sig"]
+MEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache", "sweep_memo")
+# 조합 키에서 제외 (데이터/저장 위치 식별용 · 진입 제한 규칙은 메모된 결과 행에 나중에 적용)
+_MEMO_SKIP = {"memo_dir", "market", "indicator", "gate", "bootstrap", "equity"}
+# 조합별로 지정 가능한 연속 파라미터 (없으면 common 값 사용)
+COMBO_PARAMS = ("rsi_low", "rsi_high", "cci_over", "cci_under", "threshold_pct")
+
+
+# -----------------------------
+# shared memory 게시/연결
+# -----------------------------
+def publish_frame(df: pd.DataFrame, fo: Optional[be.ForwardOutcomes] = None):
+    """
+    지표 프레임을 (컬럼 × n) float64 블록 1개로 게시. (shm, spec) 반환
+    fo: 전방 경로 텐서(fwd_max/fwd_min, n × max_h)도 같은 블록 뒤에 게시 → 워커는 재계산 없이 연결만
+    """
+    cols = [c for c in SHARED_COLS if c in df.columns]
+    n = len(df)
+    h = fo.max_h if fo is not None else 0
+    rows = len(cols) + 1
+    nbytes = max((rows + 2 * h) * n * 8, 8)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    block = np.ndarray((rows, n), dtype=np.float64, buffer=shm.buf)
+    for k, c in enumerate(cols):
+        block[k] = df[c].to_numpy(dtype=np.float64)
+    # 마지막 행: time(int64 ns) 비트 그대로 보관
+    block[len(cols)].view(np.int64)[:] = pd.to_datetime(df["time"]).values.astype("datetime64[ns]").astype(np.int64)
+    if h:
+        fwd = np.ndarray((2, n, h), dtype=np.float64, buffer=shm.buf, offset=rows * n * 8)
+        fwd[0] = fo.fwd_max
+        fwd[1] = fo.fwd_min
+    return shm, {"name": shm.name, "cols": cols, "n": n, "max_h": h}
+
+
+def attach_frame(spec: dict):
+    """게시된 블록에 연결 → (shm, arr dict(뷰), DataFrame 뷰, ForwardOutcomes 뷰 또는 None)"""
+    # spawn 워커는 부모의 resource_tracker를 공유 → 해제(unlink)는 게시한 프로세스가 담당
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    cols, n, h = spec["cols"], spec["n"], spec.get("max_h", 0)
+    rows = len(cols) + 1
+    block = np.ndarray((rows, n), dtype=np.float64, buffer=shm.buf)
+    arr = {c: block[k] for k, c in enumerate(cols)}
+    arr["time"] = block[len(cols)].view(np.int64).view("datetime64[ns]")
+    df = pd.DataFrame({c: arr[c] for c in cols}, copy=False)
+    df.insert(0, "time", arr["time"])
+    fo = None
+    if h:
+        fwd = np.ndarray((2, n, h), dtype=np.float64, buffer=shm.buf, offset=rows * n * 8)
+        fo = be.ForwardOutcomes(arr["close"], h, times=arr["time"], fwd_max=fwd[0], fwd_min=fwd[1])
+    return shm, arr, df, fo
+
+
+# -----------------------------
+# 조합 결과 메모 (내용 주소 기반)
+# -----------------------------
+class SweepMemo:
+    """
+    키 = hash(종목, 타임프레임, 지표 파라미터, 조합, 공통 설정) → 최신 결과 1개 보관.
+    항목: 데이터 지문(fp), 확정 캔들 수(n_closed)와 그 구간 지문(prefix_fp),
+    첫 미확정 신호(first_open), 결과 행(rows)/행별 신호 인덱스(sig), 통계(stats)
+    """
+
+    def __init__(self, root: str = MEMO_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def lineage(tf: str, combo: dict, common: dict) -> str:
+        payload = {
+            "market": common.get("market", ""),
+            "tf": tf,
+            "indicator": common.get("indicator", {}),
+            "combo": {k: v for k, v in combo.items() if k != "tf" and not k.startswith("_")},
+            "common": {k: v for k, v in common.items() if k not in _MEMO_SKIP},
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def load(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def save(self, key: str, entry: dict):
+        tmp = self._path(key) + f".{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _prefix_fp(state: dict, n: int) -> str:
+    cache = state.setdefault("prefix_fps", {})
+    if n not in cache:
+        cache[n] = be.arrays_fingerprint(state["arr"], n)
+    return cache[n]
+
+
+# -----------------------------
+# 워커 측 상태 (프로세스당 1회 초기화)
+# -----------------------------
+_W: Dict[str, dict] = {}  # spawn 워커 프로세스 전용 — 부모(Streamlit 서버)는 실행별 지역 dict 사용
+
+
+def _make_state(arr: dict, df: pd.DataFrame, max_h: int, memo_dir: Optional[str] = None,
+                fo: Optional[be.ForwardOutcomes] = None) -> dict:
+    if fo is None or fo.max_h < max_h:
+        fo = be.ForwardOutcomes(arr["close"], max_h, times=arr["time"])
+    state = {"arr": arr, "df": df, "masks": {}, "fo": fo}
+    if memo_dir:
+        state["memo"] = SweepMemo(memo_dir)
+        state["fp"] = be.arrays_fingerprint(arr)
+    return state
+
+
+def _init_worker(specs: Dict[str, dict], max_h: int, memo_dir: Optional[str] = None):
+    for tf, spec in specs.items():
+        shm, arr, df, fo = attach_frame(spec)
+        _W[tf] = _make_state(arr, df, max_h, memo_dir, fo)
+        _W[tf]["shm"] = shm
+
+
+def evaluate_combo(state: dict, combo: dict, common: dict) -> dict:
+    """조합 1개 평가 → summarize() 통계 (COMBO_PARAMS는 조합 값이 공통 설정보다 우선)"""
+    prm = dict(common)
+    prm.update({k: combo[k] for k in COMBO_PARAMS if k in combo})
+    key = (combo.get("strategy", "없음"), combo["rsi_mode"], combo["bb_cond"], combo.get("sec_cond", "없음"))
+    mask_key = key[:3] + (key[3] != "없음",) + tuple(prm.get(k) for k in ("rsi_low", "rsi_high", "cci_over", "cci_under"))
+    sig = state["masks"].get(mask_key)
+    if sig is None:
+        sig = np.flatnonzero(be.signal_mask(
+            state["df"], strategy=key[0], rsi_mode=key[1], rsi_low=prm.get("rsi_low", 30),
+            rsi_high=prm.get("rsi_high", 70), bb_cond=key[2], cci_mode=prm.get("cci_mode", "없음"),
+            cci_over=prm.get("cci_over", 100.0), cci_under=prm.get("cci_under", -100.0),
+            sec_cond=key[3]
+        ))
+        state["masks"][mask_key] = sig
+    vf = prm.get("vol_filter")
+    if vf:
+        # 거래량 상위 필터: 프레임별 순위 구조 1회 구성, 창 크기별 백분위는 캐시
+        rank = state.get("vol_rank")
+        if rank is None:
+            rank = state["vol_rank"] = RollingRank(state["arr"]["volume"])
+        sig = filter_signals(sig, None, int(vf.get("window", 96)), float(vf.get("top_pct", 30.0)), rank=rank)
+    if prm.get("span") is not None:
+        # 봉 구간 [lo, hi) 안의 신호만 (워크포워드 학습/검증 구간 — 지표/결과는 전체 배열 기준)
+        lo, hi = prm["span"]
+        sig = sig[(sig >= int(lo)) & (sig < int(hi))]
+    if prm.get("calendar") is not None:
+        # 달력 마스크(요일 × 시): 허용 칸의 신호만 평가
+        sig = sig[calendar_filter(state["arr"]["time"][sig], prm["calendar"])]
+    L, thr, mpb = int(combo["lookahead"]), prm.get("threshold_pct", 1.0), combo["minutes_per_bar"]
+    sim_kw = dict(dedup_mode=prm.get("dedup_mode", be.DEDUP_LABEL), sec_cond=key[3], bb_cond=key[2],
+                  manual_supply_levels=prm.get("manual_supply_levels"), maemul_n=prm.get("maemul_n", 50))
+    memo = state.get("memo")
+    gate = prm.get("gate")
+    boot = bool(prm.get("bootstrap"))  # 통계에 신호별 수익률("_rets") 포함 → bootstrap_stats 신뢰구간용
+    eq = bool(prm.get("equity"))       # 자산 곡선 통계(EQUITY_KEYS) 추가
+    arrays = boot or eq
+
+    def _finish(stats):
+        if eq:
+            curve = equity_curve(state["arr"]["close"], stats["_anchor_i"], stats["_end_i"], stats["_rets"])
+            stats.update(equity_stats(curve, mpb))
+        for k in ("_anchor_i", "_end_i") + (() if boot else ("_rets",)):
+            stats.pop(k, None)
+        return stats
+
+    if memo is None:
+        return _finish(be.simulate_stats(state["arr"], sig, L, thr, fo=state["fo"], gate=gate,
+                                         with_returns=arrays, **sim_kw))
+
+    # ✅ 메모: 같은 데이터 → 그대로 / 확정 구간이 같으면 미확정 신호부터만 재계산
+    arr = state["arr"]
+    n = len(arr["close"])
+    mkey = memo.lineage(combo["tf"], combo, common)
+    entry = memo.load(mkey)
+    if entry is not None and entry.get("fp") == state["fp"]:
+        if not (gate or arrays):
+            return entry["stats"]
+        return _finish(be.summarize(apply_gate(entry["rows"], gate) if gate else entry["rows"], with_returns=arrays))
+    if entry is not None and entry["n_closed"] <= n and _prefix_fp(state, entry["n_closed"]) == entry["prefix_fp"]:
+        res, res_sig = be.extend_simulation(arr, sig, entry["rows"], entry["sig"], entry["first_open"],
+                                            L, thr, mpb, fo=state["fo"], **sim_kw)
+    else:
+        res, res_sig = be.simulate_arrays(arr, sig, L, thr, mpb, fo=state["fo"], return_sig=True, **sim_kw)
+
+    # 마지막 봉은 진행 중일 수 있음 → 확정 구간 = 앞 n-1봉
+    n_closed = max(n - 1, 0)
+    stats = be.summarize(res)
+    memo.save(mkey, {
+        "fp": state["fp"], "n_closed": n_closed, "prefix_fp": _prefix_fp(state, n_closed),
+        "first_open": be.first_open_signal(arr, sig, L, n_closed, key[3], key[2],
+                                           sim_kw["manual_supply_levels"], sim_kw["maemul_n"]),
+        "rows": res, "sig": res_sig, "stats": stats,
+    })
+    # 진입 제한 규칙은 판정된 행에만 적용 (메모는 규칙 적용 전 결과 → 규칙만 바꾸면 재판정 없음)
+    if not (gate or arrays):
+        return stats
+    return _finish(be.summarize(apply_gate(res, gate) if gate else res, with_returns=arrays))
+
+
+def _run_batch(batch: List[dict], common: dict):
+    out = []
+    for combo in batch:
+        out.append((combo["_i"], evaluate_combo(_W[combo.get("_frame", combo["tf"])], combo, common)))
+    return out
+
+
+_W_KEEP = 8  # 전체 마켓 모드: 워커가 붙잡고 있는 프레임 수 상한
+
+
+def _run_frames_batch(specs: Dict[str, dict], max_h: int, memo_dir: Optional[str], batch: List[dict], common: dict):
+    """작업마다 필요한 프레임만 연결 (이미 연결된 프레임은 재사용, 오래된 것부터 해제)"""
+    for key, spec in specs.items():
+        if key not in _W:
+            shm, arr, df, fo = attach_frame(spec)
+            _W[key] = _make_state(arr, df, max_h, memo_dir, fo)
+            _W[key]["shm"] = shm
+    for key in [k for k in _W if k not in specs][:max(len(_W) - _W_KEEP, 0)]:
+        state = _W.pop(key)
+        state.pop("df", None)
+        state.pop("arr", None)
+        state.pop("fo", None)
+        try:
+            state["shm"].close()
+        except Exception:
+            pass
+    return _run_batch(batch, common)
+
+
+# -----------------------------
+# 부모 측 실행기
+# -----------------------------
+def _forward_outcomes(df: pd.DataFrame, max_h: int, market: str = "", tf: str = "") -> be.ForwardOutcomes:
+    """프레임별 전방 경로 텐서 (부모에서 1회) — market 지정 시 (종목, 분봉, 데이터 버전) 디스크 캐시 경유"""
+    if market:
+        return be.load_forward_outcomes(df, max_h, market, tf)
+    return be.ForwardOutcomes(df["close"].to_numpy(dtype=np.float64), max_h, times=pd.to_datetime(df["time"]).values)
+
+
+def run_sweep_parallel(frames: Dict[str, pd.DataFrame], combos: List[dict], common: dict,
+                       max_workers: Optional[int] = None, batch_size: int = 8,
+                       on_result: Optional[Callable[[dict, dict], None]] = None) -> List[dict]:
+    """
+    frames: {프레임 키: 지표 프레임}, combos: [{"tf"(=프레임 키), "lookahead", "rsi_mode", "bb_cond", "sec_cond",
+    "minutes_per_bar"}, ...]. 반환: combos 순서대로 (조합 + 통계) dict 리스트.
+    BB 승수 등 지표 파라미터별로는 프레임 키를 나눠서 전달 (예: "15분|2.5").
+    on_result(combo, stats)는 완료 순서대로 호출.
+    common["memo_dir"]가 있으면 조합별 결과 메모 사용 (common["market"], common["indicator"]로 구분).
+    """
+    if not combos:
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+    max_h = max(int(c["lookahead"]) for c in combos)
+    memo_dir = common.get("memo_dir")
+    # 전방 경로 텐서 디스크 캐시는 메모 사용 실행(전체 구간 스캔)만 — 부분 구간/폴드 실행은 메모리에서 계산
+    cache_market = common.get("market", "") if memo_dir else ""
+    combos = [dict(c, _i=i) for i, c in enumerate(combos)]
+    results: List[Optional[dict]] = [None] * len(combos)
+
+    def _emit(i, stats):
+        row = {k: v for k, v in combos[i].items() if k != "_i"}
+        row.update(stats)
+        results[i] = row
+        if on_result:
+            on_result(combos[i], stats)
+
+    # 단일 코어: 풀/공유 메모리 없이 같은 경로로 처리 (상태는 이 호출 지역 — _W는 워커 프로세스 전용)
+    if max_workers <= 1:
+        states = {}
+        for tf, df in frames.items():
+            df = df.reset_index(drop=True)
+            states[tf] = _make_state(be.frame_arrays(df), df, max_h, memo_dir,
+                                     _forward_outcomes(df, max_h, cache_market, tf))
+        for c in combos:
+            _emit(c["_i"], evaluate_combo(states[c["tf"]], c, common))
+        return results
+
+    shms, specs = [], {}
+    try:
+        for tf, df in frames.items():
+            df = df.reset_index(drop=True)
+            shm, spec = publish_frame(df, _forward_outcomes(df, max_h, cache_market, tf))
+            shms.append(shm)
+            specs[tf] = spec
+        # 같은 (타임프레임, 마스크) 조합을 한 배치로 묶어 워커 캐시 적중률 ↑
+        ordered = sorted(combos, key=lambda c: (c["tf"], c.get("strategy", ""), c["rsi_mode"], c["bb_cond"],
+                                                c.get("sec_cond", ""), c["lookahead"]))
+        batches = [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(specs, max_h, memo_dir)) as pool:
+            futs = [pool.submit(_run_batch, b, common) for b in batches]
+            for fut in as_completed(futs):
+                for i, stats in fut.result():
+                    _emit(i, stats)
+    finally:
+        for shm in shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+    return results
+
+
+# -----------------------------
+# 단계적 탈락 (successive halving)
+# -----------------------------
+def halving_score(stats: dict) -> tuple:
+    """부분 구간 순위 점수: (보정 승률, 합계수익률, 신호수) — 신호가 적을수록 승률을 50%쪽으로 당김"""
+    total, succ = int(stats.get("신호수", 0)), int(stats.get("성공", 0))
+    return ((succ + 1) / (total + 2), float(stats.get("합계수익률(%)", 0.0)), total)
+
+
+def run_sweep_halving(frames: Dict[str, pd.DataFrame], combos: List[dict], common: dict,
+                      eta: int = 3, min_frac: float = 1 / 9, min_keep: int = 10,
+                      max_workers: Optional[int] = None,
+                      on_rung: Optional[Callable[[int, int, float, int], None]] = None,
+                      on_result: Optional[Callable[[dict, dict], None]] = None) -> List[dict]:
+    """
+    최근 구간(min_frac)에서 전체 조합 평가 → 상위 1/eta만 남기고 구간을 eta배씩 늘려 재평가 → 전체 구간.
+    반환: 마지막(전체 구간)까지 살아남은 조합만 run_sweep_parallel()과 같은 형식으로 (combos 순서).
+    on_rung(단계, 전체 단계 수, 구간 비율, 남은 조합 수)
+    """
+    if not combos:
+        return []
+    fracs = [1.0]
+    while fracs[0] / eta >= min_frac:
+        fracs.insert(0, fracs[0] / eta)
+    alive = [dict(c, _rank=i) for i, c in enumerate(combos)]
+    # 부분 구간 결과는 데이터 지문이 달라 메모를 덮어쓰므로 전체 구간에서만 메모 사용 (부트스트랩/자산 곡선도 최종 단계만)
+    partial_common = {k: v for k, v in common.items() if k not in ("memo_dir", "bootstrap", "equity")}
+
+    for r, frac in enumerate(fracs):
+        if on_rung:
+            on_rung(r, len(fracs), frac, len(alive))
+        last = r == len(fracs) - 1
+        if last:
+            sub = frames
+        else:
+            sub = {tf: df.tail(max(int(np.ceil(len(df) * frac)), 1)).reset_index(drop=True)
+                   for tf, df in frames.items()}
+        rows = run_sweep_parallel(sub, [{k: v for k, v in c.items() if k != "_rank"} for c in alive],
+                                  common if last else partial_common, max_workers=max_workers,
+                                  on_result=on_result if last else None)
+        if last:
+            ranked = sorted(zip(alive, rows), key=lambda t: t[0]["_rank"])
+            return [row for _, row in ranked]
+        keep = max(int(np.ceil(len(alive) / eta)), min(min_keep, len(alive)))
+        order = sorted(range(len(alive)), key=lambda i: halving_score(rows[i]), reverse=True)[:keep]
+        alive = [alive[i] for i in sorted(order)]
+    return []
+
+
+# -----------------------------
+# 전체 마켓 리더보드
+# -----------------------------
+LEADERBOARD_KEYS = {
+    "승률": lambda r: (float(r.get("승률(%)", 0.0)), float(r.get("합계수익률(%)", 0.0)), int(r.get("신호수", 0))),
+    "합계수익률": lambda r: (float(r.get("합계수익률(%)", 0.0)), float(r.get("승률(%)", 0.0)), int(r.get("신호수", 0))),
+    "평균수익률": lambda r: (float(r.get("평균수익률(%)", 0.0)), float(r.get("승률(%)", 0.0)), int(r.get("신호수", 0))),
+}
+
+
+class Leaderboard:
+    """
+    스트리밍 상위 K (최소 힙) — 전체 조합 결과를 보관하지 않음.
+    신호수 min_signals 미만 조합은 제외 (신호 1~2개짜리 100% 승률 방지). 마켓별 1위도 함께 유지
+    """
+
+    def __init__(self, k: int = 20, sort_by: str = "승률", min_signals: int = 5):
+        self.k = max(int(k), 1)
+        self.key = LEADERBOARD_KEYS[sort_by]
+        self.min_signals = int(min_signals)
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self.best_by_market: Dict[str, dict] = {}
+        self.seen = 0
+
+    def push(self, row: dict) -> bool:
+        """row 1개 반영 → 상위 K에 들어갔으면 True"""
+        self.seen += 1
+        if int(row.get("신호수", 0)) < self.min_signals:
+            return False
+        score = self.key(row)
+        mk = row.get("market", "")
+        cur = self.best_by_market.get(mk)
+        if cur is None or score > self.key(cur):
+            self.best_by_market[mk] = row
+        self._seq += 1
+        item = (score, -self._seq, row)  # 동점이면 먼저 들어온 행 우선
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+            return True
+        if item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    def rows(self) -> List[dict]:
+        return [r for _, _, r in sorted(self._heap, key=lambda t: t[:2], reverse=True)]
+
+    def market_rows(self) -> List[dict]:
+        return sorted(self.best_by_market.values(), key=self.key, reverse=True)
+
+
+def _iter_loaded(markets: List[str], load_frames: Callable[[str], Dict[str, pd.DataFrame]], loaders: int):
+    """마켓별 프레임을 스레드 loaders개로 미리 로드 (입력 순서대로 반환, 앞서 로드하는 수 = loaders)"""
+    loaders = max(int(loaders), 1)
+    with ThreadPoolExecutor(max_workers=loaders) as tpool:
+        futs = [(m, tpool.submit(load_frames, m)) for m in markets[:loaders]]
+        nxt = len(futs)
+        while futs:
+            market, fut = futs.pop(0)
+            if nxt < len(markets):
+                futs.append((markets[nxt], tpool.submit(load_frames, markets[nxt])))
+                nxt += 1
+            try:
+                frames = fut.result()
+            except Exception as e:
+                yield market, None, e
+                continue
+            yield market, frames, None
+
+
+def run_sweep_markets(markets: List[str], load_frames: Callable[[str], Dict[str, pd.DataFrame]],
+                      combos: List[dict], common: dict, top_k: int = 20, sort_by: str = "승률",
+                      min_signals: int = 5, max_workers: Optional[int] = None, loaders: int = 4,
+                      batch_size: int = 8,
+                      on_market: Optional[Callable[[str, int, int, Optional[Exception]], None]] = None,
+                      on_result: Optional[Callable[[str, dict, dict], None]] = None) -> Leaderboard:
+    """
+    같은 조합 격자를 여러 마켓에 실행 → 상위 K 리더보드.
+    load_frames(market) → {프레임 키: 지표 프레임} (스레드에서 호출), combos는 run_sweep_parallel()과 같은 형식.
+    on_market(마켓, 완료 마켓 수, 전체 마켓 수, 로드 예외), on_result(마켓, 조합, 통계)
+    """
+    board = Leaderboard(top_k, sort_by, min_signals)
+    if not combos or not markets:
+        return board
+    max_workers = max_workers or os.cpu_count() or 1
+    max_h = max(int(c["lookahead"]) for c in combos)
+    memo_dir = common.get("memo_dir")
+    combos = [dict(c, _i=i) for i, c in enumerate(combos)]
+    n_done = [0]
+
+    def _emit(market: str, i: int, stats: dict):
+        row = {"market": market}
+        row.update({k: v for k, v in combos[i].items() if not k.startswith("_")})
+        row.update(stats)
+        board.push(row)
+        if on_result:
+            on_result(market, combos[i], stats)
+
+    def _market_done(market: str, err: Optional[Exception] = None):
+        n_done[0] += 1
+        if on_market:
+            on_market(market, n_done[0], len(markets), err)
+
+    # 단일 코어: 풀/공유 메모리 없이 같은 경로로 처리 (로드는 계속 앞서 진행)
+    if max_workers <= 1:
+        for market, frames, err in _iter_loaded(markets, load_frames, loaders):
+            if err is not None or not frames:
+                _market_done(market, err)
+                continue
+            common_m = dict(common, market=market)
+            states = {tf: _make_state(be.frame_arrays(df.reset_index(drop=True)), df.reset_index(drop=True),
+                                      max_h, memo_dir) for tf, df in frames.items()}
+            for c in combos:
+                if c["tf"] in states:
+                    _emit(market, c["_i"], evaluate_combo(states[c["tf"]], c, common_m))
+            _market_done(market)
+        return board
+
+    live: Dict[str, dict] = {}    # 마켓 → 게시한 shm, 남은 배치 수
+    pending: Dict = {}            # future → 마켓
+
+    def _release(market: str):
+        for shm in live.pop(market)["shms"]:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+
+    def _drain(block_until: int):
+        # 진행 중 마켓이 block_until개 이하가 될 때까지 완료 배치 처리
+        while pending and len(live) > block_until:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                market = pending.pop(fut)
+                for i, stats in fut.result():
+                    _emit(market, i, stats)
+                live[market]["left"] -= 1
+                if live[market]["left"] == 0:
+                    _release(market)
+                    _market_done(market)
+
+    ctx = mp.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            for market, frames, err in _iter_loaded(markets, load_frames, loaders):
+                if err is not None or not frames:
+                    _market_done(market, err)
+                    continue
+                entry = {"shms": [], "left": 0}
+                live[market] = entry
+                specs = {}
+                for tf, df in frames.items():
+                    # 전방 경로 텐서도 부모에서 1회 계산해 같은 블록에 게시 (마켓별 디스크 캐시는 사용 안 함)
+                    df = df.reset_index(drop=True)
+                    shm, spec = publish_frame(df, _forward_outcomes(df, max_h))
+                    entry["shms"].append(shm)
+                    specs[f"{market}|{tf}"] = spec
+                todo = sorted((dict(c, _frame=f"{market}|{c['tf']}") for c in combos if c["tf"] in frames),
+                              key=lambda c: (c["tf"], c.get("strategy", ""), c["rsi_mode"], c["bb_cond"],
+                                             c.get("sec_cond", ""), c["lookahead"]))
+                common_m = dict(common, market=market)
+                for b in range(0, len(todo), batch_size):
+                    fut = pool.submit(_run_frames_batch, specs, max_h, memo_dir, todo[b:b + batch_size], common_m)
+                    pending[fut] = market
+                    entry["left"] += 1
+                if entry["left"] == 0:
+                    _release(market)
+                    _market_done(market)
+                # backpressure: 공유 메모리에 올라간 마켓 수 제한
+                _drain(max_workers)
+            _drain(0)
+    finally:
+        for market in list(live):
+            _release(market)
+    return board
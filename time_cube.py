@@ -0,0 +1,124 @@
+# time_cube.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 시간대 × 요일 성과 큐브 (shared_notes.md 시간대/요일 효과)
+# - (요일 7 × 시 24 × 결과 3) 건수 + 수익률 합계를 결과가 나오는 대로 누적 (add)
+# - 요일/시간 선택 집계는 큐브 합산만으로 즉시 계산 (결과 행 재조회 없음)
+# - 달력 마스크(요일 × 시 bool)로 신호 필터 — simulate/조합 스캔 공용
+# =============================================================
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = ("월", "화", "수", "목", "금", "토", "일")
+RESULTS = ("성공", "중립", "실패")
+
+
+def _weekday_hour(times):
+    t = pd.DatetimeIndex(pd.to_datetime(np.asarray(times)))
+    return t.weekday.to_numpy(), t.hour.to_numpy()
+
+
+class TimeCube:
+    """counts[요일, 시, 결과], ret_sum[요일, 시] (최종수익률 % 합계)"""
+
+    def __init__(self, counts: Optional[np.ndarray] = None, ret_sum: Optional[np.ndarray] = None):
+        self.counts = np.zeros((7, 24, 3), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.ret_sum = np.zeros((7, 24)) if ret_sum is None else np.asarray(ret_sum, dtype=np.float64)
+
+    # --- 누적 ---
+    def add(self, times, results, rets) -> "TimeCube":
+        wd, hr = _weekday_hour(times)
+        if len(wd) == 0:
+            return self
+        r = pd.Categorical(np.asarray(results), categories=RESULTS).codes
+        ok = r >= 0
+        np.add.at(self.counts, (wd[ok], hr[ok], r[ok]), 1)
+        np.add.at(self.ret_sum, (wd[ok], hr[ok]), np.asarray(rets, dtype=np.float64)[ok])
+        return self
+
+    def add_frame(self, res: pd.DataFrame) -> "TimeCube":
+        """simulate 결과 테이블 (신호시간/결과/최종수익률(%))"""
+        if res is None or res.empty:
+            return self
+        return self.add(res["신호시간"].values, res["결과"].values, res["최종수익률(%)"].values)
+
+    def merge(self, other: "TimeCube") -> "TimeCube":
+        self.counts += other.counts
+        self.ret_sum += other.ret_sum
+        return self
+
+    def state_dict(self) -> dict:
+        return {"counts": self.counts.copy(), "ret_sum": self.ret_sum.copy()}
+
+    @classmethod
+    def from_state(cls, state: Optional[dict]) -> "TimeCube":
+        return cls() if not state else cls(state["counts"], state["ret_sum"])
+
+    @classmethod
+    def from_frame(cls, res: pd.DataFrame) -> "TimeCube":
+        return cls().add_frame(res)
+
+    # --- 조회 ---
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def cells(self) -> dict:
+        """칸별 (7×24) 신호수/성공/실패/승률/평균·합계 수익률"""
+        n = self.counts.sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "신호수": n,
+                "성공": self.counts[..., 0],
+                "실패": self.counts[..., 2],
+                "승률(%)": np.where(n > 0, self.counts[..., 0] / n * 100.0, np.nan),
+                "평균수익률(%)": np.where(n > 0, self.ret_sum / n, np.nan),
+                "합계수익률(%)": self.ret_sum,
+            }
+
+    def table(self, metric: str = "승률(%)") -> pd.DataFrame:
+        """시(행) × 요일(열) 표"""
+        v = self.cells()[metric]
+        return pd.DataFrame(v.T, index=[f"{h:02d}시" for h in range(24)], columns=list(WEEKDAYS))
+
+    def slice(self, weekdays: Optional[Iterable[int]] = None, hours: Optional[Iterable[int]] = None) -> dict:
+        """선택한 요일 × 시간 합산 (summarize()와 같은 키)"""
+        sel = calendar_cells(weekdays, hours)
+        c = self.counts[sel].sum(axis=0)
+        total = int(c.sum())
+        s = float(self.ret_sum[sel].sum())
+        return {
+            "신호수": total, "성공": int(c[0]), "중립": int(c[1]), "실패": int(c[2]),
+            "승률(%)": c[0] / total * 100.0 if total else 0.0,
+            "평균수익률(%)": s / total if total else 0.0,
+            "합계수익률(%)": s,
+        }
+
+    def mask(self, min_count: int = 5, min_winrate: Optional[float] = None,
+             min_avg_ret: Optional[float] = None) -> np.ndarray:
+        """조건을 만족하는 칸 = True 인 달력 마스크 (표본 min_count 미만 칸은 제외)"""
+        cell = self.cells()
+        m = cell["신호수"] >= int(min_count)
+        if min_winrate is not None:
+            m &= np.nan_to_num(cell["승률(%)"], nan=-1.0) >= float(min_winrate)
+        if min_avg_ret is not None:
+            m &= np.nan_to_num(cell["평균수익률(%)"], nan=-np.inf) >= float(min_avg_ret)
+        return m
+
+
+def calendar_cells(weekdays: Optional[Iterable[int]] = None, hours: Optional[Iterable[int]] = None) -> np.ndarray:
+    """요일(0=월) × 시 선택 → (7, 24) bool. None이면 전체"""
+    w = np.zeros(7, dtype=bool)
+    h = np.zeros(24, dtype=bool)
+    w[list(range(7)) if weekdays is None else [int(x) for x in weekdays]] = True
+    h[list(range(24)) if hours is None else [int(x) for x in hours]] = True
+    return w[:, None] & h[None, :]
+
+
+def calendar_filter(times, cells) -> np.ndarray:
+    """시각 배열 → 달력 마스크(7×24, list 가능)에 해당하는지 bool"""
+    cells = np.asarray(cells, dtype=bool).reshape(7, 24)
+    wd, hr = _weekday_hour(times)
+    return cells[wd, hr] if len(wd) else np.zeros(0, dtype=bool)
@@ -0,0 +1,161 @@
+# time_grid.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 고정 간격 시간 격자 (시각 → 봉 위치 O(1) 조회)
+# - 업비트는 체결 없는 봉을 생략 → 프레임 인덱스 ≠ 시간 격자
+# - 격자 칸 = (시각 - 기준 시각) // 봉 길이, 칸별 봉 위치 배열 (빈 칸 = -1)
+#   조회는 정수 나눗셈 + 배열 인덱싱 (신호마다 선형 검색/이진 검색 없음)
+# - 빈 봉 명시 (missing) + 선택적 채우기 (reindex: 직전 종가로 OHLC, 거래량 0)
+# - 차트 신호 마커 / 1분봉 봉내 판정 / 프레임 간 시각 조회 공용
+# =============================================================
+import numpy as np
+import pandas as pd
+
+MISSING_COL = "빈봉"
+_FLOW_COLS = ("volume", "value")  # 빈 봉 = 체결 없음 → 0
+
+
+def _ns(times) -> np.ndarray:
+    t = np.asarray(times)
+    if t.dtype.kind != "M":
+        t = np.asarray(pd.to_datetime(t))
+    return t.astype("datetime64[ns]").view(np.int64)
+
+
+class TimeGrid:
+    """
+    정렬된 봉 시각 + 봉 길이(분) → 격자 칸별 봉 위치.
+    격자에 맞지 않는 시각은 속한 칸(내림)으로 배치 (같은 칸에 여러 봉이면 마지막 봉)
+    """
+
+    def __init__(self, times, minutes_per_bar: int, origin=None):
+        t = _ns(times)
+        self.step = max(int(minutes_per_bar), 1) * 60 * 10**9
+        self.origin = int(_ns([origin])[0]) if origin is not None else (int(t[0]) if len(t) else 0)
+        self.n_bars = len(t)
+        slot, rem = np.divmod(t - self.origin, self.step)
+        size = int(slot.max()) + 1 if len(t) else 0
+        self.pos = np.full(size, -1, dtype=np.int64)
+        self.exact = np.zeros(size, dtype=bool)
+        self.times = t
+        # 모든 봉이 격자 시각에 정확히 1개씩 (정렬 · 중복 칸 없음) → 칸 조회 = 이진 검색과 같은 결과
+        self.aligned = bool(len(t) == 0 or (slot[0] >= 0 and not rem.any() and (np.diff(slot) > 0).all()))
+        if self.aligned:
+            self.pos[slot] = np.arange(len(t))
+            self.exact[slot] = True
+        else:
+            keep = slot >= 0
+            self.pos[slot[keep]] = np.flatnonzero(keep)
+            self.exact[slot[keep]] = rem[keep] == 0
+        self._ffill = None
+        self._bfill = None
+
+    def __len__(self):
+        return len(self.pos)
+
+    # --- 격자 정보 ---
+    @property
+    def missing(self) -> np.ndarray:
+        """빈 칸 여부 (격자 길이 bool)"""
+        return self.pos < 0
+
+    @property
+    def n_missing(self) -> int:
+        return int(self.missing.sum())
+
+    def grid_times(self) -> np.ndarray:
+        return (self.origin + np.arange(len(self.pos), dtype=np.int64) * self.step).astype("datetime64[ns]")
+
+    def slots(self, times) -> np.ndarray:
+        """시각 → 격자 칸 (범위 밖 포함, 정수)"""
+        return (_ns(times) - self.origin) // self.step
+
+    def _fill_maps(self):
+        if self._ffill is None:
+            idx = np.where(self.pos >= 0, np.arange(len(self.pos)), -1)
+            self._ffill = np.maximum.accumulate(idx) if len(idx) else idx
+            rev = np.where(self.pos >= 0, np.arange(len(self.pos)), len(self.pos))[::-1]
+            self._bfill = np.minimum.accumulate(rev)[::-1] if len(rev) else rev
+        return self._ffill, self._bfill
+
+    # --- 조회 ---
+    def locate(self, times, mode: str = "exact") -> np.ndarray:
+        """
+        시각 배열 → 봉 위치 (없으면 -1).
+        mode: "exact" 봉 시각과 정확히 일치 / "floor" 시각이 속한 칸의 봉 /
+              "ffill" 시각 이전 가장 최근 봉 / "bfill" 시각 이후 첫 봉 (칸 경계 기준)
+        """
+        t = _ns(times)
+        rel = t - self.origin
+        s = rel // self.step
+        n = len(self.pos)
+        out = np.full(len(t), -1, dtype=np.int64)
+        if n == 0 or len(t) == 0:
+            return out
+        if mode == "bfill":
+            s = s + (rel % self.step != 0)  # 칸 중간 시각 → 다음 칸부터
+            _, bf = self._fill_maps()
+            ok = s < n
+            g = bf[np.clip(s, 0, n - 1)]
+            g = np.where(ok, g, n)
+            hit = g < n
+            out[hit] = self.pos[g[hit]]
+            return out
+        inside = (s >= 0) & (s < n)
+        if mode == "ffill":
+            ff, _ = self._fill_maps()
+            g = np.where(s >= n, ff[-1], ff[np.clip(s, 0, n - 1)])
+            g = np.where(s < 0, -1, g)
+            hit = g >= 0
+            out[hit] = self.pos[g[hit]]
+            return out
+        p = np.where(inside, self.pos[np.clip(s, 0, n - 1)], -1)
+        if mode == "exact":
+            p = np.where(inside & (rel % self.step == 0) & self.exact[np.clip(s, 0, n - 1)], p, -1)
+        return p
+
+    def span(self, t_start, t_end) -> tuple:
+        """시각 구간 [t_start, t_end) 배열 → 봉 위치 구간 [lo, hi) 배열 (searchsorted와 같은 결과)"""
+        if not self.aligned:
+            return (np.searchsorted(self.times, _ns(t_start), "left"),
+                    np.searchsorted(self.times, _ns(t_end), "left"))
+        lo = self.locate(t_start, "bfill")
+        hi = self.locate(t_end, "bfill")
+        lo = np.where(lo < 0, self.n_bars, lo)
+        hi = np.where(hi < 0, self.n_bars, hi)
+        return lo, hi
+
+    # --- 빈 봉 채우기 ---
+    def reindex(self, df: pd.DataFrame, ffill: bool = True) -> pd.DataFrame:
+        """
+        격자 전체 칸으로 확장한 캔들 프레임 (MISSING_COL = 빈 봉 표시).
+        ffill: 빈 봉 OHLC = 직전 종가, 거래량 0 (False면 NaN 유지)
+        """
+        if df.empty:
+            return df.assign(**{MISSING_COL: np.zeros(0, dtype=bool)})
+        miss = self.missing
+        ff, bf = self._fill_maps()
+        take = self.pos[np.where(ff >= 0, ff, bf)]  # 빈 칸 = 직전 봉 행 (선두 빈 칸은 다음 봉)
+        out = df.iloc[take].reset_index(drop=True)
+        out["time"] = self.grid_times()
+        out[MISSING_COL] = miss
+        if not miss.any():
+            return out
+        if ffill:
+            for c in ("open", "high", "low"):
+                if c in out.columns:
+                    out.loc[miss, c] = out.loc[miss, "close"]
+            for c in _FLOW_COLS:
+                if c in out.columns:
+                    out.loc[miss, c] = 0.0
+        else:
+            cols = [c for c in out.columns if c not in ("time", MISSING_COL)]
+            out.loc[miss, cols] = np.nan
+        return out
+
+
+def fill_gaps(df: pd.DataFrame, minutes_per_bar: int, ffill: bool = True) -> pd.DataFrame:
+    """캔들 프레임 → 빈 봉을 채운 고정 간격 프레임 (MISSING_COL 추가)"""
+    if df is None or df.empty:
+        return df
+    return TimeGrid(df["time"], minutes_per_bar).reindex(df, ffill=ffill)
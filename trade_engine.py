@@ -0,0 +1,261 @@
+# trade_engine.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 다중 청산 규칙 트레이드 엔진 (shared_notes.md 실전 가이드)
+# - 진입: 앵커 봉 종가 / 이후 봉 고가·저가로 익절·손절 판정, 종가로 BB 이탈 판정
+# - 1차 익절(부분) → 잔량 트레일링, 손절, BB 하단 n연속 종가 이탈, 최대 보유 봉 수
+# - 진입 × 보유 봉 행렬로 먼저 발생한 청산을 한 번에 판정 (봉 단위 파이썬 루프 없음)
+# - 익절/손절이 한 봉에 같이 걸린 경우만 1분봉으로 선후 판정 (선택)
+# =============================================================
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES = {
+    "tp1_pct": 0.5,        # 1차 익절 (진입가 대비 %, None이면 없음)
+    "tp1_frac": 0.5,       # 1차 익절 비중 (1.0이면 전량 익절)
+    "sl_pct": 0.5,         # 손절 (%, None이면 없음)
+    "trail_pct": 0.2,      # 트레일링 (직전 최고가 대비 %, 1차 익절 후 잔량 / 익절 없으면 진입부터)
+    "bb_exit_n": 2,        # BB 하단 n연속 종가 이탈 시 청산 (0이면 없음)
+    "max_bars": 20,        # 최대 보유 봉 수 (도달 시 종가 청산)
+    "fee_pct": 0.1,        # 왕복 수수료 (%)
+    "same_bar": "손절 우선",  # 같은 봉에서 익절/손절 동시 도달 시 ("손절 우선" / "익절 우선")
+}
+EXIT_REASONS = ("익절", "손절", "트레일링", "BB이탈", "시간청산", "보유중")
+_CHUNK = 2048  # 한 번에 판정할 진입 수 (행렬 메모리 제한)
+
+
+def rules_with_defaults(rules: Optional[dict] = None) -> dict:
+    r = dict(DEFAULT_RULES)
+    r.update({k: v for k, v in (rules or {}).items() if k in DEFAULT_RULES})
+    return r
+
+
+def _first(mask: np.ndarray) -> np.ndarray:
+    """행별 첫 True 열 (없으면 열 수)"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+
+def _take(m: np.ndarray, col: np.ndarray) -> np.ndarray:
+    return m[np.arange(len(col)), np.minimum(col, m.shape[1] - 1)]
+
+
+def _run_chunk(arr: dict, a: np.ndarray, r: dict, tp_priority: Optional[np.ndarray] = None) -> dict:
+    """tp_priority: 진입별 같은 봉 익절 우선 여부 (None이면 rules["same_bar"])"""
+    n = len(arr["close"])
+    H = int(r["max_bars"])
+    pos = np.arange(H)
+    idx = a[:, None] + 1 + pos
+    valid = idx < n
+    ic = np.minimum(idx, n - 1)
+    op, hi, lo, cl = arr["open"][ic], arr["high"][ic], arr["low"][ic], arr["close"][ic]
+    entry = arr["close"][a]
+    e = entry[:, None]
+    nv = valid.sum(axis=1)                     # 사용 가능한 보유 봉 수
+    last = np.maximum(nv - 1, 0)               # 시간 청산 열
+
+    sl_on = r["sl_pct"] is not None
+    tp_on = r["tp1_pct"] is not None
+    trail_on = r["trail_pct"] is not None
+    sl_lvl = entry * (1 - float(r["sl_pct"]) / 100.0) if sl_on else np.full(len(a), -np.inf)
+    tp_lvl = entry * (1 + float(r["tp1_pct"]) / 100.0) if tp_on else np.full(len(a), np.inf)
+    frac = min(max(float(r["tp1_frac"]), 0.0), 1.0) if tp_on else 0.0
+
+    sl_hit = valid & (lo <= sl_lvl[:, None])
+    tp_hit = valid & (hi >= tp_lvl[:, None])
+    bb_n = int(r["bb_exit_n"] or 0)
+    if bb_n > 0 and "BB_low" in arr:
+        below = valid & (cl < arr["BB_low"][ic])
+        # 진입 후 봉만 센 연속 이탈 길이
+        run = pos - np.maximum.accumulate(np.where(below, -1, pos), axis=1)
+        bb_hit = below & (run >= bb_n)
+    else:
+        bb_hit = np.zeros_like(valid)
+
+    c_sl, c_tp, c_bb = _first(sl_hit), _first(tp_hit), _first(bb_hit)
+    if tp_priority is None:
+        tp_priority = np.full(len(a), r["same_bar"] == "익절 우선")
+    tp_first = (c_tp < H) & (c_tp <= c_bb) & ((c_tp < c_sl) | ((c_tp == c_sl) & tp_priority))
+    ambiguous = (c_tp < H) & (c_tp == c_sl)
+
+    # --- 1단계: 전량 보유 중 청산 (익절 전) ---
+    # 트레일링은 익절이 없을 때만 진입부터 적용 (있으면 2단계)
+    if trail_on and not tp_on:
+        trail_stop = _trail_levels(hi, e, np.zeros(len(a), dtype=np.int64), float(r["trail_pct"]))
+        tr_hit = valid & (lo <= trail_stop) & (trail_stop > sl_lvl[:, None])
+        c_tr = _first(tr_hit)
+    else:
+        trail_stop = None
+        c_tr = np.full(len(a), H)
+    c_stop = np.minimum(c_sl, c_tr)
+    c1 = np.minimum(c_stop, c_bb)
+    stop_first = c_stop <= c_bb
+
+    exit_col = np.where(c1 < H, c1, last)
+    px_stop_lvl = np.where(c_tr <= c_sl, _take(trail_stop, c_tr) if trail_stop is not None else sl_lvl, sl_lvl)
+    px1 = np.where(c1 < H, np.where(stop_first, np.minimum(px_stop_lvl, _take(op, c1)), _take(cl, c1)),
+                   np.where(nv > 0, _take(cl, last), entry))
+    reason = np.where(c1 < H, np.where(stop_first, np.where(c_tr <= c_sl, "트레일링", "손절"), "BB이탈"),
+                      np.where(nv >= H, "시간청산", "보유중")).astype(object)
+    ret = px1 / entry - 1
+
+    # --- 2단계: 1차 익절 후 잔량 ---
+    k = np.flatnonzero(tp_first)
+    if len(k):
+        k1 = c_tp[k]
+        tp_px = np.maximum(tp_lvl[k], _take(op[k], k1))
+        if frac >= 1.0:
+            c2, px2 = k1, tp_px
+            why2 = np.full(len(k), "익절", dtype=object)
+        else:
+            v, o2, h2, l2, c2m = valid[k], op[k], hi[k], lo[k], cl[k]
+            after = pos[None, :] >= k1[:, None]
+            sl2 = v & after & (l2 <= sl_lvl[k][:, None])
+            if trail_on:
+                ts = _trail_levels(h2, e[k], k1, float(r["trail_pct"]))
+                tr2 = v & (pos[None, :] > k1[:, None]) & (l2 <= ts) & (ts > sl_lvl[k][:, None])
+            else:
+                ts, tr2 = None, np.zeros_like(v)
+            c_sl2, c_tr2 = _first(sl2), _first(tr2)
+            c_bb2 = _first(bb_hit[k] & after)
+            c_st2 = np.minimum(c_sl2, c_tr2)
+            c2 = np.minimum(c_st2, c_bb2)
+            st_first2 = c_st2 <= c_bb2
+            lvl2 = np.where(c_tr2 <= c_sl2, _take(ts, c_tr2) if ts is not None else sl_lvl[k], sl_lvl[k])
+            px_rem = np.where(c2 < H, np.where(st_first2, np.minimum(lvl2, _take(o2, c2)), _take(c2m, c2)),
+                              _take(c2m, last[k]))
+            why2 = np.where(c2 < H, np.where(st_first2, np.where(c_tr2 <= c_sl2, "트레일링", "손절"), "BB이탈"),
+                            np.where(nv[k] >= H, "시간청산", "보유중")).astype(object)
+            c2 = np.where(c2 < H, c2, last[k])
+            px2 = px_rem
+        ret[k] = frac * (tp_px / entry[k] - 1) + (1 - frac) * (px2 / entry[k] - 1)
+        exit_col[k] = c2
+        reason[k] = why2
+
+    held = np.where(nv > 0, exit_col + 1, 0)
+    in_trade = pos[None, :] <= exit_col[:, None]
+    hmax = np.where(in_trade & valid, hi, -np.inf).max(axis=1)
+    lmin = np.where(in_trade & valid, lo, np.inf).min(axis=1)
+    return {
+        "anchor": a,
+        "entry": entry,
+        "exit_i": np.minimum(a + held, n - 1),
+        "bars": held,
+        "reason": reason,
+        "tp1": tp_first,
+        "ambiguous": ambiguous,
+        "amb_col": c_tp,
+        "tp_lvl": tp_lvl,
+        "sl_lvl": sl_lvl,
+        "ret": ret * 100.0 - float(r["fee_pct"] or 0.0),
+        "max_ret": np.where(nv > 0, (hmax / entry - 1) * 100.0, 0.0),
+        "min_ret": np.where(nv > 0, (lmin / entry - 1) * 100.0, 0.0),
+    }
+
+
+def _trail_levels(hi: np.ndarray, e: np.ndarray, act: np.ndarray, trail_pct: float) -> np.ndarray:
+    """열 k의 트레일링 청산가 = max(진입가, act~k-1 고가) × (1 - trail%)"""
+    pos = np.arange(hi.shape[1])
+    h = np.where(pos[None, :] >= act[:, None], hi, -np.inf)
+    peak = np.maximum.accumulate(h, axis=1)
+    prev = np.concatenate([np.full((len(h), 1), -np.inf), peak[:, :-1]], axis=1)
+    return np.maximum(prev, e) * (1 - trail_pct / 100.0)
+
+
+def intrabar_order(minute: dict, bar_times, minutes_per_bar: int, tp_lvl, sl_lvl) -> np.ndarray:
+    """
+    봉 안의 익절/손절 선후를 1분봉으로 판정 → 1: 익절 먼저, -1: 손절 먼저, 0: 판정 불가.
+    minute: 1분봉 배열(time 오름차순), 봉 [t, t + minutes_per_bar) 구간만 시각 인덱스로 조회
+    """
+    t0 = np.asarray(bar_times).astype("datetime64[ns]")
+    out = np.zeros(len(t0), dtype=np.int8)
+    if len(t0) == 0 or minute is None or len(minute.get("time", ())) == 0:
+        return out
+    mt = np.asarray(minute["time"]).astype("datetime64[ns]")
+    W = max(int(minutes_per_bar), 1)
+    lo_i = np.searchsorted(mt, t0, "left")
+    hi_i = np.searchsorted(mt, t0 + np.timedelta64(W, "m"), "left")
+    idx = lo_i[:, None] + np.arange(W)
+    inside = idx < hi_i[:, None]
+    ic = np.minimum(idx, len(mt) - 1)
+    c_tp = _first(inside & (minute["high"][ic] >= np.asarray(tp_lvl)[:, None]))
+    c_sl = _first(inside & (minute["low"][ic] <= np.asarray(sl_lvl)[:, None]))
+    out[c_tp < c_sl] = 1
+    out[c_sl < c_tp] = -1
+    return out
+
+
+def _eval(arr: dict, a: np.ndarray, r: dict, intrabar, minutes_per_bar: int) -> dict:
+    ev = _run_chunk(arr, a, r)
+    ev["intrabar"] = np.zeros(len(a), dtype=np.int8)
+    amb = np.flatnonzero(ev["ambiguous"])
+    if intrabar is None or len(amb) == 0:
+        return ev
+    # 동시 도달 봉만 1분봉으로 선후 판정 후 해당 진입만 재계산
+    bar_t = arr["time"][a[amb] + 1 + ev["amb_col"][amb]]
+    minute = intrabar(bar_t) if callable(intrabar) else intrabar
+    order = intrabar_order(minute, bar_t, minutes_per_bar, ev["tp_lvl"][amb], ev["sl_lvl"][amb])
+    known = order != 0
+    if not known.any():
+        return ev
+    k = amb[known]
+    redo = _run_chunk(arr, a[k], r, tp_priority=order[known] > 0)
+    for key, val in redo.items():
+        ev[key][k] = val
+    ev["intrabar"][k] = order[known]
+    return ev
+
+
+def simulate_trades(arr: dict, entries, rules: Optional[dict] = None, minutes_per_bar: int = 1,
+                    intrabar: Optional[Union[dict, Callable[[np.ndarray], dict]]] = None) -> pd.DataFrame:
+    """
+    진입 앵커(봉 인덱스)별 실현 수익 테이블.
+    arr: backtest_engine.frame_arrays (open/high/low/close/time, BB 이탈 규칙은 BB_low 필요)
+    intrabar: 1분봉 배열 또는 loader(봉 시각 배열) → 1분봉 배열.
+              익절/손절이 같은 봉에 걸린 경우만 1분봉 순서로 판정 (없거나 판정 불가면 same_bar 규칙)
+    한 진입은 다른 진입과 독립 (포지션 중복 허용 — simulate()와 같은 단위)
+    """
+    r = rules_with_defaults(rules)
+    a = np.unique(np.asarray(entries, dtype=np.int64))
+    a = a[(a >= 0) & (a < len(arr["close"]))]
+    if len(a) == 0 or int(r["max_bars"]) < 1:
+        return pd.DataFrame()
+    parts = [_eval(arr, a[i:i + _CHUNK], r, intrabar, minutes_per_bar) for i in range(0, len(a), _CHUNK)]
+    ev = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+    times = arr["time"] if "time" in arr else np.arange(len(arr["close"]))
+    return pd.DataFrame({
+        "신호시간": pd.to_datetime(times[ev["anchor"]]),
+        "진입가": ev["entry"],
+        "청산시간": pd.to_datetime(times[ev["exit_i"]]),
+        "청산사유": ev["reason"],
+        "1차익절": ev["tp1"],
+        "동시도달": ev["ambiguous"],
+        "1분판정": np.where(ev["intrabar"] > 0, "익절 먼저", np.where(ev["intrabar"] < 0, "손절 먼저", "")),
+        "보유봉수": ev["bars"].astype(int),
+        "보유분": ev["bars"].astype(int) * int(minutes_per_bar),
+        "실현수익률(%)": np.round(ev["ret"], 3),
+        "최고수익률(%)": np.round(ev["max_ret"], 2),
+        "최저수익률(%)": np.round(ev["min_ret"], 2),
+        "anchor_i": ev["anchor"].astype(int),
+        "exit_i": ev["exit_i"].astype(int),
+    })
+
+
+def trade_summary(trades: pd.DataFrame) -> dict:
+    """트레이드 테이블 → 거래수/승률/평균·합계 실현수익률/청산 사유별 건수"""
+    out = {"거래수": 0, "승률(%)": 0.0, "평균수익률(%)": 0.0, "합계수익률(%)": 0.0, "평균보유봉": 0.0}
+    out.update({k: 0 for k in EXIT_REASONS})
+    if trades is None or trades.empty:
+        return out
+    pnl = trades["실현수익률(%)"]
+    out.update({
+        "거래수": int(len(trades)),
+        "승률(%)": float((pnl > 0).mean() * 100.0),
+        "평균수익률(%)": float(pnl.mean()),
+        "합계수익률(%)": float(pnl.sum()),
+        "평균보유봉": float(trades["보유봉수"].mean()),
+    })
+    counts = trades["청산사유"].value_counts()
+    out.update({k: int(counts.get(k, 0)) for k in EXIT_REASONS})
+    return out
@@ -0,0 +1,266 @@
+# upbit_data.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# Streamlit 비의존 캔들 로더 + 지표 계산
+# - app.py fetch_upbit_paged / add_indicators와 같은 규칙 (data_cache CSV → 루트 CSV → Upbit API 보충)
+# - 백그라운드 작업/워커 프로세스에서 사용
+# =============================================================
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import requests
+import ta
+from pytz import timezone
+from requests.adapters import HTTPAdapter, Retry
+
+from candles import Candles
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data_cache")
+OHLCV = ["time", "open", "high", "low", "close", "volume"]
+_KST = timezone("Asia/Seoul")
+_UTC = timezone("UTC")
+
+_session = None
+_frames = {}  # 캐시 CSV 파싱 결과 (경로 → (mtime, DataFrame))
+
+
+class RateLimiter:
+    """토큰 버킷: 초당 rate회, 최대 burst회 연속 허용 (스레드 안전)"""
+
+    def __init__(self, rate: float = 8.0, burst: int = 8):
+        self.rate, self.burst = float(rate), int(burst)
+        self.tokens = float(burst)
+        self.t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """토큰 1개 사용 (없으면 대기). 반환: 대기한 초"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                need = (1.0 - self.tokens) / self.rate
+            time.sleep(need)
+            waited += need
+
+
+# Upbit 시세 API 요청 제한(초당 10회) 아래로 유지
+API_LIMITER = RateLimiter(rate=8.0, burst=8)
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        _session.mount("https://", HTTPAdapter(max_retries=retries))
+    return _session
+
+
+def candle_url(interval_key: str):
+    """interval_key("minutes/15", "days") → (API URL, 캐시 파일 tf 키)"""
+    if "minutes/" in interval_key:
+        unit = interval_key.split("/")[1]
+        return f"https://api.upbit.com/v1/candles/minutes/{unit}", f"{unit}min"
+    return "https://api.upbit.com/v1/candles/days", "day"
+
+
+def _read_cache(market_code: str, tf_key: str) -> pd.DataFrame:
+    cache_path = os.path.join(DATA_DIR, f"{market_code}_{tf_key}.csv")
+    for path in (cache_path, os.path.join(BASE_DIR, f"{market_code}_{tf_key}.csv")):
+        if not os.path.exists(path):
+            continue
+        try:
+            mtime = os.path.getmtime(path)
+            hit = _frames.get(path)
+            if hit is not None and hit[0] == mtime:
+                return hit[1]
+            df = pd.read_csv(path, parse_dates=["time"])
+            df["time"] = pd.to_datetime(df["time"]).dt.tz_localize(None)
+            _frames[path] = (mtime, df)
+            return df
+        except Exception:
+            continue
+    return pd.DataFrame(columns=OHLCV)
+
+
+def _write_cache(df: pd.DataFrame, market_code: str, tf_key: str):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    cache_path = os.path.join(DATA_DIR, f"{market_code}_{tf_key}.csv")
+    tmp_path = cache_path + f".{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+
+
+def fetch_api(market_code: str, interval_key: str, start_cutoff: datetime, end_dt: datetime,
+              session: Optional[requests.Session] = None) -> pd.DataFrame:
+    """Upbit API 역방향 페이징 (end_dt → start_cutoff)"""
+    url, _ = candle_url(interval_key)
+    session = session or get_session()
+    rows = []
+    to_time = _KST.localize(end_dt).astimezone(_UTC).replace(tzinfo=None)
+    while True:
+        params = {"market": market_code, "count": 200, "to": to_time.strftime("%Y-%m-%d %H:%M:%S")}
+        API_LIMITER.acquire()
+        r = session.get(url, params=params, headers={"Accept": "application/json"}, timeout=10)
+        r.raise_for_status()
+        batch = r.json()
+        if not batch:
+            break
+        rows.extend(batch)
+        last_kst = pd.to_datetime(batch[-1]["candle_date_time_kst"])
+        last_utc = pd.to_datetime(batch[-1]["candle_date_time_utc"])
+        if last_kst <= start_cutoff:
+            break
+        to_time = last_utc - timedelta(seconds=1)
+    if not rows:
+        return pd.DataFrame(columns=OHLCV)
+    df = pd.DataFrame(rows).rename(columns={
+        "candle_date_time_kst": "time",
+        "opening_price": "open",
+        "high_price": "high",
+        "low_price": "low",
+        "trade_price": "close",
+        "candle_acc_trade_volume": "volume",
+    })
+    df["time"] = pd.to_datetime(df["time"]).dt.tz_localize(None)
+    return df[OHLCV].sort_values("time").reset_index(drop=True)
+
+
+def load_candles(market_code: str, interval_key: str, start_dt: datetime, end_dt: datetime,
+                 minutes_per_bar: int, warmup_bars: int = 0, allow_fetch: bool = True,
+                 session: Optional[requests.Session] = None) -> pd.DataFrame:
+    """
+    [start_dt - warmup, end_dt] 캔들. 캐시가 구간을 덮지 못하면 API로 보충 후 캐시 갱신.
+    API 실패 시 캐시에 있는 만큼만 반환 (fetch_upbit_paged와 동일한 폴백)
+    """
+    start_cutoff = start_dt - timedelta(minutes=warmup_bars * minutes_per_bar) if warmup_bars else start_dt
+    _, tf_key = candle_url(interval_key)
+    df_all = _read_cache(market_code, tf_key)
+    covered = (not df_all.empty and df_all["time"].min() <= start_cutoff
+               and df_all["time"].max() >= end_dt - timedelta(minutes=minutes_per_bar))
+    if allow_fetch and not covered:
+        try:
+            df_req = fetch_api(market_code, interval_key, start_cutoff, end_dt, session=session)
+        except Exception:
+            df_req = pd.DataFrame(columns=OHLCV)
+        if not df_req.empty:
+            df_all = pd.concat([df_all, df_req], ignore_index=True)
+            df_all = df_all.drop_duplicates(subset=["time"], keep="last").sort_values("time").reset_index(drop=True)
+            try:
+                _write_cache(df_all, market_code, tf_key)
+            except Exception:
+                pass
+    if df_all.empty:
+        return df_all
+    out = df_all[(df_all["time"] >= start_cutoff) & (df_all["time"] <= end_dt)]
+    return out.reset_index(drop=True)
+
+
+def load_minute_windows(market_code: str, bar_times, minutes_per_bar: int, allow_fetch: bool = True,
+                        max_fetch: int = 300, session: Optional[requests.Session] = None) -> pd.DataFrame:
+    """
+    봉 [t, t + minutes_per_bar) 구간들의 1분봉 (캐시 우선).
+    캐시에 1분봉이 하나도 없는 봉만 API로 보충 (붙어 있는 봉은 한 구간으로 묶어 요청, 최대 max_fetch 구간)
+    """
+    _, tf_key = candle_url("minutes/1")
+    df_all = _read_cache(market_code, tf_key)
+    t0 = pd.to_datetime(pd.Series(bar_times)).dropna().sort_values().drop_duplicates()
+    if t0.empty:
+        return df_all.iloc[:0]
+    width = timedelta(minutes=max(int(minutes_per_bar), 1))
+    mt = df_all["time"].to_numpy().astype("datetime64[ns]")
+    starts = t0.to_numpy().astype("datetime64[ns]")
+    ends = (t0 + width).to_numpy().astype("datetime64[ns]")
+    missing = mt.searchsorted(starts, "left") == mt.searchsorted(ends, "left")
+    if allow_fetch and missing.any():
+        spans = []
+        for s, e in zip(t0[missing], t0[missing] + width):
+            if spans and s <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], e)
+            else:
+                spans.append([s, e])
+        got = []
+        for s, e in spans[:int(max_fetch)]:
+            try:
+                got.append(fetch_api(market_code, "minutes/1", s.to_pydatetime(), e.to_pydatetime(), session=session))
+            except Exception:
+                continue
+        got = [g for g in got if not g.empty]
+        if got:
+            df_all = pd.concat([df_all] + got, ignore_index=True)
+            df_all = df_all.drop_duplicates(subset=["time"], keep="last").sort_values("time").reset_index(drop=True)
+            try:
+                _write_cache(df_all, market_code, tf_key)
+            except Exception:
+                pass
+    if df_all.empty:
+        return df_all
+    out = df_all[(df_all["time"] >= t0.iloc[0]) & (df_all["time"] < t0.iloc[-1] + width)]
+    return out.reset_index(drop=True)
+
+
+def _cci(high: pd.Series, low: pd.Series, close: pd.Series, window: int, constant: float = 0.015,
+         chunk: int = 8192) -> pd.Series:
+    """
+    ta.trend.CCIIndicator(fillna=False)와 비트 단위 동일한 CCI.
+    평균절대편차를 rolling.apply(파이썬 람다) 대신 슬라이딩 창 행렬로 계산 (묶음 단위 → 임시 메모리 상한)
+    """
+    w = int(window)
+    tp = (high + low + close) / 3.0
+    ma = tp.rolling(w, min_periods=w).mean()
+    x = tp.to_numpy(dtype=np.float64)
+    mad = np.full(len(x), np.nan)
+    if len(x) >= w:
+        win = sliding_window_view(x, w)
+        for a in range(0, len(win), chunk):
+            X = win[a:a + chunk]
+            mad[w - 1 + a:w - 1 + a + len(X)] = np.mean(np.abs(X - np.mean(X, axis=1, keepdims=True)), axis=1)
+    return (tp - ma) / (constant * pd.Series(mad, index=tp.index))
+
+
+def _indicator_columns(close: pd.Series, high: pd.Series, low: pd.Series, bb_window, bb_dev, cci_window,
+                       cci_signal=9) -> dict:
+    bb = ta.volatility.BollingerBands(close=close, window=bb_window, window_dev=bb_dev)
+    cci = _cci(high, low, close, int(cci_window), 0.015)
+    # CCI 신호선(단순 이동평균)
+    try:
+        n = max(int(cci_signal), 1)
+    except Exception:
+        n = 9
+    return {
+        "RSI13": ta.momentum.RSIIndicator(close=close, window=13).rsi(),
+        "BB_up": bb.bollinger_hband().fillna(method="bfill").fillna(method="ffill"),
+        "BB_low": bb.bollinger_lband().fillna(method="bfill").fillna(method="ffill"),
+        "BB_mid": bb.bollinger_mavg().fillna(method="bfill").fillna(method="ffill"),
+        "CCI": cci,
+        "CCI_sig": cci.rolling(n, min_periods=1).mean(),
+    }
+
+
+def add_indicators(df, bb_window, bb_dev, cci_window, cci_signal=9):
+    """
+    RSI(13) / BB / CCI / CCI 신호선 (app.py add_indicators와 동일).
+    DataFrame: 얕은 복사 + 지표 열 추가 (원본 OHLCV 버퍼 공유) / Candles: 지표 배열만 붙인 새 컨테이너
+    """
+    if isinstance(df, Candles):
+        px = {k: pd.Series(np.asarray(df[k], dtype=np.float64)) for k in ("close", "high", "low")}
+        cols = _indicator_columns(px["close"], px["high"], px["low"], bb_window, bb_dev, cci_window, cci_signal)
+        return df.with_columns(**{k: v.to_numpy() for k, v in cols.items()})
+    out = df.copy(deep=False)
+    for k, v in _indicator_columns(out["close"], out["high"], out["low"], bb_window, bb_dev, cci_window,
+                                   cci_signal).items():
+        out[k] = v
+    return out
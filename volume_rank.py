@@ -0,0 +1,110 @@
+# volume_rank.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 롤링 거래량 백분위 (shared_notes.md "거래량 상위 30%")
+# - 봉마다 최근 N봉 안에서 현재 거래량의 백분위 (≤ 현재값 비율, %)
+# - 머지 소트 트리(구간별 정렬 배열)를 1회 구성 → 창 크기와 무관하게 전 봉을 벡터 질의
+#   구성 O(n log² n), 창 크기 N 하나당 질의 O(n log² n) (창마다 정렬 없음)
+# - 짧은 창(≤ 256봉)은 슬라이딩 창 직접 비교가 더 빠름 → 자동 선택
+# - 필터: simulate 1차 신호 / 조합 스캔(common["vol_filter"]) / 실시간 감시 공용
+# =============================================================
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+VOL_FILTER = {"window": 96, "top_pct": 30.0}  # 기본: 최근 96봉 중 상위 30%
+_DIRECT_MAX = 256   # 이하 창은 직접 비교
+_DIRECT_ROWS = 8192  # 직접 비교 한 번에 처리할 봉 수 (메모리 제한)
+
+
+class RollingRank:
+    """값 배열 1개에 대한 구간 순위 질의 (count(v[l:r] ≤ x))"""
+
+    def __init__(self, values):
+        v = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=-np.inf)
+        self.n = len(v)
+        self.values = v
+        self.rank = None
+        self.levels = None
+        self._pct: Dict[int, np.ndarray] = {}
+
+    def _build(self):
+        """트리 구성 (긴 창 질의가 처음 들어올 때 1회)"""
+        uniq, rank = np.unique(self.values, return_inverse=True)
+        self.rank = rank.astype(np.int64)
+        self.pad = len(uniq)                     # 채움 칸 순위 (어떤 질의에도 세지지 않음)
+        depth = max(int(np.ceil(np.log2(max(self.n, 1)))), 0)
+        size = 1 << depth
+        r = np.full(size, self.pad, dtype=np.int64)
+        r[:self.n] = self.rank
+        pos = np.arange(size, dtype=np.int64)
+        # 레벨 k: 길이 2^k 구간별로 정렬된 (구간 번호, 순위) 키
+        self.stride = self.pad + 1
+        self.levels = [np.sort((pos >> k) * self.stride + r) for k in range(depth + 1)]
+
+    def count_le(self, lo, hi, x_rank) -> np.ndarray:
+        """[lo, hi) 구간에서 순위 ≤ x_rank 인 원소 수 (배열 질의, 순위는 self.rank 기준)"""
+        if self.levels is None:
+            self._build()
+        lo = np.asarray(lo, dtype=np.int64).copy()
+        hi = np.asarray(hi, dtype=np.int64).copy()
+        x = np.asarray(x_rank, dtype=np.int64)
+        cnt = np.zeros(len(lo), dtype=np.int64)
+        for k, keys in enumerate(self.levels):
+            if not (lo < hi).any():
+                break
+            take = (lo < hi) & (lo & 1 == 1)
+            if take.any():
+                s = lo[take]
+                cnt[take] += np.searchsorted(keys, s * self.stride + x[take], "right") - (s << k)
+                lo[take] += 1
+            take = (lo < hi) & (hi & 1 == 1)
+            if take.any():
+                hi[take] -= 1
+                s = hi[take]
+                cnt[take] += np.searchsorted(keys, s * self.stride + x[take], "right") - (s << k)
+            lo >>= 1
+            hi >>= 1
+        return cnt
+
+    def percentile(self, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+        """봉 i: 최근 window봉(i 포함) 중 v[i] 이하 비율(%). 봉 수 < min_periods(기본 window)면 NaN"""
+        window = max(int(window), 1)
+        mp = window if min_periods is None else max(int(min_periods), 1)
+        key = window * 100000 + mp
+        hit = self._pct.get(key)
+        if hit is not None:
+            return hit
+        i = np.arange(self.n, dtype=np.int64)
+        lo = np.maximum(i - window + 1, 0)
+        if window <= _DIRECT_MAX:
+            # 앞쪽 채움(+inf)은 어떤 값보다 크므로 세지지 않음
+            vp = np.concatenate([np.full(window - 1, np.inf), self.values])
+            sw = sliding_window_view(vp, window)
+            cnt = np.concatenate([(sw[a:a + _DIRECT_ROWS] <= self.values[a:a + _DIRECT_ROWS, None]).sum(axis=1)
+                                  for a in range(0, self.n, _DIRECT_ROWS)] or [np.zeros(0, dtype=np.int64)])
+        else:
+            if self.levels is None:
+                self._build()
+            cnt = self.count_le(lo, i + 1, self.rank)
+        out = cnt / (i + 1 - lo) * 100.0
+        out[(i + 1 - lo) < mp] = np.nan
+        self._pct[key] = out
+        return out
+
+    def top_mask(self, window: int, top_pct: float, min_periods: Optional[int] = None) -> np.ndarray:
+        """상위 top_pct% (백분위 ≥ 100 - top_pct) 봉 = True"""
+        pct = self.percentile(window, min_periods)
+        return np.nan_to_num(pct, nan=-1.0) >= 100.0 - float(top_pct)
+
+
+def volume_percentile(volume, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+    return RollingRank(volume).percentile(window, min_periods)
+
+
+def filter_signals(sig_idx, volume, window: int, top_pct: float, rank: Optional[RollingRank] = None) -> np.ndarray:
+    """1차 신호 위치 중 거래량 상위 top_pct%(최근 window봉 기준)인 봉만"""
+    sig = np.asarray(sig_idx, dtype=np.int64)
+    rank = rank or RollingRank(volume)
+    return sig[rank.top_mask(window, top_pct)[sig]]
@@ -0,0 +1,163 @@
+# walk_forward.py
+# -*- coding: utf-8 -*-
+# =============================================================
+# 워크포워드 검증 (조합 스캔의 표본 외 성과)
+# - 캐시 구간을 시간 기준 롤링 폴드로 분할: 학습 [s, s + train) → 검증 [s + train, s + train + test), s += test
+# - 폴드 × 타임프레임 작업을 프로세스 풀로 병렬 실행 (지표 프레임 · 전방 경로 텐서는 sweep_engine 공유 메모리 블록을 그대로 사용)
+# - 학습 구간에서 전략별 최고 조합 선택 → 같은 조합을 검증 구간에서 평가
+#   학습 신호는 학습 끝 - 측정N 봉 이전만 사용 (결과 판정이 검증 구간 데이터를 보지 않도록)
+# - 리포트: 폴드별 선택 조합/학습·검증 성과 + 전략 × 타임프레임 표본 외 안정성 요약
+# =============================================================
+import multiprocessing as mp
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine as be
+import sweep_engine as se
+
+
+def make_folds(t_start, t_end, n_folds: int = 4, train_ratio: float = 3.0) -> List[dict]:
+    """[t_start, t_end] → 롤링 폴드 목록 (검증 길이 = 전체 / (n_folds + train_ratio), 학습 = 검증 × train_ratio)"""
+    t0, t1 = pd.Timestamp(t_start), pd.Timestamp(t_end)
+    n_folds = max(int(n_folds), 1)
+    test = ((t1 - t0) / (n_folds + float(train_ratio))).floor("min")
+    folds = []
+    for k in range(n_folds):
+        tr0 = t0 + test * k
+        te0 = tr0 + test * float(train_ratio)
+        te1 = te0 + test if k < n_folds - 1 else t1 + pd.Timedelta(minutes=1)  # 마지막 폴드는 끝 봉까지
+        folds.append({"fold": k + 1, "train": (tr0, te0), "test": (te0, te1)})
+    return folds
+
+
+def _span(times: np.ndarray, lo, hi) -> tuple:
+    """시각 구간 [lo, hi) → 봉 인덱스 구간"""
+    t = np.asarray(times).astype("datetime64[ns]")
+    return (int(t.searchsorted(np.datetime64(pd.Timestamp(lo).to_datetime64()), "left")),
+            int(t.searchsorted(np.datetime64(pd.Timestamp(hi).to_datetime64()), "left")))
+
+
+def run_fold(state: dict, fold: dict, combos: List[dict], common: dict, min_signals: int = 5) -> List[dict]:
+    """폴드 1개 × 프레임 1개: 학습 구간 전략별 최고 조합(halving_score 기준) → 검증 구간 성과 행"""
+    times = state["arr"]["time"]
+    tr_lo, tr_hi = _span(times, *fold["train"])
+    te_lo, te_hi = _span(times, *fold["test"])
+    best = {}
+    for combo in combos:
+        L = int(combo["lookahead"])
+        stats = se.evaluate_combo(state, combo, dict(common, span=(tr_lo, max(tr_hi - L, tr_lo))))
+        if stats["신호수"] < int(min_signals):
+            continue
+        key = combo.get("strategy", "없음")
+        if key not in best or se.halving_score(stats) > se.halving_score(best[key][1]):
+            best[key] = (combo, stats)
+    rows = []
+    for strategy, (combo, tr) in best.items():
+        te = se.evaluate_combo(state, combo, dict(common, span=(te_lo, te_hi)))
+        rows.append({
+            "전략": strategy, "타임프레임": combo["tf"], "폴드": fold["fold"],
+            "학습시작": fold["train"][0], "검증시작": fold["test"][0], "검증종료": fold["test"][1],
+            "측정N(봉)": combo["lookahead"], "RSI": combo["rsi_mode"], "BB": combo["bb_cond"],
+            "2차조건": combo.get("sec_cond", "없음"),
+            "학습_신호수": tr["신호수"], "학습_승률(%)": tr["승률(%)"], "학습_합계수익률(%)": tr["합계수익률(%)"],
+            "검증_신호수": te["신호수"], "검증_승률(%)": te["승률(%)"], "검증_평균수익률(%)": te["평균수익률(%)"],
+            "검증_합계수익률(%)": te["합계수익률(%)"],
+        })
+    return rows
+
+
+def _run_fold_task(frame_key: str, fold: dict, combos: List[dict], common: dict, min_signals: int):
+    """워커 프로세스: _init_worker가 연결한 공유 메모리 프레임(전방 경로 텐서 포함)으로 폴드 실행"""
+    return run_fold(se._W[frame_key], fold, combos, common, min_signals)
+
+
+def run_walk_forward(frames: Dict[str, pd.DataFrame], combos: List[dict], common: dict, n_folds: int = 4,
+                     train_ratio: float = 3.0, min_signals: int = 5, start=None, max_workers: Optional[int] = None,
+                     on_fold: Optional[Callable[[int, int], None]] = None) -> pd.DataFrame:
+    """
+    frames/combos/common은 run_sweep_parallel()과 같은 형식. 폴드 경계는 모든 프레임 공통 시각 구간 기준
+    (start: 워밍업 봉을 제외한 평가 시작 시각).
+    반환: 폴드별 행 (전략 × 타임프레임 × 폴드). on_fold(완료 작업 수, 전체 작업 수)
+    """
+    frames = {tf: df.reset_index(drop=True) for tf, df in frames.items() if df is not None and not df.empty}
+    if not frames or not combos:
+        return pd.DataFrame()
+    # 워크포워드 구간별 결과는 메모 대상 아님 (조합 메모는 전체 구간 스캔 전용)
+    common = {k: v for k, v in common.items() if k not in ("memo_dir", "bootstrap", "equity")}
+    t0 = max([pd.Timestamp(df["time"].iloc[0]) for df in frames.values()] + ([pd.Timestamp(start)] if start else []))
+    t1 = min(pd.Timestamp(df["time"].iloc[-1]) for df in frames.values())
+    folds = make_folds(t0, t1, n_folds, train_ratio)
+    by_tf = {tf: [c for c in combos if c["tf"] == tf] for tf in frames}
+    tasks = [(tf, f) for f in folds for tf in frames if by_tf[tf]]
+    max_h = max(int(c["lookahead"]) for c in combos)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    rows: List[dict] = []
+    done = 0
+
+    if max_workers <= 1:
+        # 상태는 이 호출 지역 (se._W는 워커 프로세스 전용 — 같은 서버의 다른 세션과 공유되지 않도록)
+        states = {tf: se._make_state(be.frame_arrays(df), df, max_h) for tf, df in frames.items()}
+        for tf, f in tasks:
+            rows.extend(run_fold(states[tf], f, by_tf[tf], common, min_signals))
+            done += 1
+            if on_fold:
+                on_fold(done, len(tasks))
+        return walk_forward_frame(rows)
+
+    shms, specs = [], {}
+    try:
+        for tf, df in frames.items():
+            shm, spec = se.publish_frame(df, se._forward_outcomes(df, max_h))
+            shms.append(shm)
+            specs[tf] = spec
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                                 initializer=se._init_worker, initargs=(specs, max_h, None)) as pool:
+            futs = [pool.submit(_run_fold_task, tf, f, by_tf[tf], common, min_signals) for tf, f in tasks]
+            for fut in as_completed(futs):
+                rows.extend(fut.result())
+                done += 1
+                if on_fold:
+                    on_fold(done, len(tasks))
+    finally:
+        for shm in shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+    return walk_forward_frame(rows)
+
+
+def walk_forward_frame(rows: List[dict]) -> pd.DataFrame:
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values(["전략", "타임프레임", "폴드"]).reset_index(drop=True)
+
+
+def walk_forward_summary(wf: pd.DataFrame) -> pd.DataFrame:
+    """전략 × 타임프레임 표본 외 안정성: 검증 승률 평균/편차, 수익 폴드 비율, 학습-검증 승률 차, 선택 조합 일치율"""
+    if wf is None or wf.empty:
+        return pd.DataFrame()
+    out = []
+    for (strategy, tf), g in wf.groupby(["전략", "타임프레임"], sort=True):
+        picks = Counter(tuple(r) for r in g[["측정N(봉)", "RSI", "BB", "2차조건"]].itertuples(index=False))
+        top, top_n = picks.most_common(1)[0]
+        live = g[g["검증_신호수"] > 0]
+        out.append({
+            "전략": strategy, "타임프레임": tf, "폴드수": len(g),
+            "검증_신호수": int(g["검증_신호수"].sum()),
+            "검증_승률평균(%)": round(float(live["검증_승률(%)"].mean()), 1) if len(live) else 0.0,
+            "검증_승률편차(%)": round(float(live["검증_승률(%)"].std(ddof=0)), 1) if len(live) else 0.0,
+            "검증_합계수익률(%)": round(float(g["검증_합계수익률(%)"].sum()), 2),
+            "수익폴드(%)": round(float((g["검증_합계수익률(%)"] > 0).mean() * 100.0), 1),
+            "승률하락(%p)": round(float((live["학습_승률(%)"] - live["검증_승률(%)"]).mean()), 1) if len(live) else 0.0,
+            "조합일치(%)": round(top_n / len(g) * 100.0, 1),
+            "최다선택조합": " · ".join(str(v) for v in top),
+        })
+    return pd.DataFrame(out)